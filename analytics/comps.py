@@ -0,0 +1,184 @@
+"""
+Comparable-listing ("good deal") scores.
+
+Each listing is compared with its k nearest listings that have the same bedroom_count and a similar
+living_area_size. Its score is the percentile of its price among those comparables: 10 means only
+10% of comparable nearby listings are cheaper.
+
+Neighbours come from a GridIndex per bedroom count. Work is batched per occupied grid cell: every
+listing in a cell shares one candidate set (the surrounding ring of cells), so distances are one
+vectorized haversine matrix per cell (chunked for dense cells) instead of one query per listing,
+and nothing is ever compared pairwise across the whole market.
+
+    python -m analytics.comps
+"""
+import logging
+import time
+
+import click
+import numpy as np
+import pandas as pd
+
+from analytics.spatial_index import GridIndex, haversine_m
+from database.listing_schema import read_listings
+from database.mysql_client import MySQLClient
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DEFAULT_K = 20
+# Comparables must be within this fraction of the listing's size, when both sizes are known
+SIZE_TOLERANCE = 0.25
+CELL_SIZE_M = 400.0
+# Give up widening the search past this many cells (~4km at the default cell size)
+MAX_RING = 10
+# Listings with fewer comparables than this get no score
+MIN_COMPS = 5
+# Entries of one listings x candidates distance matrix (~16MB of float64). Dense cells are scored in
+# chunks of listings so memory stays bounded however many listings share a cell.
+MAX_MATRIX_ENTRIES = 2_000_000
+
+COMPS_COLUMNS = ['listing_id', 'comp_count', 'comp_median_price', 'price_percentile', 'max_comp_distance_m', 'scored_at']
+
+
+def _score_cell(positions, candidates, lat, lon, size, price, k):
+    """Scores the listings at `positions` against `candidates`. Returns per-listing result arrays."""
+    dist = haversine_m(lat[positions][:, None], lon[positions][:, None],
+                       lat[candidates][None, :], lon[candidates][None, :])
+    # A listing is never its own comparable
+    dist[positions[:, None] == candidates[None, :]] = np.inf
+
+    own_size = size[positions][:, None]
+    cand_size = size[candidates][None, :]
+    size_known = ~(np.isnan(own_size) | np.isnan(cand_size))
+    dissimilar = size_known & (np.abs(cand_size - own_size) > SIZE_TOLERANCE * own_size)
+    dist[dissimilar] = np.inf
+    dist[:, np.isnan(price[candidates])] = np.inf
+
+    n_comps = min(k, dist.shape[1])
+    nearest = np.argpartition(dist, n_comps - 1, axis=1)[:, :n_comps] if n_comps else np.empty((len(positions), 0), int)
+    nearest_dist = np.take_along_axis(dist, nearest, axis=1)
+    valid = np.isfinite(nearest_dist)
+    comp_prices = np.where(valid, price[candidates][nearest], np.nan)
+
+    comp_count = valid.sum(axis=1)
+    own_price = price[positions][:, None]
+    # Midpoint percentile: ties count half
+    below = (comp_prices < own_price).sum(axis=1) + 0.5 * (comp_prices == own_price).sum(axis=1)
+    # NaNs sort last, so each row's valid prices are its first comp_count entries
+    ranked = np.sort(comp_prices, axis=1)
+    rows = np.arange(len(positions))
+    lo = np.clip((comp_count - 1) // 2, 0, None)
+    hi = np.clip(comp_count // 2, 0, None)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # A listing without a price of its own has no percentile
+        percentile = np.where(np.isnan(own_price[:, 0]), np.nan, 100.0 * below / comp_count)
+        median = np.where(comp_count > 0, (ranked[rows, lo] + ranked[rows, hi]) / 2, np.nan) if n_comps else np.full(len(positions), np.nan)
+    max_dist = np.where(valid, nearest_dist, 0).max(axis=1) if n_comps else np.zeros(len(positions))
+    return comp_count, median, percentile, max_dist
+
+
+def _score_pending(pending, candidates, lat, lon, size, price, k):
+    """_score_cell over chunks of `pending`, so no distance matrix exceeds MAX_MATRIX_ENTRIES."""
+    rows = max(1, MAX_MATRIX_ENTRIES // max(len(candidates), 1))
+    if len(pending) <= rows:
+        return _score_cell(pending, candidates, lat, lon, size, price, k)
+    parts = [_score_cell(pending[start:start + rows], candidates, lat, lon, size, price, k)
+             for start in range(0, len(pending), rows)]
+    return tuple(np.concatenate(arrays) for arrays in zip(*parts))
+
+
+def compute_comps(df: pd.DataFrame, k: int = DEFAULT_K, cell_size_m: float = CELL_SIZE_M) -> pd.DataFrame:
+    """
+    Computes comparable-listing scores for every listing.
+
+    :param df: Listings with id, bedroom_count, living_area_size, price, latitude and longitude.
+    :param k: Number of comparables per listing.
+    :return: DataFrame with listing_id, comp_count, comp_median_price, price_percentile and max_comp_distance_m.
+    """
+    results = []
+    for bedrooms, group in df.groupby('bedroom_count'):
+        lat = pd.to_numeric(group['latitude'], errors='coerce').to_numpy(dtype='float64')
+        lon = pd.to_numeric(group['longitude'], errors='coerce').to_numpy(dtype='float64')
+        size = pd.to_numeric(group['living_area_size'], errors='coerce').replace(0, np.nan).to_numpy(dtype='float64')
+        price = pd.to_numeric(group['price'], errors='coerce').replace(0, np.nan).to_numpy(dtype='float64')
+        index = GridIndex(lat, lon, cell_size_m)
+        # Aim for enough raw candidates that k survive the size filter
+        wanted = max(3 * k, k + 1)
+
+        comp_count = np.zeros(len(group), dtype='int64')
+        median = np.full(len(group), np.nan)
+        percentile = np.full(len(group), np.nan)
+        max_dist = np.full(len(group), np.nan)
+        for ix, iy, positions in index.occupied_cells():
+            ring = 1
+            candidates = index.positions_in_ring(ix, iy, ring)
+            while len(candidates) < wanted and ring < MAX_RING:
+                ring += 1
+                candidates = index.positions_in_ring(ix, iy, ring)
+            pending = positions
+            while len(pending):
+                counts, med, pct, dist = _score_pending(pending, candidates, lat, lon, size, price, k)
+                comp_count[pending], median[pending], percentile[pending], max_dist[pending] = counts, med, pct, dist
+                # Everything within ring * cell size of a point is guaranteed to be in the candidate set.
+                # Points whose k-th comparable is further out (or that found fewer than k) may have
+                # missed closer ones in the next ring, so only those are rescored with a wider ring.
+                if ring >= MAX_RING:
+                    break
+                pending = pending[(counts < k) | (dist > ring * cell_size_m)]
+                ring += 1
+                candidates = index.positions_in_ring(ix, iy, ring)
+
+        results.append(pd.DataFrame({
+            'listing_id': group['id'].to_numpy(),
+            'comp_count': comp_count,
+            'comp_median_price': median,
+            'price_percentile': percentile,
+            'max_comp_distance_m': max_dist,
+        }))
+        logging.info(f"Scored {len(group)} listings with {bedrooms} bedrooms.")
+
+    if not results:
+        return pd.DataFrame(columns=COMPS_COLUMNS[:-1])
+    comps = pd.concat(results, ignore_index=True)
+    # Not enough comparables, or no price of its own: no score
+    unscored = (comps['comp_count'] < MIN_COMPS) | comps['price_percentile'].isna()
+    comps.loc[unscored, ['comp_median_price', 'price_percentile']] = np.nan
+    return comps
+
+
+def score_market(k: int = DEFAULT_K) -> int:
+    """Recomputes comparable scores for every listing and replaces the listing_comps table contents."""
+    start = time.monotonic()
+    with MySQLClient() as db:
+        df = read_listings(
+            "SELECT id, bedroom_count, living_area_size, price, latitude, longitude FROM listings "
+            "WHERE latitude IS NOT NULL AND longitude IS NOT NULL",
+            db.sqlalchemy_engine,
+        )
+        comps = compute_comps(df, k=k)
+        comps['comp_median_price'] = comps['comp_median_price'].round()
+        comps['price_percentile'] = comps['price_percentile'].round(1)
+        comps['max_comp_distance_m'] = comps['max_comp_distance_m'].round()
+        scored_at = pd.Timestamp.now().floor('s')
+        comps['scored_at'] = scored_at
+        prepared = comps[COMPS_COLUMNS].astype(object).where(pd.notna(comps[COMPS_COLUMNS]), None)
+        db.insert_many('listing_comps', COMPS_COLUMNS, [tuple(r) for r in prepared.to_numpy()], on_duplicate='update')
+        # Every scored listing now carries this run's scored_at. Older rows belong to listings that
+        # lost their coordinates since, so they would only serve stale scores.
+        db.cursor.execute("DELETE FROM listing_comps WHERE scored_at < %s", (scored_at.to_pydatetime(),))
+        removed = db.cursor.rowcount
+        db.conn.commit()
+    logging.info(f"Scored {len(comps)} listings against comparables in {time.monotonic() - start:.1f}s, "
+                 f"removed {removed} stale scores.")
+    return len(comps)
+
+
+@click.command()
+@click.option('--k', default=DEFAULT_K, type=int, help='Number of comparable listings per listing.')
+def main(k: int):
+    """Re-score every listing against its nearest comparable listings."""
+    score_market(k=k)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+"""
+Cross-broker listing deduplication.
+
+The same apartment is often listed by several brokers (source_group_label), each with its own
+external_id. This groups listings into unit clusters and stores the cluster id in
+listings.unit_cluster_id, so aggregations can count and summarize distinct units.
+
+Candidate pairs come from blocking, never from comparing all pairs:
+  - normalized street + unit + zip code
+  - coordinates rounded to ~10m + unit (catches differently spelled streets)
+Listings without a unit are never blocked, so distinct apartments of one building can't merge.
+Within a block, rows are sorted by bedrooms and price and each is only compared with its next
+WINDOW neighbours (sorted neighbourhood). A pair matches when bedrooms agree and the price and
+size are close. Matches are merged into clusters by connected components. The cluster id is the
+smallest listing id in the cluster.
+
+    python -m analytics.dedup
+"""
+import logging
+import re
+from datetime import datetime
+
+import click
+import numpy as np
+import pandas as pd
+
+from app.cache_store import mark_data_changed
+from database.listing_schema import read_listings
+from database.mysql_client import MySQLClient
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Rows compared after each row within a sorted block
+WINDOW = 5
+# Relative difference allowed between duplicate listings
+PRICE_TOLERANCE = 0.10
+SIZE_TOLERANCE = 0.10
+# Decimal places of the coordinate blocking key (4 places is ~11m latitude)
+COORDINATE_DECIMALS = 4
+UPDATE_BATCH_SIZE = 5000
+# analytics_watermarks row stamped whenever cluster ids change. The cluster id update keeps
+# date_updated, so app/data_utils.py adds this to the data version instead.
+WATERMARK_NAME = 'unit_clusters'
+
+DEDUP_COLUMNS = ['id', 'street', 'unit', 'display_unit', 'zip_code', 'latitude', 'longitude',
+                 'bedroom_count', 'price', 'living_area_size', 'unit_cluster_id']
+
+STREET_ABBREVIATIONS = {
+    'STREET': 'ST', 'AVENUE': 'AVE', 'AV': 'AVE', 'PLACE': 'PL', 'ROAD': 'RD', 'BOULEVARD': 'BLVD',
+    'DRIVE': 'DR', 'PARKWAY': 'PKWY', 'TERRACE': 'TER', 'COURT': 'CT', 'LANE': 'LN', 'SQUARE': 'SQ',
+    'EAST': 'E', 'WEST': 'W', 'NORTH': 'N', 'SOUTH': 'S',
+}
+_STREET_WORD = re.compile(r'\b(' + '|'.join(STREET_ABBREVIATIONS) + r')\b')
+_ORDINAL = re.compile(r'\b(\d+)(ST|ND|RD|TH)\b')
+_UNIT_PREFIX = re.compile(r'^(APT|APARTMENT|UNIT|NO|#)+')
+
+
+def normalize_street(street: pd.Series) -> pd.Series:
+    """'123 East 1st Street' and '123 E. 1 St' both become '123 E 1 ST'."""
+    s = street.fillna('').astype(str).str.upper()
+    s = s.str.replace(r'[^\w\s]', ' ', regex=True)
+    s = s.str.replace(_ORDINAL, r'\1', regex=True)
+    s = s.str.replace(_STREET_WORD, lambda m: STREET_ABBREVIATIONS[m.group(1)], regex=True)
+    return s.str.split().str.join(' ')
+
+
+def normalize_unit(unit: pd.Series) -> pd.Series:
+    """'#04A', 'Apt 4-A' and '4A' all become '4A'. Missing units become ''."""
+    s = unit.fillna('').astype(str).str.upper().str.replace(r'[^\w#]', '', regex=True)
+    s = s.str.replace(_UNIT_PREFIX, '', regex=True)
+    return s.str.lstrip('0')
+
+
+def _blocked_pairs(block: np.ndarray, order_keys: list) -> np.ndarray:
+    """Sorted-neighbourhood pairs (as row positions) within each block. Rows with block -1 are skipped."""
+    order = np.lexsort(order_keys[::-1] + [block])
+    sorted_block = block[order]
+    pairs = []
+    for offset in range(1, WINDOW + 1):
+        same = (sorted_block[:-offset] == sorted_block[offset:]) & (sorted_block[:-offset] >= 0)
+        pairs.append(np.column_stack([order[:-offset][same], order[offset:][same]]))
+    return np.concatenate(pairs) if pairs else np.empty((0, 2), dtype='int64')
+
+
+def candidate_pairs(df: pd.DataFrame) -> np.ndarray:
+    """Row-position pairs that share a blocking key and are close in the within-block ordering."""
+    street = normalize_street(df['street'])
+    unit = normalize_unit(df['unit'])
+    if 'display_unit' in df.columns:
+        unit = unit.where(unit != '', normalize_unit(df['display_unit']))
+    zip_code = df['zip_code'].astype(object).fillna('').astype(str).str[:5]
+    lat = pd.to_numeric(df['latitude'], errors='coerce').round(COORDINATE_DECIMALS)
+    lon = pd.to_numeric(df['longitude'], errors='coerce').round(COORDINATE_DECIMALS)
+    order_keys = [pd.to_numeric(df['bedroom_count'], errors='coerce').fillna(-1).to_numpy(),
+                  pd.to_numeric(df['price'], errors='coerce').fillna(0).to_numpy()]
+
+    blockings = [
+        (pd.DataFrame({'street': street, 'unit': unit, 'zip': zip_code}), (street != '') & (zip_code != '')),
+        (pd.DataFrame({'lat': lat, 'lon': lon, 'unit': unit}), lat.notna() & lon.notna()),
+    ]
+    # Without a unit, listings in the same building would all share a block
+    has_unit = unit != ''
+    pairs = []
+    for keys, usable in blockings:
+        block = keys.groupby(list(keys.columns), sort=False, dropna=False).ngroup().to_numpy()
+        block = np.where((usable & has_unit).to_numpy(), block, -1)
+        pairs.append(_blocked_pairs(block, order_keys))
+    pairs = np.concatenate(pairs)
+    # The same pair can come out of both blockings
+    return np.unique(np.sort(pairs, axis=1), axis=0) if len(pairs) else pairs
+
+
+def _within(a: np.ndarray, b: np.ndarray, tolerance: float) -> np.ndarray:
+    return np.abs(a - b) <= tolerance * np.maximum(a, b)
+
+
+def matching_pairs(df: pd.DataFrame, pairs: np.ndarray) -> np.ndarray:
+    """Keeps the candidate pairs that look like the same unit."""
+    if not len(pairs):
+        return pairs
+    a, b = pairs[:, 0], pairs[:, 1]
+    bedrooms = pd.to_numeric(df['bedroom_count'], errors='coerce').to_numpy(dtype='float64')
+    price = pd.to_numeric(df['price'], errors='coerce').replace(0, np.nan).to_numpy(dtype='float64')
+    size = pd.to_numeric(df['living_area_size'], errors='coerce').replace(0, np.nan).to_numpy(dtype='float64')
+
+    same_bedrooms = (bedrooms[a] == bedrooms[b]) | (np.isnan(bedrooms[a]) & np.isnan(bedrooms[b]))
+    # Unknown prices or sizes don't rule a match out
+    close_price = np.isnan(price[a]) | np.isnan(price[b]) | _within(price[a], price[b], PRICE_TOLERANCE)
+    close_size = np.isnan(size[a]) | np.isnan(size[b]) | _within(size[a], size[b], SIZE_TOLERANCE)
+    return pairs[same_bedrooms & close_price & close_size]
+
+
+def connected_components(n: int, pairs: np.ndarray) -> np.ndarray:
+    """Component label (the smallest member position) of each of n nodes, by vectorized label propagation."""
+    labels = np.arange(n)
+    if not len(pairs):
+        return labels
+    a, b = pairs[:, 0], pairs[:, 1]
+    while True:
+        smallest = np.minimum(labels[a], labels[b])
+        updated = labels.copy()
+        np.minimum.at(updated, a, smallest)
+        np.minimum.at(updated, b, smallest)
+        # Pointer jumping so long chains converge in a few rounds
+        updated = updated[updated]
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+def cluster_units(df: pd.DataFrame) -> pd.Series:
+    """
+    Assigns a unit cluster id to every listing.
+
+    :param df: Listings with id, street, unit, display_unit, zip_code, latitude, longitude,
+               bedroom_count, price and living_area_size.
+    :return: Series of cluster ids aligned with df: the smallest listing id in each cluster.
+    """
+    pairs = matching_pairs(df.reset_index(drop=True), candidate_pairs(df.reset_index(drop=True)))
+    labels = connected_components(len(df), pairs)
+    cluster_ids = pd.Series(df['id'].to_numpy()).groupby(labels).transform('min').to_numpy()
+    return pd.Series(cluster_ids, index=df.index, name='unit_cluster_id')
+
+
+def collapse_units(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per unit cluster: the most recently updated listing of each. Listings without a
+    cluster id yet are kept as they are.
+    """
+    if 'unit_cluster_id' not in df.columns or df.empty:
+        return df
+    cluster = df['unit_cluster_id'].fillna(df['id'])
+    order = df['date_updated'] if 'date_updated' in df.columns else df['id']
+    latest_first = df.assign(_cluster=cluster, _order=order).sort_values('_order', ascending=False, kind='stable')
+    return latest_first.drop_duplicates('_cluster').drop(columns=['_cluster', '_order']).sort_index()
+
+
+def assign_unit_clusters() -> int:
+    """Clusters every listing and stores changed cluster ids. Returns the number of listings updated."""
+    with MySQLClient() as db:
+        df = read_listings(f"SELECT {', '.join(DEDUP_COLUMNS)} FROM listings", db.sqlalchemy_engine)
+        if df.empty:
+            return 0
+        clusters = cluster_units(df)
+        # Listings without a stored cluster id compare as missing, and are always written
+        changed = df.loc[(clusters != df['unit_cluster_id']).fillna(True).astype(bool), 'id']
+        values = [(int(cluster), int(listing_id)) for cluster, listing_id in zip(clusters[changed.index], changed)]
+        for start in range(0, len(values), UPDATE_BATCH_SIZE):
+            # Setting date_updated to itself keeps ON UPDATE CURRENT_TIMESTAMP from marking the listing as changed
+            db.cursor.executemany("UPDATE listings SET unit_cluster_id = %s, date_updated = date_updated WHERE id = %s",
+                                  values[start:start + UPDATE_BATCH_SIZE])
+            db.conn.commit()
+        if values:
+            db.insert_many('analytics_watermarks', ['name', 'value'], [(WATERMARK_NAME, datetime.now())],
+                           on_duplicate='update')
+    logging.info(f"{len(df)} listings form {clusters.nunique()} distinct units, updated {len(values)} cluster ids.")
+    return len(values)
+
+
+@click.command()
+def main():
+    """Group listings of the same unit across brokers into unit clusters."""
+    if assign_unit_clusters():
+        # Let running dashboard servers rebuild their unit-grain caches
+        mark_data_changed()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Hexagonal binning of listing coordinates.
+
+Cells are pointy-top hexagons on an equirectangular projection centred on NYC, with one grid
+per map zoom level. Each listing's cell id for every zoom in HEX_ZOOM_LEVELS is computed at
+ingest and stored in the `hex_z<zoom>` columns of `listings`, so the map only has to group
+by a precomputed integer column.
+"""
+import math
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+HEX_ZOOM_LEVELS = list(range(9, 16))
+# Hex circumradius in degrees of latitude at zoom 0. Halves with every zoom level:
+# ~1.1km at zoom 10, ~35m at zoom 15.
+HEX_SIZE_ZOOM0 = 10.0
+# Longitudes are scaled by cos(reference latitude) so hexagons are regular on the map around NYC
+REFERENCE_LATITUDE = 40.7
+LON_SCALE = math.cos(math.radians(REFERENCE_LATITUDE))
+# Axial (q, r) pairs are packed into one BIGINT as q * HEX_ID_STRIDE + r. r stays in
+# [0, HEX_ID_STRIDE) for any latitude in the northern hemisphere up to zoom 15.
+HEX_ID_STRIDE = 1 << 24
+# Cell id reported for rows without coordinates. Real ids can be negative (western longitudes).
+MISSING_CELL = np.iinfo('int64').min
+
+SQRT3 = math.sqrt(3)
+
+
+def hex_column(zoom: int) -> str:
+    """Name of the listings column holding cell ids for a zoom level."""
+    return f"hex_z{zoom}"
+
+
+def nearest_zoom_level(zoom: float) -> int:
+    """Clamps a (fractional) map zoom to the nearest zoom level that has precomputed cells."""
+    return int(min(max(round(zoom), HEX_ZOOM_LEVELS[0]), HEX_ZOOM_LEVELS[-1]))
+
+
+def hex_size(zoom: int) -> float:
+    return HEX_SIZE_ZOOM0 / (2 ** zoom)
+
+
+def cell_ids(latitude, longitude, zoom: int) -> np.ndarray:
+    """
+    Vectorized assignment of coordinates to hex cell ids.
+
+    :param latitude: Array-like of latitudes.
+    :param longitude: Array-like of longitudes.
+    :param zoom: Zoom level of the grid.
+    :return: int64 array of packed cell ids. Missing coordinates get MISSING_CELL.
+    """
+    lat = np.asarray(latitude, dtype='float64')
+    lon = np.asarray(longitude, dtype='float64')
+    size = hex_size(zoom)
+    x = lon * LON_SCALE
+    y = lat
+
+    # Pixel -> fractional axial coordinates for pointy-top hexagons
+    q = (SQRT3 / 3 * x - y / 3) / size
+    r = (2 / 3 * y) / size
+
+    # Cube rounding
+    cx, cz = q, r
+    cy = -cx - cz
+    rx, ry, rz = np.round(cx), np.round(cy), np.round(cz)
+    dx, dy, dz = np.abs(rx - cx), np.abs(ry - cy), np.abs(rz - cz)
+    fix_x = (dx > dy) & (dx > dz)
+    fix_z = ~fix_x & (dz >= dy)
+    rx = np.where(fix_x, -ry - rz, rx)
+    rz = np.where(fix_z, -rx - ry, rz)
+
+    valid = ~(np.isnan(lat) | np.isnan(lon))
+    ids = np.full(lat.shape, MISSING_CELL, dtype='int64')
+    ids[valid] = rx[valid].astype('int64') * HEX_ID_STRIDE + rz[valid].astype('int64')
+    return ids
+
+
+def unpack_cell_ids(ids) -> Tuple[np.ndarray, np.ndarray]:
+    """Splits packed cell ids back into axial (q, r) arrays."""
+    ids = np.asarray(ids, dtype='int64')
+    q, r = np.divmod(ids, HEX_ID_STRIDE)
+    return q, r
+
+
+def cell_centers(ids, zoom: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns (latitude, longitude) arrays of the centres of the given cells."""
+    q, r = unpack_cell_ids(ids)
+    size = hex_size(zoom)
+    x = size * (SQRT3 * q + SQRT3 / 2 * r)
+    y = size * (1.5 * r)
+    return y, x / LON_SCALE
+
+
+def cell_polygon(cell_id: int, zoom: int) -> List[List[float]]:
+    """Closed GeoJSON ring ([lon, lat] pairs) of a hex cell."""
+    lat, lon = cell_centers([cell_id], zoom)
+    size = hex_size(zoom)
+    ring = []
+    for i in range(7):
+        angle = math.radians(60 * (i % 6) - 30)
+        ring.append([
+            float(lon[0] + size * math.cos(angle) / LON_SCALE),
+            float(lat[0] + size * math.sin(angle)),
+        ])
+    return ring
+
+
+def assign_hex_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Adds a hex_z<zoom> column for every zoom level, computed from latitude/longitude."""
+    lat = pd.to_numeric(df['latitude'], errors='coerce').to_numpy(dtype='float64')
+    lon = pd.to_numeric(df['longitude'], errors='coerce').to_numpy(dtype='float64')
+    for zoom in HEX_ZOOM_LEVELS:
+        ids = cell_ids(lat, lon, zoom)
+        df[hex_column(zoom)] = pd.array(ids, dtype='Int64')
+        df.loc[ids == MISSING_CELL, hex_column(zoom)] = pd.NA
+    return df
@@ -0,0 +1,66 @@
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from scraping.get_neighborhood_leaf_nodes import get_neighborhoods
+
+# Unassigned and the childless NNJ placeholder, dropped everywhere the hierarchy is displayed
+EXCLUDED_AREA_IDS = {800000, 9999999}
+
+
+class AreaHierarchy:
+    """
+    In-memory view of the `neighborhoods` tree, addressed by area name
+    (the key listings use in `area_name`).
+    """
+
+    def __init__(self, neighborhoods: List[dict]):
+        self.by_id = {int(n['id']): n for n in neighborhoods if int(n['id']) not in EXCLUDED_AREA_IDS}
+        self.id_by_name = {n['name']: i for i, n in self.by_id.items()}
+        self.children = defaultdict(list)
+        for i, n in self.by_id.items():
+            parent_id = n.get('parent_id')
+            if parent_id is not None and int(parent_id) in self.by_id and int(parent_id) != i:
+                self.children[int(parent_id)].append(i)
+
+    @classmethod
+    def from_database(cls) -> 'AreaHierarchy':
+        return cls(get_neighborhoods())
+
+    def parent(self, name: str) -> Optional[str]:
+        node = self.by_id.get(self.id_by_name.get(name))
+        if node is None or node.get('parent_id') is None:
+            return None
+        parent = self.by_id.get(int(node['parent_id']))
+        return parent['name'] if parent and parent['name'] != name else None
+
+    def ancestors(self, name: str) -> List[str]:
+        """Names from the area's parent up to the root."""
+        result = []
+        current = self.parent(name)
+        while current is not None and current not in result:
+            result.append(current)
+            current = self.parent(current)
+        return result
+
+    def ancestor_at_level(self, name: str, level: int) -> Optional[str]:
+        """The area itself or its ancestor at the given level (e.g. 1 = borough)."""
+        for candidate in [name] + self.ancestors(name):
+            node = self.by_id.get(self.id_by_name.get(candidate))
+            if node is not None and node.get('level') == level:
+                return candidate
+        return None
+
+    def subtree(self, name: str) -> List[str]:
+        """The area and all of its descendants."""
+        root = self.id_by_name.get(name)
+        if root is None:
+            return []
+        names, stack = [], [root]
+        while stack:
+            i = stack.pop()
+            names.append(self.by_id[i]['name'])
+            stack.extend(self.children.get(i, []))
+        return names
+
+    def levels(self) -> Dict[str, int]:
+        return {n['name']: n.get('level') for n in self.by_id.values()}
@@ -0,0 +1,208 @@
+"""
+Rental price model.
+
+`train` fits a scikit-learn pipeline on the `listings` table and saves a versioned artifact under
+MODEL_DIR. `score` loads the latest artifact once and scores, in a single vectorized predict call,
+only the listings that are new or changed since they were last scored (or were scored by an older
+model). Predictions and residuals are upserted into `listing_scores`.
+
+    python -m analytics.price_model train
+    python -m analytics.price_model score [--full]
+"""
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Optional, Tuple
+
+import click
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer, TransformedTargetRegressor
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.metrics import mean_absolute_error
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+from analytics.hierarchy import AreaHierarchy
+from config.settings import ROOT_DIR, env_str
+from database.listing_schema import read_listings
+from database.mysql_client import MySQLClient
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+MODEL_DIR = env_str('MODEL_DIR', os.path.join(ROOT_DIR, 'models'))
+LATEST_POINTER = 'latest.json'
+
+NUMERIC_FEATURES = ['bedroom_count', 'bathrooms', 'living_area_size', 'latitude', 'longitude']
+CATEGORICAL_FEATURES = ['building_type', 'furnished', 'area_name', 'area_level_2', 'borough']
+
+# Columns read from listings for training and scoring
+LISTING_COLUMNS = ['id', 'price', 'bedroom_count', 'full_bathroom_count', 'half_bathroom_count', 'living_area_size',
+                   'latitude', 'longitude', 'building_type', 'furnished', 'area_name', 'date_updated']
+
+# Listings never scored, updated since their last score, or scored by another model version (%s)
+PENDING_WHERE = ("LEFT JOIN listing_scores s ON s.listing_id = l.id "
+                 "WHERE s.listing_id IS NULL OR l.date_updated > s.listing_updated_at OR s.model_version <> %s")
+
+SCORE_COLUMNS = ['listing_id', 'model_version', 'predicted_price', 'residual', 'listing_updated_at', 'scored_at']
+
+
+def build_features(df: pd.DataFrame, hierarchy: AreaHierarchy) -> pd.DataFrame:
+    """
+    Turns raw listing rows into the model's feature frame. The area hierarchy contributes the
+    listing's borough (level 1) and sub-borough (level 2) so sparse leaf areas can borrow strength.
+    """
+    features = pd.DataFrame(index=df.index)
+    for col in ['bedroom_count', 'living_area_size', 'latitude', 'longitude']:
+        features[col] = pd.to_numeric(df[col], errors='coerce')
+    # living_area_size is 0 when unknown
+    features['living_area_size'] = features['living_area_size'].replace(0, np.nan)
+    features['bathrooms'] = (pd.to_numeric(df['full_bathroom_count'], errors='coerce').fillna(0)
+                             + 0.5 * pd.to_numeric(df['half_bathroom_count'], errors='coerce').fillna(0)).astype('float64')
+
+    features['building_type'] = df['building_type'].astype(object).fillna('UNKNOWN').astype(str)
+    features['furnished'] = df['furnished'].fillna(False).astype(bool).astype(str)
+    features['area_name'] = df['area_name'].astype(object).fillna('UNKNOWN').astype(str)
+    # Map each distinct area once rather than walking the tree per row
+    areas = features['area_name'].unique()
+    level_2 = {a: hierarchy.ancestor_at_level(a, 2) or 'UNKNOWN' for a in areas}
+    borough = {a: hierarchy.ancestor_at_level(a, 1) or 'UNKNOWN' for a in areas}
+    features['area_level_2'] = features['area_name'].map(level_2)
+    features['borough'] = features['area_name'].map(borough)
+    return features[NUMERIC_FEATURES + CATEGORICAL_FEATURES]
+
+
+def score_frame(df: pd.DataFrame, predicted: np.ndarray, model_version: str) -> pd.DataFrame:
+    """listing_scores rows of the scored listings: the rounded prediction and price minus prediction."""
+    return pd.DataFrame({
+        'listing_id': df['id'].astype('int64'),
+        'model_version': model_version,
+        'predicted_price': np.round(predicted).astype('int64'),
+        'residual': (pd.to_numeric(df['price'], errors='coerce').astype('float64') - np.round(predicted)),
+        'listing_updated_at': pd.to_datetime(df['date_updated']),
+        'scored_at': pd.Timestamp.now().floor('s'),
+    }, columns=SCORE_COLUMNS)
+
+
+def build_pipeline() -> TransformedTargetRegressor:
+    preprocess = ColumnTransformer([
+        ('numeric', SimpleImputer(strategy='median', add_indicator=True), NUMERIC_FEATURES),
+        ('categorical', OneHotEncoder(handle_unknown='ignore', min_frequency=5, sparse_output=False),
+         CATEGORICAL_FEATURES),
+    ])
+    model = Pipeline([
+        ('preprocess', preprocess),
+        ('regressor', HistGradientBoostingRegressor(max_iter=300, learning_rate=0.1, random_state=0)),
+    ])
+    # Rents are right-skewed; fitting on log price keeps errors relative
+    return TransformedTargetRegressor(regressor=model, func=np.log1p, inverse_func=np.expm1)
+
+
+def load_listings(db: MySQLClient, where: str = '', params: Optional[tuple] = None) -> pd.DataFrame:
+    query = f"SELECT {', '.join('l.' + c for c in LISTING_COLUMNS)} FROM listings l {where}"
+    return read_listings(query, db.sqlalchemy_engine, params=params)
+
+
+def save_artifact(model, metrics: dict) -> str:
+    """Writes a versioned model artifact and points latest.json at it. Returns the version."""
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    version = datetime.now().strftime('%Y%m%d%H%M%S')
+    filename = f"price_model-{version}.joblib"
+    joblib.dump({'version': version, 'model': model, 'features': NUMERIC_FEATURES + CATEGORICAL_FEATURES,
+                 'metrics': metrics}, os.path.join(MODEL_DIR, filename))
+    pointer_tmp = os.path.join(MODEL_DIR, f"{LATEST_POINTER}.tmp")
+    with open(pointer_tmp, 'w') as f:
+        json.dump({'version': version, 'file': filename, 'metrics': metrics}, f, indent=2)
+    os.replace(pointer_tmp, os.path.join(MODEL_DIR, LATEST_POINTER))
+    return version
+
+
+def load_artifact(version: Optional[str] = None) -> dict:
+    """Loads a model artifact by version, or the latest one."""
+    if version is None:
+        with open(os.path.join(MODEL_DIR, LATEST_POINTER), 'r') as f:
+            filename = json.load(f)['file']
+    else:
+        filename = f"price_model-{version}.joblib"
+    return joblib.load(os.path.join(MODEL_DIR, filename))
+
+
+def train_model(test_size: float = 0.2) -> Tuple[str, dict]:
+    """Fits the price model on all priced listings, reports holdout error and saves the artifact."""
+    with MySQLClient() as db:
+        df = load_listings(db, "WHERE l.price > 0")
+    hierarchy = AreaHierarchy.from_database()
+    logging.info(f"Training price model on {len(df)} listings...")
+
+    X = build_features(df, hierarchy)
+    y = df['price'].astype(float)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=0)
+
+    model = build_pipeline().fit(X_train, y_train)
+    holdout_mae = float(mean_absolute_error(y_test, model.predict(X_test)))
+    logging.info(f"Holdout MAE: ${holdout_mae:,.0f}")
+
+    # Refit on everything for the saved artifact
+    model = build_pipeline().fit(X, y)
+    metrics = {'holdout_mae': holdout_mae, 'n_train': int(len(df)), 'trained_at': datetime.now().isoformat()}
+    version = save_artifact(model, metrics)
+    logging.info(f"Saved price model version {version}.")
+    return version, metrics
+
+
+def score_listings(full: bool = False, version: Optional[str] = None) -> int:
+    """
+    Scores listings with the given (or latest) model and upserts the results into listing_scores.
+
+    :param full: Rescore every listing instead of only new/changed ones.
+    :return: Number of listings scored.
+    """
+    artifact = load_artifact(version)
+    model, model_version = artifact['model'], artifact['version']
+
+    with MySQLClient() as db:
+        if full:
+            df = load_listings(db)
+        else:
+            df = load_listings(db, PENDING_WHERE, (model_version,))
+        if df.empty:
+            logging.info("No new or changed listings to score.")
+            return 0
+
+        logging.info(f"Scoring {len(df)} listings with model {model_version}...")
+        X = build_features(df, AreaHierarchy.from_database())
+        predicted = model.predict(X)
+
+        scores = score_frame(df, predicted, model_version)
+        prepared = scores.astype(object).where(pd.notna(scores), None)
+        db.insert_many('listing_scores', SCORE_COLUMNS, [tuple(r) for r in prepared.to_numpy()], on_duplicate='update')
+    logging.info(f"Scored {len(scores)} listings.")
+    return len(scores)
+
+
+@click.group()
+def cli():
+    """Train and apply the rental price model."""
+
+
+@cli.command()
+@click.option('--test-size', default=0.2, type=float, help='Fraction of listings held out to report error.')
+def train(test_size: float):
+    """Train a new model version on the listings table."""
+    train_model(test_size=test_size)
+
+
+@cli.command()
+@click.option('--full', is_flag=True, help='Rescore every listing, not just new or changed ones.')
+@click.option('--version', default=None, help='Model version to use. Defaults to the latest.')
+def score(full: bool, version: Optional[str]):
+    """Score new or changed listings into listing_scores."""
+    score_listings(full=full, version=version)
+
+
+if __name__ == '__main__':
+    cli()
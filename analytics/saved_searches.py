@@ -0,0 +1,273 @@
+"""
+Saved searches and instant match notifications.
+
+A saved search is a set of criteria: an area (matching the area and every neighborhood below it
+in the tree), price and bedroom ranges and an optional furnished flag. Every batch written by
+`ingest_listings` is checked against all active searches, and each new listing, or listing whose
+price dropped, that meets a search's criteria is recorded as a match.
+
+Searches are held in a SearchIndex. Searches are bucketed by area. A listing only looks at the
+buckets of its own area, its ancestors and the searches with no area. Each bucket is sorted by
+max price, so the searches whose ceiling a listing's price fits under are one binary search away.
+Only those are checked on the remaining criteria.
+
+Matches go to the `search_matches` table, or are appended as JSON lines to SEARCH_MATCHES_FILE
+when that is set.
+
+    python -m analytics.saved_searches add --name "Cheap 1BRs" --area "Upper West Side" --max-price 3000 --min-bedrooms 1
+    python -m analytics.saved_searches list
+    python -m analytics.saved_searches remove 3
+"""
+import json
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import click
+import numpy as np
+import pandas as pd
+
+from analytics.hierarchy import AreaHierarchy
+from config.settings import env_str
+from database.mysql_client import MySQLClient
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+SEARCH_COLUMNS = ['id', 'name', 'area_name', 'min_price', 'max_price', 'min_bedrooms', 'max_bedrooms', 'furnished']
+MATCH_COLUMNS = ['search_id', 'listing_id', 'reason', 'price', 'previous_price']
+# Optional JSON lines file that receives matches instead of the search_matches table
+SEARCH_MATCHES_FILE = env_str('SEARCH_MATCHES_FILE', '')
+
+# Bucket key of searches that apply to every area
+ANY_AREA = None
+# Stored furnished criterion, -1 when a search doesn't care
+ANY_FURNISHED = -1
+
+
+def _bound(values: pd.Series, default: float) -> np.ndarray:
+    return pd.to_numeric(values, errors='coerce').fillna(default).to_numpy(dtype='float64')
+
+
+def _furnished_code(values: pd.Series) -> np.ndarray:
+    """1 for furnished, 0 for unfurnished and ANY_FURNISHED for unknown."""
+    return values.map(lambda v: ANY_FURNISHED if v is None or pd.isna(v) else int(bool(v))).to_numpy(dtype='int64')
+
+
+class SearchIndex:
+    """
+    Saved searches indexed by area and max price.
+
+    :param searches: One row per search with SEARCH_COLUMNS. Missing bounds and a missing area or
+                     furnished flag mean "any".
+    :param hierarchy: Neighborhood tree used to match a search's area against listings in its subtree.
+                      Without it, a search's area only matches listings in exactly that area.
+    """
+
+    def __init__(self, searches: pd.DataFrame, hierarchy: Optional[AreaHierarchy] = None):
+        searches = searches.reset_index(drop=True)
+        self.hierarchy = hierarchy
+        self.ids = searches['id'].to_numpy(dtype='int64')
+        self.min_price = _bound(searches['min_price'], -np.inf)
+        self.max_price = _bound(searches['max_price'], np.inf)
+        self.min_bedrooms = _bound(searches['min_bedrooms'], -np.inf)
+        self.max_bedrooms = _bound(searches['max_bedrooms'], np.inf)
+        self.furnished = _furnished_code(searches['furnished'].astype(object))
+
+        by_area: Dict[Optional[str], List[int]] = {}
+        for position, area in enumerate(searches['area_name']):
+            by_area.setdefault(area if pd.notna(area) else ANY_AREA, []).append(position)
+        self._by_area = {area: np.asarray(positions, dtype='int64') for area, positions in by_area.items()}
+        self._buckets: Dict[Optional[str], Tuple[np.ndarray, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _bucket(self, area: Optional[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Positions of the searches that cover an area, sorted by max price, and their sorted max prices."""
+        if area not in self._buckets:
+            covering = [ANY_AREA]
+            if area is not ANY_AREA:
+                covering += [area] + (self.hierarchy.ancestors(area) if self.hierarchy is not None else [])
+            positions = np.concatenate([self._by_area.get(a, np.empty(0, dtype='int64')) for a in covering])
+            positions = positions[np.argsort(self.max_price[positions], kind='stable')]
+            self._buckets[area] = positions, self.max_price[positions]
+        return self._buckets[area]
+
+    def match(self, listings: pd.DataFrame) -> pd.DataFrame:
+        """
+        Finds the searches each listing meets. Listings without a price match nothing, and listings
+        without a bedroom count or furnished flag only match searches that don't constrain them.
+
+        :param listings: Listings with area_name, price, bedroom_count and furnished.
+        :return: DataFrame of (listing index label, search_id) pairs, in columns 'row' and 'search_id'.
+        """
+        rows, search_ids = [], []
+        if not len(self) or listings.empty:
+            return pd.DataFrame({'row': rows, 'search_id': search_ids})
+
+        price = pd.to_numeric(listings['price'], errors='coerce').to_numpy(dtype='float64')
+        bedrooms = pd.to_numeric(listings['bedroom_count'], errors='coerce').to_numpy(dtype='float64')
+        furnished = _furnished_code(listings['furnished'].astype(object))
+        areas = listings['area_name'].astype(object).where(listings['area_name'].notna(), ANY_AREA).to_numpy()
+        labels = listings.index.to_numpy()
+
+        for area in pd.unique(areas):
+            positions, max_prices = self._bucket(area)
+            in_area = np.flatnonzero(areas == area) if area is not ANY_AREA else np.flatnonzero(pd.isna(areas))
+            # First search whose ceiling is at or above each price. NaN prices sort past the end.
+            starts = np.searchsorted(max_prices, price[in_area], side='left')
+            for i, start in zip(in_area, starts):
+                candidates = positions[start:]
+                if not len(candidates):
+                    continue
+                ok = self.min_price[candidates] <= price[i]
+                ok &= (self.min_bedrooms[candidates] == -np.inf) | (self.min_bedrooms[candidates] <= bedrooms[i])
+                ok &= (self.max_bedrooms[candidates] == np.inf) | (self.max_bedrooms[candidates] >= bedrooms[i])
+                ok &= (self.furnished[candidates] == ANY_FURNISHED) | (self.furnished[candidates] == furnished[i])
+                matched = self.ids[candidates[ok]]
+                rows.extend([labels[i]] * len(matched))
+                search_ids.extend(matched.tolist())
+        return pd.DataFrame({'row': rows, 'search_id': search_ids})
+
+
+def triggering_listings(current: pd.DataFrame, previous: pd.DataFrame) -> pd.DataFrame:
+    """
+    The listings of a batch that should be matched: new ones and ones whose price went down.
+
+    :param current: The batch after the upsert, with source, external_id and price.
+    :param previous: (source, external_id, price) of the batch's listings that were already stored.
+    :return: The triggering rows of current, with 'reason' ('new' or 'price_cut') and 'previous_price'.
+    """
+    keys = ['source', 'external_id']
+    before = previous[keys + ['price']].rename(columns={'price': 'previous_price'}).astype({'external_id': str})
+    merged = current.astype({'external_id': str}).merge(before, on=keys, how='left', indicator=True)
+    merged.index = current.index
+    price = pd.to_numeric(merged['price'], errors='coerce')
+    previous_price = pd.to_numeric(merged['previous_price'], errors='coerce')
+    is_new = merged['_merge'] == 'left_only'
+    is_cut = ~is_new & (price < previous_price)
+    merged['reason'] = np.where(is_new, 'new', 'price_cut')
+    return merged.loc[is_new | is_cut].drop(columns='_merge')
+
+
+def stored_prices(db: MySQLClient, batch: pd.DataFrame) -> pd.DataFrame:
+    """(id, source, external_id, price) of the batch's listings that are in the database."""
+    frames = []
+    for source, group in batch.groupby('source'):
+        external_ids = group['external_id'].astype(str).unique().tolist()
+        rows = db.execute_query(
+            f"SELECT id, source, external_id, price FROM listings "
+            f"WHERE source = %s AND external_id IN ({', '.join(['%s'] * len(external_ids))})",
+            tuple([source] + external_ids),
+        )
+        frames.append(pd.DataFrame(rows, columns=['id', 'source', 'external_id', 'price']))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['id', 'source', 'external_id', 'price'])
+
+
+# Cached index and the saved_searches signature it was built from
+_index_cache: Dict[str, object] = {}
+
+
+def get_search_index(db: MySQLClient) -> SearchIndex:
+    """The index of active searches, rebuilt only when saved_searches has changed."""
+    signature = tuple(db.execute_query("SELECT COUNT(*), MAX(updated_at) FROM saved_searches WHERE active")[0])
+    if _index_cache.get('signature') != signature:
+        rows = db.execute_query(f"SELECT {', '.join(SEARCH_COLUMNS)} FROM saved_searches WHERE active")
+        if 'hierarchy' not in _index_cache:
+            _index_cache['hierarchy'] = AreaHierarchy.from_database()
+        _index_cache['index'] = SearchIndex(pd.DataFrame(rows, columns=SEARCH_COLUMNS), _index_cache['hierarchy'])
+        _index_cache['signature'] = signature
+    return _index_cache['index']
+
+
+def _write_matches(db: MySQLClient, matches: pd.DataFrame):
+    if SEARCH_MATCHES_FILE:
+        with open(SEARCH_MATCHES_FILE, 'a') as f:
+            for record in matches.to_dict(orient='records'):
+                f.write(json.dumps(record, default=str) + '\n')
+    else:
+        prepared = matches[MATCH_COLUMNS].astype(object).where(pd.notna(matches[MATCH_COLUMNS]), None)
+        db.insert_many('search_matches', MATCH_COLUMNS, [tuple(r) for r in prepared.to_numpy()], on_duplicate='ignore')
+
+
+def notify_matches(db: MySQLClient, batch: pd.DataFrame, previous: pd.DataFrame) -> int:
+    """
+    Matches the new and price-cut listings of an ingested batch against the saved searches and
+    records the matches.
+
+    :param db: An active MySQLClient instance.
+    :param batch: The listing rows just upserted (snake_case listings columns).
+    :param previous: stored_prices() of the batch, read before the upsert.
+    :return: Number of matches recorded.
+    """
+    index = get_search_index(db)
+    if not len(index):
+        return 0
+    candidates = triggering_listings(batch, previous)
+    if candidates.empty:
+        return 0
+    for col in ('area_name', 'bedroom_count', 'furnished'):
+        if col not in candidates.columns:
+            candidates[col] = None
+
+    found = index.match(candidates)
+    if found.empty:
+        return 0
+    ids = stored_prices(db, candidates).astype({'external_id': str})[['source', 'external_id', 'id']]
+    listings = candidates.merge(ids, on=['source', 'external_id'], how='left').set_axis(candidates.index)
+    matched = listings.loc[found['row']].reset_index(drop=True)
+    matches = pd.DataFrame({
+        'search_id': found['search_id'].to_numpy(),
+        'listing_id': matched['id'].to_numpy(),
+        'reason': matched['reason'].to_numpy(),
+        'price': matched['price'].to_numpy(),
+        'previous_price': matched['previous_price'].to_numpy(),
+        'area_name': matched['area_name'].to_numpy(),
+        'street': matched['street'].to_numpy() if 'street' in matched.columns else None,
+        'url': matched['url'].to_numpy() if 'url' in matched.columns else None,
+    }).dropna(subset=['listing_id']).astype({'listing_id': 'int64'})
+    _write_matches(db, matches)
+    logging.info(f"{len(candidates)} new or price-cut listings produced {len(matches)} saved search matches.")
+    return len(matches)
+
+
+@click.group()
+def main():
+    """Manage saved searches."""
+
+
+@main.command()
+@click.option('--name', required=True)
+@click.option('--area', default=None, help='Area name. Matches listings in this area and every neighborhood below it.')
+@click.option('--min-price', default=None, type=int)
+@click.option('--max-price', default=None, type=int)
+@click.option('--min-bedrooms', default=None, type=float)
+@click.option('--max-bedrooms', default=None, type=float)
+@click.option('--furnished/--unfurnished', default=None, help='Only furnished or only unfurnished listings.')
+def add(name: str, area: Optional[str], min_price: Optional[int], max_price: Optional[int],
+        min_bedrooms: Optional[float], max_bedrooms: Optional[float], furnished: Optional[bool]):
+    """Add a saved search."""
+    with MySQLClient() as db:
+        db.insert_many('saved_searches', SEARCH_COLUMNS[1:],
+                       [(name, area, min_price, max_price, min_bedrooms, max_bedrooms, furnished)])
+        logging.info(f"Saved search '{name}' (id {db.cursor.lastrowid}).")
+
+
+@main.command(name='list')
+def list_searches():
+    """List the active saved searches."""
+    with MySQLClient() as db:
+        rows: List[tuple] = db.execute_query(f"SELECT {', '.join(SEARCH_COLUMNS)} FROM saved_searches WHERE active")
+    click.echo(pd.DataFrame(rows, columns=SEARCH_COLUMNS).to_string(index=False))
+
+
+@main.command()
+@click.argument('search_id', type=int)
+def remove(search_id: int):
+    """Deactivate a saved search."""
+    with MySQLClient() as db:
+        db.cursor.execute("UPDATE saved_searches SET active = FALSE WHERE id = %s", (search_id,))
+        db.conn.commit()
+
+
+if __name__ == '__main__':
+    main()
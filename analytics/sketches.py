@@ -0,0 +1,208 @@
+"""
+Mergeable quantile sketches.
+
+TDigest is a merging t-digest (Dunning & Ertl) with the k1 (arcsine) scale function. A digest is
+a sorted list of centroids (mean, weight). Digests of disjoint sets of values merge by pooling
+their centroids and recompressing, so a parent area's percentiles come from its children's
+digests without revisiting any listing.
+
+Error bounds. With compression δ, a centroid around quantile q holds at most
+2π·sqrt(q(1-q))/δ of the values. Interpolating inside a centroid is therefore off by at most half
+that in rank: π·sqrt(q(1-q))/δ. With the default δ = 200 that is at most 0.8% of the values at
+the median, and less towards the tails (0.5% at p10/p90). The bound is in rank, not in dollars. A
+median estimate falls between the true 49.2th and 50.8th percentile values. Merging keeps the same
+centroid size invariant, so the bound holds after any number of merges. The guarantee is the
+usual empirical one for t-digest, not a worst-case proof. A digest of fewer than about δ/4 values
+keeps every value as its own centroid and is exact.
+
+Sketches support inserts only. A listing whose price changes, or that is removed, needs its
+area's sketch rebuilt. AreaSketches.refresh does that bookkeeping: it remembers a fingerprint of
+every listing folded in, only folds in new listings, and rebuilds just the areas whose listings
+changed or went away.
+"""
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_COMPRESSION = 200
+
+
+def _k1(q: np.ndarray, compression: float) -> np.ndarray:
+    return compression / (2 * np.pi) * np.arcsin(2 * np.clip(q, 0, 1) - 1)
+
+
+class TDigest:
+    """
+    Mergeable quantile sketch of a stream of numbers. NaNs are ignored.
+
+    Besides its mean and weight, each centroid keeps the smallest and largest value it absorbed, so
+    quantiles can be exact across centroids of equal values (common here: round prices, bedroom
+    counts). Other centroids interpolate between their means, as in the standard t-digest.
+    """
+
+    def __init__(self, compression: float = DEFAULT_COMPRESSION, means=None, weights=None, lows=None, highs=None):
+        self.compression = compression
+        self.means = np.asarray(means if means is not None else [], dtype='float64')
+        self.weights = np.asarray(weights if weights is not None else [], dtype='float64')
+        self.lows = np.asarray(lows if lows is not None else self.means, dtype='float64')
+        self.highs = np.asarray(highs if highs is not None else self.means, dtype='float64')
+
+    @classmethod
+    def from_values(cls, values, compression: float = DEFAULT_COMPRESSION) -> 'TDigest':
+        return cls(compression).update(values)
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum())
+
+    @property
+    def min(self) -> float:
+        return float(self.lows[0]) if len(self.lows) else np.nan
+
+    @property
+    def max(self) -> float:
+        return float(self.highs[-1]) if len(self.highs) else np.nan
+
+    def update(self, values) -> 'TDigest':
+        """Adds a batch of values in place."""
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        if len(values):
+            # Equal values start out as one centroid
+            unique, counts = np.unique(values, return_counts=True)
+            self._absorb(unique, counts.astype('float64'), unique, unique)
+        return self
+
+    def merge(self, other: 'TDigest') -> 'TDigest':
+        """Adds all of another digest's values in place."""
+        if other.count:
+            self._absorb(other.means, other.weights, other.lows, other.highs)
+        return self
+
+    @classmethod
+    def merge_all(cls, digests: Iterable['TDigest'], compression: float = DEFAULT_COMPRESSION) -> 'TDigest':
+        """A new digest of the union of the digests' values. Pools every centroid and compresses once."""
+        digests = [d for d in digests if d.count]
+        merged = cls(compression)
+        if digests:
+            merged._absorb(*(np.concatenate([getattr(d, attr) for d in digests])
+                             for attr in ('means', 'weights', 'lows', 'highs')))
+        return merged
+
+    def _absorb(self, means, weights, lows, highs):
+        means = np.concatenate([self.means, means])
+        weights = np.concatenate([self.weights, weights])
+        lows = np.concatenate([self.lows, lows])
+        highs = np.concatenate([self.highs, highs])
+        order = np.argsort(means, kind='stable')
+        self.means, self.weights, self.lows, self.highs = self._compress(
+            means[order], weights[order], lows[order], highs[order])
+
+    def _compress(self, means, weights, lows, highs):
+        """
+        One left-to-right pass that merges neighbouring centroids while the merged centroid spans
+        at most one unit of the scale function k1.
+        """
+        total = weights.sum()
+        # Scale-function value at the left edge of every input centroid, and at the right edge of the last
+        edges = _k1(np.concatenate([[0], np.cumsum(weights)]) / total, self.compression)
+        # Each output centroid is the run of input centroids [starts[j], starts[j + 1])
+        starts = [0]
+        start_k = edges[0]
+        for i in range(1, len(means)):
+            if edges[i + 1] - start_k > 1:
+                starts.append(i)
+                start_k = edges[i]
+        starts = np.asarray(starts)
+        out_weights = np.add.reduceat(weights, starts)
+        out_means = np.add.reduceat(means * weights, starts) / out_weights
+        return out_means, out_weights, np.minimum.reduceat(lows, starts), np.maximum.reduceat(highs, starts)
+
+    def quantile(self, q):
+        """
+        Estimated value at quantile q (scalar or array, 0..1), interpolating between order
+        statistics like pandas' quantile/median. Exact while every centroid holds one distinct value.
+        """
+        scalar = np.ndim(q) == 0
+        q = np.atleast_1d(np.asarray(q, dtype='float64'))
+        if not len(self.means):
+            result = np.full(len(q), np.nan)
+        else:
+            # Order statistic i (0-based) sits at rank i. A centroid of equal values is flat across the
+            # ranks it covers; any other centroid is a single knot at its mean and central rank.
+            right = np.cumsum(self.weights) - 1
+            left = right - self.weights + 1
+            center = (left + right) / 2
+            pure = self.lows == self.highs
+            xs = np.column_stack([np.where(pure, left, center), np.where(pure, right, center)]).ravel()
+            ys = np.repeat(self.means, 2)
+            # The extreme values are known exactly
+            xs = np.concatenate([[0], xs, [self.count - 1]])
+            ys = np.concatenate([[self.min], ys, [self.max]])
+            result = np.interp(q * (self.count - 1), xs, ys)
+        return float(result[0]) if scalar else result
+
+    def median(self) -> float:
+        return self.quantile(0.5)
+
+    def to_dict(self) -> dict:
+        return {'compression': self.compression, 'means': self.means.tolist(), 'weights': self.weights.tolist(),
+                'lows': self.lows.tolist(), 'highs': self.highs.tolist()}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'TDigest':
+        return cls(data['compression'], data['means'], data['weights'], data['lows'], data['highs'])
+
+
+class AreaSketches:
+    """
+    One TDigest per (area, metric). Leaf areas are filled from listings with `update`, or kept in
+    line with a changing set of listings with `refresh`; any area's sketch for a subtree is the
+    merge of its leaves (`merged`).
+    """
+
+    def __init__(self, metrics: Iterable[str], compression: float = DEFAULT_COMPRESSION):
+        self.metrics = list(metrics)
+        self.compression = compression
+        self.sketches: Dict[str, Dict[str, TDigest]] = {}
+        # Per area, a fingerprint of each listing folded in by refresh, indexed by listing id
+        self.fingerprints: Dict[str, pd.Series] = {}
+
+    def update(self, listings: pd.DataFrame, area_col: str = 'area_name') -> 'AreaSketches':
+        """Folds a batch of listings into their areas' sketches."""
+        for area, group in listings.groupby(area_col, observed=True):
+            area_sketches = self.sketches.setdefault(area, {m: TDigest(self.compression) for m in self.metrics})
+            for metric in self.metrics:
+                area_sketches[metric].update(pd.to_numeric(group[metric], errors='coerce').to_numpy(dtype='float64'))
+        return self
+
+    def refresh(self, listings: pd.DataFrame, area_col: str = 'area_name') -> 'AreaSketches':
+        """
+        Brings the sketches in line with `listings` (which need an id column) without rebuilding them:
+        areas whose listings are unchanged are kept, areas that only gained listings get those folded
+        in, and areas with changed or removed listings, or none left, are rebuilt or dropped.
+        """
+        hashes = pd.util.hash_pandas_object(listings[['id', area_col, *self.metrics]], index=False)
+        areas = set()
+        for area, group in listings.groupby(area_col, observed=True):
+            areas.add(area)
+            current = pd.Series(hashes[group.index].to_numpy(), index=group['id'].to_numpy())
+            previous = self.fingerprints.get(area)
+            if previous is not None and current.reindex(previous.index).eq(previous).all():
+                group = group[~group['id'].isin(previous.index)]
+            else:
+                self.sketches.pop(area, None)
+            if len(group):
+                self.update(group, area_col)
+            self.fingerprints[area] = current
+        for area in (set(self.sketches) | set(self.fingerprints)) - areas:
+            self.sketches.pop(area, None)
+            self.fingerprints.pop(area, None)
+        return self
+
+    def merged(self, areas: Iterable[str], metric: str) -> TDigest:
+        return TDigest.merge_all((self.sketches[a][metric] for a in areas if a in self.sketches), self.compression)
+
+    def get(self, area: str, metric: str) -> Optional[TDigest]:
+        return self.sketches.get(area, {}).get(metric)
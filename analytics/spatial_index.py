@@ -0,0 +1,131 @@
+"""
+Uniform grid spatial index over listing coordinates.
+
+Points are projected to metres on an equirectangular plane centred on NYC (accurate to well under
+1% across the metro area) and bucketed into square cells. Point ids are stored sorted by cell, with
+one offset per occupied cell (CSR layout), so fetching every point in a block of cells is a couple
+of searchsorted calls and array slices rather than a Python-level scan.
+
+Range queries (query_bbox, query_radius, query_polygon) fetch the block of cells overlapping the
+query shape and then filter those candidates exactly, so results never depend on the cell size.
+"""
+import math
+from typing import Iterator, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_M = 6_371_008.8
+REFERENCE_LATITUDE = 40.7
+METERS_PER_DEG_LAT = 110_574.0
+METERS_PER_DEG_LON = 111_320.0 * math.cos(math.radians(REFERENCE_LATITUDE))
+# Cell keys pack (ix, iy) as ix * KEY_STRIDE + iy, with iy offset to stay non-negative
+KEY_STRIDE = 1 << 32
+KEY_OFFSET = 1 << 31
+
+
+def haversine_m(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Great-circle distance in metres. Broadcasts, so (n, 1) x (1, m) inputs give an (n, m) matrix."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype='float64')) for a in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def points_in_polygon(lat, lon, polygon_lats, polygon_lons) -> np.ndarray:
+    """Even-odd ray casting of every point against one polygon ring. Returns a boolean mask."""
+    lat = np.asarray(lat, dtype='float64')
+    lon = np.asarray(lon, dtype='float64')
+    ys = np.asarray(polygon_lats, dtype='float64')
+    xs = np.asarray(polygon_lons, dtype='float64')
+    inside = np.zeros(lat.shape, dtype=bool)
+    # One vectorized pass per polygon edge; lasso rings are at most a few hundred vertices
+    for x1, y1, x2, y2 in zip(xs, ys, np.roll(xs, -1), np.roll(ys, -1)):
+        if y1 == y2:
+            continue
+        crosses = (y1 > lat) != (y2 > lat)
+        x_cross = x1 + (lat - y1) * (x2 - x1) / (y2 - y1)
+        inside ^= crosses & (lon < x_cross)
+    return inside
+
+
+class GridIndex:
+    """
+    Static grid index over (latitude, longitude) points. Positions returned by queries are
+    row positions into the arrays the index was built from.
+    """
+
+    def __init__(self, latitude, longitude, cell_size_m: float = 250.0):
+        self.latitude = np.asarray(latitude, dtype='float64')
+        self.longitude = np.asarray(longitude, dtype='float64')
+        self.cell_size_m = cell_size_m
+
+        valid = ~(np.isnan(self.latitude) | np.isnan(self.longitude))
+        positions = np.flatnonzero(valid)
+        ix, iy = self._cell_xy(self.latitude[positions], self.longitude[positions])
+        keys = ix * KEY_STRIDE + (iy + KEY_OFFSET)
+
+        order = np.argsort(keys, kind='stable')
+        self.sorted_positions = positions[order]
+        sorted_keys = keys[order]
+        self.cell_keys, self.cell_starts, counts = np.unique(sorted_keys, return_index=True, return_counts=True)
+        self.cell_ends = self.cell_starts + counts
+
+    def __len__(self) -> int:
+        return len(self.sorted_positions)
+
+    def _cell_xy(self, lat, lon) -> Tuple[np.ndarray, np.ndarray]:
+        ix = np.floor(np.asarray(lon) * METERS_PER_DEG_LON / self.cell_size_m).astype('int64')
+        iy = np.floor(np.asarray(lat) * METERS_PER_DEG_LAT / self.cell_size_m).astype('int64')
+        return ix, iy
+
+    def cell_of(self, lat: float, lon: float) -> Tuple[int, int]:
+        ix, iy = self._cell_xy(lat, lon)
+        return int(ix), int(iy)
+
+    def occupied_cells(self) -> Iterator[Tuple[int, int, np.ndarray]]:
+        """Yields (ix, iy, positions) for every non-empty cell."""
+        for key, start, end in zip(self.cell_keys, self.cell_starts, self.cell_ends):
+            ix, iy = divmod(int(key), KEY_STRIDE)
+            yield ix, iy - KEY_OFFSET, self.sorted_positions[start:end]
+
+    def positions_in_block(self, ix_min: int, ix_max: int, iy_min: int, iy_max: int) -> np.ndarray:
+        """Positions of all points in the inclusive block of cells. One sorted-key range per column."""
+        columns = np.arange(ix_min, ix_max + 1, dtype='int64') * KEY_STRIDE
+        lo = np.searchsorted(self.cell_keys, columns + iy_min + KEY_OFFSET, side='left')
+        hi = np.searchsorted(self.cell_keys, columns + iy_max + KEY_OFFSET, side='right')
+        chunks = [self.sorted_positions[self.cell_starts[l]:self.cell_ends[h - 1]] for l, h in zip(lo, hi) if h > l]
+        if not chunks:
+            return np.empty(0, dtype='int64')
+        return np.concatenate(chunks)
+
+    def positions_in_ring(self, ix: int, iy: int, ring: int) -> np.ndarray:
+        """Positions of all points within `ring` cells of (ix, iy), including the cell itself."""
+        return self.positions_in_block(ix - ring, ix + ring, iy - ring, iy + ring)
+
+    def _candidates_in_bbox(self, lat_min: float, lat_max: float, lon_min: float, lon_max: float) -> np.ndarray:
+        ix_min, iy_min = self.cell_of(lat_min, lon_min)
+        ix_max, iy_max = self.cell_of(lat_max, lon_max)
+        return self.positions_in_block(ix_min, ix_max, iy_min, iy_max)
+
+    def query_bbox(self, lat_min: float, lat_max: float, lon_min: float, lon_max: float) -> np.ndarray:
+        """Positions of all points inside the (inclusive) latitude/longitude box."""
+        candidates = self._candidates_in_bbox(lat_min, lat_max, lon_min, lon_max)
+        lat, lon = self.latitude[candidates], self.longitude[candidates]
+        return candidates[(lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max)]
+
+    def query_radius(self, lat: float, lon: float, radius_m: float) -> np.ndarray:
+        """Positions of all points within radius_m metres (great-circle) of (lat, lon)."""
+        # Pad the box by 1% so the equirectangular projection can't clip points near the edge
+        dlat = 1.01 * radius_m / METERS_PER_DEG_LAT
+        dlon = 1.01 * radius_m / (111_320.0 * math.cos(math.radians(lat)))
+        candidates = self._candidates_in_bbox(lat - dlat, lat + dlat, lon - dlon, lon + dlon)
+        dist = haversine_m(lat, lon, self.latitude[candidates], self.longitude[candidates])
+        return candidates[dist <= radius_m]
+
+    def query_polygon(self, polygon_lats, polygon_lons) -> np.ndarray:
+        """Positions of all points inside the polygon ring (e.g. a map lasso selection)."""
+        if len(polygon_lats) < 3:
+            return np.empty(0, dtype='int64')
+        candidates = self._candidates_in_bbox(min(polygon_lats), max(polygon_lats), min(polygon_lons), max(polygon_lons))
+        inside = points_in_polygon(self.latitude[candidates], self.longitude[candidates], polygon_lats, polygon_lons)
+        return candidates[inside]
@@ -0,0 +1,94 @@
+"""
+Typo-tolerant address search with a trigram index.
+
+Each document (a listing's street, unit and zip code) is normalized the same way as for unit
+deduplication ('123 East 1st Street' -> '123 E 1 ST') and split into word trigrams, padded like
+PostgreSQL's pg_trgm: 'ST' -> '  S', ' ST', 'ST '. The index keeps one posting list of document
+positions per trigram, in CSR layout (trigram codes, offsets, postings).
+
+A query is scored by counting, per document, how many of the query's trigrams it contains: one
+bincount over the query trigrams' posting lists. The match score is the share of the query's
+trigrams found in the document, so one typo in a word only costs that word a few trigrams. Ties
+are broken by the Jaccard similarity of the two trigram sets, which favours documents with
+little besides the query.
+"""
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analytics.dedup import normalize_street, normalize_unit
+
+# Share of the query's trigrams a document must contain to be returned
+MIN_SCORE = 0.5
+
+
+def trigrams(text: str) -> List[str]:
+    """Distinct padded word trigrams of an already normalized string."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return list(grams)
+
+
+def address_documents(df: pd.DataFrame) -> pd.Series:
+    """Normalized 'street unit zip' text of every listing, the searchable document."""
+    unit = normalize_unit(df['display_unit']) if 'display_unit' in df.columns else ''
+    zip_code = df['zip_code'].astype(object).fillna('').astype(str).str[:5]
+    return (normalize_street(df['street']) + ' ' + unit + ' ' + zip_code).str.split().str.join(' ')
+
+
+def normalize_query(query: str) -> str:
+    return normalize_street(pd.Series([query])).iloc[0]
+
+
+class TrigramIndex:
+    """Inverted index from trigrams to the positions of the documents containing them."""
+
+    def __init__(self, documents: Iterable[str]):
+        vocabulary: Dict[str, int] = {}
+        codes, positions, sizes = [], [], []
+        for position, text in enumerate(documents):
+            grams = trigrams(text or '')
+            sizes.append(len(grams))
+            for gram in grams:
+                codes.append(vocabulary.setdefault(gram, len(vocabulary)))
+                positions.append(position)
+        self.vocabulary = vocabulary
+        # Distinct trigrams per document, the other half of the Jaccard denominator
+        self.sizes = np.asarray(sizes, dtype='int64')
+        codes = np.asarray(codes, dtype='int64')
+        order = np.argsort(codes, kind='stable')
+        self.postings = np.asarray(positions, dtype='int64')[order]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(vocabulary)))])
+
+    def __len__(self) -> int:
+        return len(self.sizes)
+
+    def search(self, query: str, limit: int = 100, min_score: float = MIN_SCORE) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Best matching documents for a free-text query.
+
+        :param query: Raw query text. It is normalized like the documents.
+        :param limit: Maximum number of results.
+        :param min_score: Minimum share of the query's trigrams a document must contain.
+        :return: (document positions, scores), best first.
+        """
+        grams = trigrams(normalize_query(query))
+        empty = np.empty(0, dtype='int64'), np.empty(0, dtype='float64')
+        if not grams or not len(self):
+            return empty
+        codes = [self.vocabulary[g] for g in grams if g in self.vocabulary]
+        if not codes:
+            return empty
+        hits = np.bincount(np.concatenate([self.postings[self.offsets[c]:self.offsets[c + 1]] for c in codes]),
+                           minlength=len(self))
+        candidates = np.flatnonzero(hits >= min_score * len(grams))
+        if not len(candidates):
+            return empty
+        shared = hits[candidates]
+        score = shared / len(grams)
+        jaccard = shared / (len(grams) + self.sizes[candidates] - shared)
+        order = np.lexsort((candidates, -jaccard, -score))[:limit]
+        return candidates[order], score[order]
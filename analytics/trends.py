@@ -0,0 +1,209 @@
+"""
+Weekly listing trends.
+
+Each listing contributes to at most two weeks: the week it was added (new-listing count and median
+asking price) and the week it went off market (days on market). Rows are stored per
+(week_start, area_name, bedroom_count) in `weekly_trends`, together with rollups over all areas
+and/or all bedroom counts (ALL_AREAS / ALL_BEDROOMS).
+
+Runs are incremental. The weeks touched by listings updated since the last run's watermark are
+recomputed from just the listings added or taken off market in those weeks, and replace the stored
+rows for those weeks. No other week is read or written. A listing's off_market_at can move or be
+cleared, so the week each listing was last counted off market in is kept in
+`trend_off_market_weeks`, and that week is recomputed too.
+
+    python -m analytics.trends [--full]
+"""
+import logging
+from datetime import date, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+import click
+import numpy as np
+import pandas as pd
+
+from database.listing_schema import read_listings
+from database.mysql_client import MySQLClient
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+WATERMARK_NAME = 'weekly_trends'
+# listing id -> the week the listing was last counted off market in
+OFF_MARKET_WEEKS_TABLE = 'trend_off_market_weeks'
+# Rollup keys. Stored in the key columns, which can't be NULL.
+ALL_AREAS = '*'
+ALL_BEDROOMS = -1
+
+TREND_COLUMNS = ['week_start', 'area_name', 'bedroom_count', 'new_listings', 'median_price',
+                 'off_market_listings', 'median_days_on_market']
+
+# Monday of the week of a DATETIME column, in MySQL
+_WEEK_SQL = "DATE_SUB(DATE({col}), INTERVAL WEEKDAY({col}) DAY)"
+
+
+def week_start(values) -> pd.Series:
+    """Monday of the week of each timestamp."""
+    ts = pd.to_datetime(values)
+    return (ts - pd.to_timedelta(ts.dt.weekday, unit='D')).dt.normalize()
+
+
+def _with_rollups(df: pd.DataFrame) -> pd.DataFrame:
+    """Stacks the rows with the area and/or bedroom key replaced by the rollup keys (grouping sets)."""
+    frames = []
+    for all_areas in (False, True):
+        for all_bedrooms in (False, True):
+            frame = df.copy()
+            if all_areas:
+                frame['area_name'] = ALL_AREAS
+            if all_bedrooms:
+                frame['bedroom_count'] = ALL_BEDROOMS
+            frames.append(frame)
+    # Rows without an area or bedroom count only count towards the rollups over that key
+    return pd.concat(frames, ignore_index=True).dropna(subset=['area_name', 'bedroom_count'])
+
+
+def weekly_aggregates(listings: pd.DataFrame, weeks: Optional[Iterable] = None) -> pd.DataFrame:
+    """
+    Aggregates listings into weekly trend rows.
+
+    :param listings: Listings with area_name, bedroom_count, price, date_added and off_market_at.
+    :param weeks: Only return rows for these week starts. Defaults to every week in the data.
+    :return: DataFrame with TREND_COLUMNS.
+    """
+    keys = ['week_start', 'area_name', 'bedroom_count']
+    df = listings[['area_name', 'bedroom_count', 'price', 'date_added', 'off_market_at']].copy()
+    df['bedroom_count'] = pd.to_numeric(df['bedroom_count'], errors='coerce')
+    df['price'] = pd.to_numeric(df['price'], errors='coerce').replace(0, np.nan)
+    df['date_added'] = pd.to_datetime(df['date_added'])
+    df['off_market_at'] = pd.to_datetime(df['off_market_at'])
+
+    added = df.assign(week_start=week_start(df['date_added']))
+    added = _with_rollups(added).groupby(keys).agg(
+        new_listings=('price', 'size'), median_price=('price', 'median'))
+
+    removed = df.dropna(subset=['off_market_at'])
+    removed = removed.assign(week_start=week_start(removed['off_market_at']),
+                             days_on_market=(removed['off_market_at'] - removed['date_added']).dt.total_seconds() / 86400)
+    removed = removed[removed['days_on_market'] >= 0]
+    removed = _with_rollups(removed).groupby(keys).agg(
+        off_market_listings=('days_on_market', 'size'), median_days_on_market=('days_on_market', 'median'))
+
+    trends = added.join(removed, how='outer').reset_index()
+    trends[['new_listings', 'off_market_listings']] = trends[['new_listings', 'off_market_listings']].fillna(0).astype('int64')
+    if weeks is not None:
+        trends = trends[trends['week_start'].isin(pd.to_datetime(list(weeks)))]
+    trends['week_start'] = trends['week_start'].dt.date
+    return trends[TREND_COLUMNS].reset_index(drop=True)
+
+
+def _week_ranges(weeks: List[date]) -> List[Tuple[date, date]]:
+    """Collapses week starts into [start, end) date ranges of consecutive weeks."""
+    ranges = []
+    for week in sorted(weeks):
+        if ranges and ranges[-1][1] == week:
+            ranges[-1] = (ranges[-1][0], week + timedelta(days=7))
+        else:
+            ranges.append((week, week + timedelta(days=7)))
+    return ranges
+
+
+def _touched_weeks(db: MySQLClient, since) -> List[date]:
+    """Weeks whose rows change because a listing in them was inserted or updated since the watermark."""
+    since_clause = "date_updated >= %s AND " if since is not None else ""
+    params = (since, since) if since is not None else None
+    rows = db.execute_query(
+        f"SELECT DISTINCT {_WEEK_SQL.format(col='date_added')} FROM listings WHERE {since_clause}date_added IS NOT NULL "
+        f"UNION SELECT DISTINCT {_WEEK_SQL.format(col='off_market_at')} FROM listings "
+        f"WHERE {since_clause}off_market_at IS NOT NULL",
+        params,
+    )
+    return sorted({r[0] for r in rows if r[0] is not None})
+
+
+def _previous_off_market_weeks(db: MySQLClient, since) -> List[date]:
+    """Weeks that listings updated since the watermark were counted off market in by earlier runs."""
+    if since is None:
+        rows = db.execute_query(f"SELECT DISTINCT week_start FROM {OFF_MARKET_WEEKS_TABLE}")
+    else:
+        rows = db.execute_query(f"SELECT DISTINCT t.week_start FROM {OFF_MARKET_WEEKS_TABLE} t "
+                                f"JOIN listings l ON l.id = t.listing_id WHERE l.date_updated >= %s", (since,))
+    return [r[0] for r in rows if r[0] is not None]
+
+
+def _record_off_market_weeks(db: MySQLClient, since, until):
+    """
+    Replaces the recorded off-market weeks of the listings updated in [since, until]. Listings
+    updated later keep their old week, so the next run still recomputes it. Doesn't commit.
+    """
+    if since is None:
+        db.cursor.execute(f"DELETE FROM {OFF_MARKET_WEEKS_TABLE}")
+        window, params = "date_updated <= %s", (until,)
+    else:
+        db.cursor.execute(f"DELETE t FROM {OFF_MARKET_WEEKS_TABLE} t JOIN listings l ON l.id = t.listing_id "
+                          f"WHERE l.date_updated >= %s AND l.date_updated <= %s", (since, until))
+        window, params = "date_updated >= %s AND date_updated <= %s", (since, until)
+    db.cursor.execute(f"INSERT INTO {OFF_MARKET_WEEKS_TABLE} (listing_id, week_start) "
+                      f"SELECT id, {_WEEK_SQL.format(col='off_market_at')} FROM listings "
+                      f"WHERE off_market_at IS NOT NULL AND {window}", params)
+
+
+def _load_listings_for_weeks(db: MySQLClient, weeks: List[date]) -> pd.DataFrame:
+    conditions, params = [], []
+    for start, end in _week_ranges(weeks):
+        conditions.append("(date_added >= %s AND date_added < %s) OR (off_market_at >= %s AND off_market_at < %s)")
+        params += [start, end, start, end]
+    query = (f"SELECT area_name, bedroom_count, price, date_added, off_market_at FROM listings "
+             f"WHERE {' OR '.join(conditions)}")
+    return read_listings(query, db.sqlalchemy_engine, params=tuple(params))
+
+
+def update_weekly_trends(full: bool = False) -> int:
+    """
+    Recomputes the weekly_trends rows of every week touched since the last run.
+
+    :param full: Ignore the watermark and rebuild every week.
+    :return: Number of weeks recomputed.
+    """
+    with MySQLClient() as db:
+        rows = db.execute_query("SELECT value FROM analytics_watermarks WHERE name = %s", (WATERMARK_NAME,))
+        since = None if full or not rows else rows[0][0]
+        # Read the new watermark first so rows updated during the run are picked up next time
+        new_watermark = db.execute_query("SELECT MAX(date_updated) FROM listings")[0][0]
+
+        weeks = sorted(set(_touched_weeks(db, since)) | set(_previous_off_market_weeks(db, since)))
+        if not weeks:
+            logging.info("No weeks touched since the last trends run.")
+            return 0
+        logging.info(f"Recomputing weekly trends for {len(weeks)} weeks...")
+
+        trends = weekly_aggregates(_load_listings_for_weeks(db, weeks), weeks)
+        trends['median_price'] = trends['median_price'].round()
+        trends['median_days_on_market'] = trends['median_days_on_market'].round(1)
+        prepared = trends.astype(object).where(pd.notna(trends), None)
+
+        try:
+            # Replace the touched weeks wholesale so groups that emptied out don't linger.
+            # insert_many commits, so the delete and the new rows land in one transaction.
+            db.cursor.execute(f"DELETE FROM weekly_trends WHERE week_start IN ({', '.join(['%s'] * len(weeks))})",
+                              tuple(weeks))
+            _record_off_market_weeks(db, since, new_watermark)
+            db.insert_many('weekly_trends', TREND_COLUMNS, [tuple(r) for r in prepared.to_numpy()], on_duplicate='update')
+            db.insert_many('analytics_watermarks', ['name', 'value'], [(WATERMARK_NAME, new_watermark)],
+                           on_duplicate='update')
+        except Exception as e:
+            logging.error(f"Failed to store weekly trends: {e}")
+            db.conn.rollback()
+            raise
+    logging.info(f"Stored {len(trends)} weekly trend rows for {len(weeks)} weeks.")
+    return len(weeks)
+
+
+@click.command()
+@click.option('--full', is_flag=True, help='Rebuild every week instead of only weeks touched since the last run.')
+def main(full: bool):
+    """Update the weekly listing trends table."""
+    update_weekly_trends(full=full)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+Versioned JSON API on the dashboard's Flask server.
+
+    GET /api/v1/listings                  listing search (area, zip_code, price, bedrooms, available date filters)
+    GET /api/v1/aggregates/<group_by>     per-area or per-zip unit stats, same as the map (area_name, zip_code)
+    GET /api/v1/hierarchy                 neighborhood tree rollups of units, same as the treemap
+
+Every response carries an ETag derived from the data version and the request URL. A client that
+sends it back in If-None-Match gets a 304 before any database or pandas work happens: the data
+version itself is only re-checked once per DATA_VERSION_TTL_SECONDS. Response bodies are kept in
+the shared cache store, keyed by data version and URL, so a repeat request from any client or
+worker is served without recomputation.
+"""
+import functools
+import hashlib
+import json
+from io import StringIO
+
+import pandas as pd
+from flask import Blueprint, Response, jsonify, request
+
+from app import cache_store
+from app.data_utils import (GROUP_BY_OPTIONS, HIERARCHY_LISTING_COLUMNS, MAP_LISTING_COLUMNS, aggregate_listings_json,
+                            filter_by_available_date, filter_listings_json, get_cached_listings, get_data_version,
+                            get_page_listings_json, hierarchy_listings_json)
+from database.listing_schema import json_listings
+
+API_PREFIX = '/api/v1'
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+# Columns returned by listing search
+LISTING_FIELDS = ['id', 'area_name', 'street', 'display_unit', 'zip_code', 'price', 'bedroom_count',
+                  'full_bathroom_count', 'half_bathroom_count', 'living_area_size', 'furnished', 'building_type',
+                  'status', 'available_at', 'latitude', 'longitude', 'url_path', 'date_updated']
+
+api = Blueprint('api', __name__, url_prefix=API_PREFIX)
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _etag(version: str) -> str:
+    # The full path with its query string, so every distinct search gets its own tag
+    return hashlib.sha1(f"{version}\0{request.full_path}".encode('utf-8')).hexdigest()
+
+
+def versioned(view):
+    """
+    Serves a view's JSON body with an ETag tied to the data version. Answers If-None-Match with a
+    304 without calling the view, and caches the body for the data version.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        version = get_data_version()
+        etag = _etag(version)
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            key = cache_store.cache_key('api', version, request.full_path)
+            try:
+                body = cache_store.get_or_compute(key, lambda: view(*args, **kwargs))
+            except BadRequest as e:
+                return jsonify({'error': str(e)}), 400
+            response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['X-Data-Version'] = version
+        # Clients may keep the body but must revalidate, which costs them a 304
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return wrapper
+
+
+def _envelope(df: pd.DataFrame, **extra) -> str:
+    """JSON body with the records of df. The frame is serialized by pandas directly, never via Python dicts."""
+    meta = json.dumps({'data_version': get_data_version(), 'count': len(df), **extra})
+    return f'{meta[:-1]}, "results": {json_listings(df).to_json(orient="records", date_format="iso")}}}'
+
+
+def _arg(name: str, type_=str):
+    value = request.args.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        return type_(value)
+    except ValueError:
+        raise BadRequest(f"Invalid value for '{name}': {value!r}")
+
+
+def _date_range():
+    """available_from/available_to in the same ISO format the dashboard's date picker sends."""
+    start, end = _arg('available_from'), _arg('available_to')
+    for name, value in (('available_from', start), ('available_to', end)):
+        if value is not None:
+            try:
+                pd.Timestamp(value)
+            except ValueError:
+                raise BadRequest(f"Invalid value for '{name}': {value!r}")
+    return start, end
+
+
+@api.route('/listings')
+@versioned
+def search_listings():
+    df = get_cached_listings()
+    if df.empty:
+        return _envelope(pd.DataFrame(columns=LISTING_FIELDS), total=0, offset=0)
+    start, end = _date_range()
+    df = filter_by_available_date(df, start, end)
+
+    filters = {
+        'area_name': _arg('area'),
+        'zip_code': _arg('zip_code'),
+    }
+    for col, value in filters.items():
+        if value is not None:
+            df = df[df[col].astype(str) == value]
+    ranges = [('price', _arg('min_price', float), _arg('max_price', float)),
+              ('bedroom_count', _arg('min_bedrooms', float), _arg('max_bedrooms', float))]
+    for col, low, high in ranges:
+        if low is not None:
+            df = df[df[col] >= low]
+        if high is not None:
+            df = df[df[col] <= high]
+
+    limit, offset = _arg('limit', int), _arg('offset', int)
+    limit = DEFAULT_LIMIT if limit is None else limit
+    offset = 0 if offset is None else offset
+    if limit <= 0:
+        raise BadRequest("'limit' must be positive")
+    if offset < 0:
+        raise BadRequest("'offset' must not be negative")
+    limit = min(limit, MAX_LIMIT)
+    page = df.sort_values('id').iloc[offset:offset + limit]
+    return _envelope(page[[c for c in LISTING_FIELDS if c in page.columns]], total=len(df), offset=offset)
+
+
+@api.route('/aggregates/<group_by>')
+@versioned
+def aggregates(group_by: str):
+    if group_by not in GROUP_BY_OPTIONS:
+        raise BadRequest(f"group_by must be one of {', '.join(GROUP_BY_OPTIONS)}")
+    # The map's own cached stores (one row per unit), so both share results for the same date range
+    start, end = _date_range()
+    listings_json = filter_listings_json(get_page_listings_json(MAP_LISTING_COLUMNS, 'unit'), start, end, 'unit')
+    return _envelope(pd.read_json(StringIO(aggregate_listings_json(listings_json, group_by)), orient='split'),
+                     group_by=group_by)
+
+
+@api.route('/hierarchy')
+@versioned
+def hierarchy():
+    # The treemap's own cached stores, one row per unit
+    start, end = _date_range()
+    listings_json = filter_listings_json(get_page_listings_json(HIERARCHY_LISTING_COLUMNS, 'unit'), start, end, 'unit')
+    return _envelope(pd.read_json(StringIO(hierarchy_listings_json(listings_json)), orient='split'))
+
+
+def register_api(app):
+    """Mounts the JSON API on the Dash app's Flask server."""
+    app.server.register_blueprint(api)
@@ -1,12 +1,11 @@
 import dash
 import dash_bootstrap_components as dbc
 from dash import dcc, html, callback
-from dash.dependencies import Input, Output
-import pandas as pd
-from datetime import date
-from io import StringIO
+from dash.dependencies import Input, Output, State
 
-from app.data_utils import get_listings_data
+from app.api import register_api
+from app.data_utils import DEFAULT_DATE_RANGE, filter_listings_json, get_page_listings_json
+from app.metrics import instrument_app
 
 # Initialize the Dash app
 # Suppress callback exceptions because some components are generated by other callbacks
@@ -28,6 +27,8 @@ sidebar = dbc.Nav(
         dbc.NavLink("Choropleth", href="/", active="exact"),
         dbc.NavLink("Treemap", href="/treemap", active="exact"),
         dbc.NavLink("Table View", href="/table", active="exact"),
+        dbc.NavLink("Best Deals", href="/deals", active="exact"),
+        dbc.NavLink("Trends", href="/trends", active="exact"),
     ],
     vertical=True,
     pills=True,
@@ -41,6 +42,8 @@ app.layout = dbc.Container(
         dcc.Store(id='raw-listings-store'),
         # Hidden store for filtered data accessible across all pages
         dcc.Store(id='filtered-listings-store'),
+        # Box/lasso selection made on the map, applied as a filter by the Table View
+        dcc.Store(id='map-selection-store'),
         
         dcc.Location(id='url', refresh=False), # Add dcc.Location
 
@@ -51,10 +54,10 @@ app.layout = dbc.Container(
                     dbc.Label("Filter by Available Date:"),
                     dcc.DatePickerRange(
                         id='date-picker-range',
-                        min_date_allowed=date(2025, 5, 1),
-                        max_date_allowed=date(2026, 12, 31),
-                        start_date=date(2025, 5, 1),
-                        end_date=date(2026, 12, 31),
+                        min_date_allowed=DEFAULT_DATE_RANGE[0],
+                        max_date_allowed=DEFAULT_DATE_RANGE[1],
+                        start_date=DEFAULT_DATE_RANGE[0],
+                        end_date=DEFAULT_DATE_RANGE[1],
                         className="w-100"
                     ),
                 ], width=6, className="my-2"),
@@ -71,31 +74,48 @@ app.layout = dbc.Container(
     fluid=True,
 )
 
+def page_listing_needs(pathname):
+    """
+    (columns, grain) of the listings the page at pathname declared in its register_page call.
+    Pages that declare nothing get every column of every listing, unknown paths get none.
+    """
+    for page in dash.page_registry.values():
+        if page['relative_path'] == pathname:
+            return page.get('listing_columns'), page.get('listing_grain', 'listing')
+    return [], 'listing'
+
 # Global callback to load data into the store on any page load
 @callback(
     Output('raw-listings-store', 'data'),
     Input('url', 'pathname') # Triggered when the URL changes (i.e., page loads)
 )
 def load_initial_data(pathname):
-    # This will load the data whenever a new page is loaded.
-    df = get_listings_data()
-    # Ensure 'available_date' is a datetime object for filtering
-    df['available_date'] = pd.to_datetime(df['available_at'])
-    return df.to_json(date_format='iso', orient='split')
+    # This will load the data whenever a new page is loaded, only the columns that page uses.
+    # Served from the shared cache, so only the first load after an ingest touches the database.
+    columns, grain = page_listing_needs(pathname)
+    if columns == []:
+        return None
+    return get_page_listings_json(columns, grain)
 
 # Global callback to filter data based on the date picker
 @callback(
     Output('filtered-listings-store', 'data'),
     Input('raw-listings-store', 'data'),
     Input('date-picker-range', 'start_date'),
-    Input('date-picker-range', 'end_date')
+    Input('date-picker-range', 'end_date'),
+    State('url', 'pathname')
 )
-def filter_data_by_date(raw_data_json, start_date, end_date):
+def filter_data_by_date(raw_data_json, start_date, end_date, pathname):
     if not raw_data_json:
         return None
-    df = pd.read_json(StringIO(raw_data_json), orient='split')
-    filtered_df = df[(df['available_date'] >= start_date) & (df['available_date'] <= end_date)]
-    return filtered_df.to_json(date_format='iso', orient='split')
+    return filter_listings_json(raw_data_json, start_date, end_date, page_listing_needs(pathname)[1])
+
+# Record latency/payload size of every callback and expose /metrics
+instrument_app(app)
+
+# Versioned JSON API for other consumers of the same aggregates, under /api/v1
+register_api(app)
 
 if __name__ == '__main__':
+    # Development server only. In production run the WSGI entry point, see app/wsgi.py
     app.run_server(debug=True)
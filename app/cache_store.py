@@ -0,0 +1,144 @@
+import fcntl
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable
+
+from app.metrics import record_cache
+from config.settings import ROOT_DIR, env_int, env_str
+
+# Shared by every worker process on the host. Entries are immutable once written,
+# because their keys include the data version or a hash of their input.
+CACHE_DIR = env_str('APP_CACHE_DIR', os.path.join(ROOT_DIR, 'data', 'app_cache'))
+MEMORY_CACHE_SIZE = env_int('APP_MEMORY_CACHE_SIZE', 32)
+MAX_AGE_SECONDS = env_int('APP_CACHE_MAX_AGE_SECONDS', 7 * 24 * 3600)
+INGEST_STAMP_FILE = 'ingest.stamp'
+
+_MISSING = object()
+# Per-process LRU in front of the disk store. Gunicorn runs several threads per worker, so it is
+# only touched under _memory_lock.
+_memory: "OrderedDict[str, Any]" = OrderedDict()
+_memory_lock = threading.Lock()
+
+
+def cache_key(*parts) -> str:
+    """Builds a cache key from arbitrary parts. Long string parts (JSON payloads) are hashed."""
+    h = hashlib.sha1()
+    for part in parts:
+        h.update(str(part).encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def _path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f"{key}.pkl")
+
+
+def _remember(key: str, value: Any):
+    with _memory_lock:
+        _memory[key] = value
+        _memory.move_to_end(key)
+        while len(_memory) > MEMORY_CACHE_SIZE:
+            _memory.popitem(last=False)
+
+
+def _recall(key: str) -> Any:
+    with _memory_lock:
+        value = _memory.get(key, _MISSING)
+        if value is not _MISSING:
+            _memory.move_to_end(key)
+    return value
+
+
+def get(key: str, default: Any = None) -> Any:
+    """Returns a cached value from memory, then disk, or default."""
+    value = _recall(key)
+    if value is not _MISSING:
+        record_cache('memory', hit=True)
+        return value
+    record_cache('memory', hit=False)
+    path = _path(key)
+    if not os.path.exists(path):
+        record_cache('disk', hit=False)
+        return default
+    try:
+        with open(path, 'rb') as f:
+            value = pickle.load(f)
+        # Reads count as use, so prune() keeps entries that are still being served
+        os.utime(path)
+    except (OSError, pickle.UnpicklingError, EOFError) as e:
+        logging.warning(f"Ignoring unreadable cache entry {path}: {e}")
+        record_cache('disk', hit=False)
+        return default
+    record_cache('disk', hit=True)
+    _remember(key, value)
+    return value
+
+
+def put(key: str, value: Any):
+    """Stores a value in memory and atomically on disk so other workers can read it."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = f"{_path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, _path(key))
+    _remember(key, value)
+
+
+def get_or_compute(key: str, compute: Callable[[], Any]) -> Any:
+    """Returns the cached value for key, computing and storing it on a miss."""
+    value = get(key, _MISSING)
+    if value is _MISSING:
+        value = compute()
+        put(key, value)
+    return value
+
+
+@contextmanager
+def exclusive_lock(name: str = 'refresh'):
+    """Cross-process lock so only one worker rebuilds the shared caches at a time."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(os.path.join(CACHE_DIR, f".{name}.lock"), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def mark_data_changed():
+    """Called after an ingest run so running app servers refresh their caches."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(os.path.join(CACHE_DIR, INGEST_STAMP_FILE), 'a'):
+        pass
+    os.utime(os.path.join(CACHE_DIR, INGEST_STAMP_FILE))
+
+
+def last_data_change() -> float:
+    """mtime of the ingest stamp, or 0 if no ingest has been recorded."""
+    try:
+        return os.path.getmtime(os.path.join(CACHE_DIR, INGEST_STAMP_FILE))
+    except OSError:
+        return 0.0
+
+
+def prune(max_age_seconds: float):
+    """
+    Removes disk entries that haven't been written or read for max_age_seconds,
+    e.g. those for old data versions or one-off date ranges.
+    """
+    if not os.path.isdir(CACHE_DIR):
+        return
+    cutoff = time.time() - max_age_seconds
+    for name in os.listdir(CACHE_DIR):
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            if name.endswith('.pkl') and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
@@ -1,35 +1,434 @@
+import threading
+import time
+from datetime import date
+from io import StringIO
 import pandas as pd
 import numpy as np
+from database.dimensions import KEY_COLUMNS
+from database.listing_schema import json_listings, read_listings
 from database.mysql_client import MySQLClient
 from scraping.get_neighborhood_leaf_nodes import get_neighborhoods
+from analytics.dedup import WATERMARK_NAME as CLUSTERS_WATERMARK_NAME, collapse_units
+from analytics.hexbin import assign_hex_columns, cell_centers, hex_column
+from analytics.sketches import AreaSketches, TDigest
+from analytics.spatial_index import GridIndex
+from analytics.text_index import TrigramIndex, address_documents
+from analytics.trends import WATERMARK_NAME as TRENDS_WATERMARK_NAME
+from app import cache_store
+from app.metrics import record_cache, timed_db_read
+from config.settings import env_str
 
 import logging
 logging.basicConfig(level=logging.INFO)
+
+# How long a data version check is trusted before asking the database again
+DATA_VERSION_TTL_SECONDS = 30
+
+# Default range of the global date picker. Cache warmup precomputes the views for this range.
+DEFAULT_DATE_RANGE = (date(2025, 5, 1), date(2026, 12, 31))
+GROUP_BY_OPTIONS = ['area_name', 'zip_code']
+
+# How neighborhood_aggregation_recursive computes medians of parent areas:
+# 'exact' re-reads every listing of the subtree, 'sketch' merges the children's t-digests (analytics/sketches.py)
+QUANTILE_MODE = env_str('QUANTILE_MODE', 'exact')
+# Columns summarized with mean and median at every level of the hierarchy
+SUMMARY_COLUMNS = ['bedroom_count', 'price', 'living_area_size']
+
+# Grains a page can ask for: every listing, or one row per unit cluster (analytics/dedup.py)
+LISTING_GRAINS = ('listing', 'unit')
+# Listing columns the map and the hierarchy aggregate, one row per unit. Shared by the dashboard
+# pages and the API so both serve the same cached stores.
+MAP_LISTING_COLUMNS = ['area_name', 'area_id', 'zip_code', 'zip_id', 'latitude', 'longitude', *SUMMARY_COLUMNS]
+HIERARCHY_LISTING_COLUMNS = ['area_name', 'area_id', 'latitude', 'longitude', *SUMMARY_COLUMNS]
+# Columns collapse_units needs for the 'unit' grain
+UNIT_GRAIN_COLUMNS = ['unit_cluster_id', 'date_updated']
+
+# Server-side caches, valid for a single data version
+_version_cache = {'version': None, 'checked_at': 0.0}
+_hex_bin_cache = {}
+_spatial_index_cache = {}
+_address_index_cache = {}
+# Listing columns loaded by page, as Series indexed by listing id
+_listing_columns_cache = {}
+# Analytics table name -> (version, checked_at), see _table_version
+_table_version_cache = {}
+
+# Area sketches of the last hierarchy built in this process (QUANTILE_MODE=sketch). Kept across data
+# versions, so the next hierarchy only folds in what changed. Guarded by _area_sketches_lock.
+_area_sketches = {'sketches': None}
+_area_sketches_lock = threading.Lock()
+
+# Grid cell size of the listings spatial index
+SPATIAL_INDEX_CELL_M = 250.0
+# Columns the spatial and address indexes are built from (plus id)
+SPATIAL_INDEX_COLUMNS = ['latitude', 'longitude']
+ADDRESS_INDEX_COLUMNS = ['street', 'display_unit', 'zip_code']
+
+@timed_db_read('listings')
 def get_listings_data() -> pd.DataFrame:
     """
-    Fetches all listings from the database and returns them as a pandas DataFrame.
-    Performs basic type conversion and cleaning.
+    Fetches all listings from the database and returns them as a pandas DataFrame
+    with the dtypes of database/listing_schema.py. Values were validated at ingest
+    (scraping/validation.py), so an unknown size is already missing.
     """
     logging.info("Fetching listings data from database...")
     try:
         with MySQLClient() as db:
             listings_query = "SELECT * FROM listings"
-            listings_df = pd.read_sql_query(listings_query, db.sqlalchemy_engine)
+            listings_df = read_listings(listings_query, db.sqlalchemy_engine)
             logging.info(f"Successfully fetched {len(listings_df)} listings.")
-
-            # Basic data cleaning
-            numeric_cols = ['latitude', 'longitude', 'bedroom_count', 'price', 'living_area_size']
-            for col in numeric_cols:
-                listings_df[col] = pd.to_numeric(listings_df[col], errors='coerce')
-
-            # lots of listings have living_area_size defaulted to 0. If unknown, set these to NaN
-            listings_df['living_area_size'] = listings_df['living_area_size'].replace(0, np.nan)
             return listings_df
         
     except Exception as e:
         logging.error(f"Failed to fetch or process listings data: {e}")
         return pd.DataFrame()
 
+@timed_db_read('data_version')
+def _query_data_version() -> str:
+    with MySQLClient() as db:
+        # Reclustering doesn't touch date_updated, so the clustering watermark is part of the version
+        rows = db.execute_query("SELECT COUNT(*), MAX(date_updated), "
+                                "(SELECT MAX(value) FROM analytics_watermarks WHERE name = %s) FROM listings",
+                                (CLUSTERS_WATERMARK_NAME,))
+    count, last_updated, clustered = rows[0] if rows else (0, None, None)
+    return f"{count}:{last_updated}:{clustered}"
+
+def get_data_version(force: bool = False) -> str:
+    """
+    Returns a cheap identifier of the current listings data. It changes whenever a listing
+    is inserted or updated or unit clusters change, so it can be used to key caches. Checked
+    at most once per TTL.
+
+    :param force: Skip the TTL and ask the database.
+    """
+    now = time.monotonic()
+    if (not force and _version_cache['version'] is not None
+            and now - _version_cache['checked_at'] < DATA_VERSION_TTL_SECONDS):
+        return _version_cache['version']
+    try:
+        version = _query_data_version()
+    except Exception as e:
+        logging.error(f"Failed to fetch data version: {e}")
+        version = _version_cache['version'] or 'unknown'
+    if version != _version_cache['version']:
+        _hex_bin_cache.clear()
+        _spatial_index_cache.clear()
+        _address_index_cache.clear()
+        _listing_columns_cache.clear()
+    _version_cache.update(version=version, checked_at=now)
+    return version
+
+def _load_listings_frame() -> pd.DataFrame:
+    df = get_listings_data()
+    if not df.empty:
+        df['available_date'] = pd.to_datetime(df['available_at'])
+        # Rows ingested before the hex bin migration don't have cells yet
+        if hex_column(9) not in df.columns or df[hex_column(9)].isna().all():
+            df = assign_hex_columns(df)
+    return df
+
+def get_cached_listings() -> pd.DataFrame:
+    """
+    Returns the listings DataFrame, only reloading it from the database when the data version changes.
+    The frame is shared with the other worker processes through the disk cache store.
+    """
+    key = cache_store.cache_key('listings-frame', get_data_version())
+    return cache_store.get_or_compute(key, _load_listings_frame)
+
+def get_listings_json() -> str:
+    """The listings frame serialized for the raw-listings-store, cached per data version."""
+    key = cache_store.cache_key('listings-json', get_data_version())
+    return cache_store.get_or_compute(key, lambda: json_listings(get_cached_listings()).to_json(date_format='iso', orient='split'))
+
+@timed_db_read('listing_columns')
+def _query_listing_columns(columns: list) -> pd.DataFrame:
+    with MySQLClient() as db:
+        known = set(db.get_table_columns('listings'))
+        unknown = [col for col in columns if col not in known]
+        if unknown:
+            raise ValueError(f"Unknown listings columns: {unknown}")
+        return read_listings(f"SELECT {', '.join(['id', *columns])} FROM listings", db.sqlalchemy_engine)
+
+def load_listing_columns(columns: list) -> pd.DataFrame:
+    """
+    Listings with only the given columns (plus id). Only columns not loaded yet for the current
+    data version are read from the database, the others are reused.
+    """
+    get_data_version()
+    columns = [col for col in dict.fromkeys(columns) if col != 'id']
+    missing = [col for col in columns if col not in _listing_columns_cache]
+    if missing or 'id' not in _listing_columns_cache:
+        logging.info(f"Loading listings columns: {missing}")
+        try:
+            df = _query_listing_columns(missing).set_index('id')
+        except Exception as e:
+            logging.error(f"Failed to fetch listings columns {missing}: {e}")
+            return pd.DataFrame()
+        _listing_columns_cache['id'] = df.index.to_series()
+        _listing_columns_cache.update({col: df[col] for col in missing})
+    index = _listing_columns_cache['id'].index
+    return pd.DataFrame({col: _listing_columns_cache[col] for col in columns}, index=index).rename_axis('id').reset_index()
+
+def get_page_listings(columns: list, grain: str = 'listing') -> pd.DataFrame:
+    """
+    The listings a page declared it needs: its columns, id and available_date (for the date filter),
+    and for the 'unit' grain the columns collapse_units needs.
+    """
+    if grain not in LISTING_GRAINS:
+        raise ValueError(f"Unknown grain {grain!r}, expected one of {LISTING_GRAINS}")
+    needed = ['available_at', *columns, *(UNIT_GRAIN_COLUMNS if grain == 'unit' else [])]
+    df = load_listing_columns(needed)
+    if df.empty:
+        return df
+    df['available_date'] = pd.to_datetime(df['available_at'])
+    return df if 'available_at' in columns else df.drop(columns='available_at')
+
+def get_page_listings_json(columns: list = None, grain: str = 'listing') -> str:
+    """
+    The raw-listings-store payload of a page, cached per data version and column set.
+
+    :param columns: Listing columns the page uses. None loads every column (get_listings_json).
+    :param grain: 'listing' or 'unit', see LISTING_GRAINS.
+    """
+    if columns is None:
+        return get_listings_json()
+    key = cache_store.cache_key('page-listings-json', get_data_version(), grain, *sorted(set(columns)))
+    return cache_store.get_or_compute(
+        key, lambda: json_listings(get_page_listings(columns, grain)).to_json(date_format='iso', orient='split'))
+
+def filter_listings_json(listings_json: str, start_date, end_date, grain: str = 'listing') -> str:
+    """
+    Applies the global date filter to a serialized listings store, cached by payload.
+    At the 'unit' grain, the listings left are then collapsed to one per unit cluster.
+    """
+    def compute():
+        df = filter_by_available_date(pd.read_json(StringIO(listings_json), orient='split'), start_date, end_date)
+        if grain == 'unit':
+            df = collapse_units(df)
+        return json_listings(df).to_json(date_format='iso', orient='split')
+    return cache_store.get_or_compute(cache_store.cache_key('filtered-json', listings_json, start_date, end_date, grain),
+                                      compute)
+
+def aggregate_listings_json(listings_json: str, group_by: str) -> str:
+    """data_aggregation over a serialized listings store, cached by payload."""
+    def compute():
+        df = pd.read_json(StringIO(listings_json), orient='split')
+        return data_aggregation(df, group_by).to_json(date_format='iso', orient='split')
+    return cache_store.get_or_compute(cache_store.cache_key('agg-json', listings_json, group_by), compute)
+
+def hierarchy_listings_json(listings_json: str) -> str:
+    """neighborhood_aggregation_recursive over a serialized listings store, cached by payload."""
+    def compute():
+        df = pd.read_json(StringIO(listings_json), orient='split')
+        if QUANTILE_MODE != 'sketch':
+            return neighborhood_aggregation_recursive(df).to_json(date_format='iso', orient='split')
+        return _hierarchy_from_area_sketches(df).to_json(date_format='iso', orient='split')
+    return cache_store.get_or_compute(cache_store.cache_key('hierarchy-json', listings_json, QUANTILE_MODE), compute)
+
+def _hierarchy_from_area_sketches(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sketch mode hierarchy that refreshes the last area sketches instead of building new ones. They are
+    also stored per data version in the cache store, so other workers and restarts start from them.
+    Whichever copy a worker starts from is fine: refresh checks every listing against its fingerprint.
+    """
+    key = cache_store.cache_key('area-sketches', get_data_version())
+    with _area_sketches_lock:
+        sketches = _area_sketches['sketches'] or cache_store.get(key) or AreaSketches(SUMMARY_COLUMNS)
+        result = neighborhood_aggregation_recursive(df, quantile_mode='sketch', sketches=sketches)
+        _area_sketches['sketches'] = sketches
+        cache_store.put(key, sketches)
+    return result
+
+@timed_db_read('analytics_version')
+def _query_table_version(query: str, params: tuple = None) -> str:
+    with MySQLClient() as db:
+        rows = db.execute_query(query, params)
+    # An aggregate always returns a row, execute_query returns none on errors
+    if not rows:
+        raise RuntimeError(f"version query failed: {query}")
+    return str(rows[0][0])
+
+def _table_version(name: str, query: str, params: tuple = None) -> str:
+    """
+    Identifier of the current output of an analytics job, from a one-value query such as the table's
+    latest scored_at. Like get_data_version it is checked at most once per TTL. Raises when the query fails.
+    """
+    now = time.monotonic()
+    cached = _table_version_cache.get(name)
+    if cached is not None and now - cached[1] < DATA_VERSION_TTL_SECONDS:
+        return cached[0]
+    version = _query_table_version(query, params)
+    _table_version_cache[name] = (version, now)
+    return version
+
+@timed_db_read('listing_comps')
+def _load_comp_scores() -> pd.DataFrame:
+    with MySQLClient() as db:
+        query = ("SELECT listing_id AS id, comp_count, comp_median_price, price_percentile, max_comp_distance_m "
+                 "FROM listing_comps WHERE price_percentile IS NOT NULL")
+        return pd.read_sql_query(query, db.sqlalchemy_engine)
+
+def get_comp_scores() -> pd.DataFrame:
+    """
+    Comparable-listing scores (see analytics/comps.py), cached per scoring run. The comps job rewrites
+    listing_comps without touching listings, so the key is its latest scored_at, not the data version.
+    Failures return an empty frame and aren't cached.
+    """
+    try:
+        version = _table_version('listing_comps', "SELECT MAX(scored_at) FROM listing_comps")
+        return cache_store.get_or_compute(cache_store.cache_key('listing-comps', version), _load_comp_scores)
+    except Exception as e:
+        logging.error(f"Failed to fetch comparable scores: {e}")
+        return pd.DataFrame(columns=['id', 'comp_count', 'comp_median_price', 'price_percentile', 'max_comp_distance_m'])
+
+@timed_db_read('weekly_trends')
+def _load_weekly_trends() -> pd.DataFrame:
+    with MySQLClient() as db:
+        trends_df = pd.read_sql_query("SELECT * FROM weekly_trends ORDER BY week_start", db.sqlalchemy_engine)
+    trends_df['week_start'] = pd.to_datetime(trends_df['week_start'])
+    trends_df['bedroom_count'] = pd.to_numeric(trends_df['bedroom_count'], errors='coerce')
+    return trends_df
+
+def get_weekly_trends() -> pd.DataFrame:
+    """
+    Weekly trend rows (see analytics/trends.py), cached per trends run: the key is the job's watermark
+    in analytics_watermarks. Failures return an empty frame and aren't cached.
+    """
+    try:
+        version = _table_version('weekly_trends', "SELECT MAX(value) FROM analytics_watermarks WHERE name = %s",
+                                 (TRENDS_WATERMARK_NAME,))
+        return cache_store.get_or_compute(cache_store.cache_key('weekly-trends', version), _load_weekly_trends)
+    except Exception as e:
+        logging.error(f"Failed to fetch weekly trends: {e}")
+        return pd.DataFrame()
+
+def filter_by_available_date(df: pd.DataFrame, start_date, end_date) -> pd.DataFrame:
+    """Same date filter as the global date picker callback in app.py. A missing bound leaves that side open."""
+    if df.empty:
+        return df
+    if start_date:
+        df = df[df['available_date'] >= start_date]
+    if end_date:
+        df = df[df['available_date'] <= end_date]
+    return df
+
+def get_hex_bins(zoom: int, start_date=None, end_date=None) -> pd.DataFrame:
+    """
+    Aggregates listings into the precomputed hex cells of one zoom level. Computed once per
+    (data version, zoom, date range) so panning only filters the resulting bin table.
+
+    :return: One row per cell with cell_id, latitude, longitude (cell centre), listing_count and price_median.
+    """
+    get_data_version()
+    key = (_version_cache['version'], zoom, start_date, end_date)
+    record_cache('hex_bins', hit=key in _hex_bin_cache)
+    if key in _hex_bin_cache:
+        return _hex_bin_cache[key]
+    col = hex_column(zoom)
+    df = get_page_listings([col, 'price', 'latitude', 'longitude'])
+    if df is None or df.empty:
+        return pd.DataFrame(columns=['cell_id', 'latitude', 'longitude', 'listing_count', 'price_median'])
+    # Rows ingested before the hex bin migration don't have cells yet
+    if df[col].isna().all():
+        df = assign_hex_columns(df)
+
+    df = filter_by_available_date(df, start_date, end_date).dropna(subset=[col])
+    bins = df.groupby(col).agg(listing_count=('id', 'count'), price_median=('price', 'median')).reset_index()
+    bins = bins.rename(columns={col: 'cell_id'})
+    bins['cell_id'] = bins['cell_id'].astype('int64')
+    bins['latitude'], bins['longitude'] = cell_centers(bins['cell_id'].to_numpy(), zoom)
+    _hex_bin_cache[key] = bins
+    return bins
+
+def get_spatial_index():
+    """
+    Grid index over the coordinates of all listings, built once per data version.
+
+    :return: (index, listing ids), where query positions from the index are positions into the ids array.
+    """
+    version = get_data_version()
+    record_cache('spatial_index', hit=version in _spatial_index_cache)
+    if version not in _spatial_index_cache:
+        df = load_listing_columns(SPATIAL_INDEX_COLUMNS)
+        if df is None or df.empty:
+            index = GridIndex([], [], SPATIAL_INDEX_CELL_M)
+            ids = np.empty(0, dtype='int64')
+        else:
+            index = GridIndex(df['latitude'].to_numpy(dtype='float64'), df['longitude'].to_numpy(dtype='float64'),
+                              SPATIAL_INDEX_CELL_M)
+            ids = df['id'].to_numpy()
+        _spatial_index_cache[version] = (index, ids)
+    return _spatial_index_cache[version]
+
+def query_radius(latitude: float, longitude: float, radius_m: float) -> np.ndarray:
+    """Ids of the listings within radius_m metres of a point."""
+    index, ids = get_spatial_index()
+    return ids[index.query_radius(latitude, longitude, radius_m)]
+
+def query_bbox(lat_min: float, lat_max: float, lon_min: float, lon_max: float) -> np.ndarray:
+    """Ids of the listings inside a latitude/longitude box."""
+    index, ids = get_spatial_index()
+    return ids[index.query_bbox(lat_min, lat_max, lon_min, lon_max)]
+
+def query_polygon(latitudes, longitudes) -> np.ndarray:
+    """Ids of the listings inside a polygon ring."""
+    index, ids = get_spatial_index()
+    return ids[index.query_polygon(latitudes, longitudes)]
+
+def select_listing_ids(selection: dict) -> np.ndarray:
+    """
+    Ids of the listings inside a map selection, as stored in map-selection-store:
+    {'bbox': [lat_min, lat_max, lon_min, lon_max]} for a box, {'lasso': {'lat': [...], 'lon': [...]}} for a lasso.
+    """
+    if selection.get('bbox'):
+        return query_bbox(*selection['bbox'])
+    if selection.get('lasso'):
+        return query_polygon(selection['lasso']['lat'], selection['lasso']['lon'])
+    return np.empty(0, dtype='int64')
+
+def get_address_index():
+    """
+    Trigram index over the street, unit and zip code of all listings, built once per data version.
+
+    :return: (index, listing ids), where result positions from the index are positions into the ids array.
+    """
+    version = get_data_version()
+    record_cache('address_index', hit=version in _address_index_cache)
+    if version not in _address_index_cache:
+        df = load_listing_columns(ADDRESS_INDEX_COLUMNS)
+        if df is None or df.empty:
+            _address_index_cache[version] = (TrigramIndex([]), np.empty(0, dtype='int64'))
+        else:
+            _address_index_cache[version] = (TrigramIndex(address_documents(df)), df['id'].to_numpy())
+    return _address_index_cache[version]
+
+def search_addresses(query: str, limit: int = 500) -> pd.Series:
+    """
+    Typo-tolerant search of listing addresses (street, unit, zip code) over all listings.
+
+    :return: Match scores indexed by listing id, best first.
+    """
+    index, ids = get_address_index()
+    positions, scores = index.search(query, limit=limit)
+    return pd.Series(scores, index=ids[positions], name='score')
+
+@timed_db_read('listing_coordinates')
+def get_listing_coordinates() -> pd.DataFrame:
+    """
+    Fetches only the grouping keys and coordinates of all listings.
+    Used to derive map geometry for groups that have no boundary data.
+    """
+    logging.info("Fetching listing coordinates from database...")
+    try:
+        with MySQLClient() as db:
+            query = "SELECT area_name, zip_code, latitude, longitude FROM listings"
+            return read_listings(query, db.sqlalchemy_engine)
+
+    except Exception as e:
+        logging.error(f"Failed to fetch listing coordinates: {e}")
+        return pd.DataFrame()
+
+@timed_db_read('neighborhoods')
 def get_neighborhood_data() -> pd.DataFrame:
     """
     Fetches all listings from the database and returns them as a pandas DataFrame.
@@ -50,11 +449,26 @@ def get_neighborhood_data() -> pd.DataFrame:
         logging.error(f"Failed to fetch or process neighborhood data: {e}")
         return pd.DataFrame()
 
+def _group_key(df: pd.DataFrame, group_by_col: str) -> str:
+    """
+    The integer key of group_by_col (database/dimensions.py) if every row has one, else group_by_col.
+    A column that is already numeric (zip codes read back from JSON) is grouped on directly.
+    """
+    key = KEY_COLUMNS.get(group_by_col)
+    if key in df.columns and not pd.api.types.is_numeric_dtype(df[group_by_col]) and df[key].notna().all():
+        return key
+    return group_by_col
+
 def data_aggregation(df: pd.DataFrame, group_by_col: str) -> pd.DataFrame:
     if df.empty or group_by_col not in df.columns:
         return pd.DataFrame()
 
     logging.info(f"Aggregating data by {group_by_col}...")
+
+    # The same unit listed by several brokers counts once, so listing_count is distinct units
+    df = collapse_units(df)
+    # Averaged in float64, like area_partials: float32 means drift over large groups
+    df = df.astype({col: 'float64' for col in ['latitude', 'longitude'] + SUMMARY_COLUMNS if col in df.columns})
     
     # Define aggregations
     aggs = {
@@ -69,8 +483,16 @@ def data_aggregation(df: pd.DataFrame, group_by_col: str) -> pd.DataFrame:
     # # Filter out rows where the grouping key is null. Cannot happen based on data model
     # df_filtered = df.dropna(subset=[group_by_col])
 
-    # Perform aggregation
-    agg_df = df.groupby(group_by_col).agg(aggs).reset_index()
+    # Perform aggregation, on the integer key when there is one: much cheaper than strings
+    # observed=True: a categorical key must not produce rows for areas filtered out of df
+    key = _group_key(df, group_by_col)
+    agg_df = df.groupby(key, observed=True).agg(aggs)
+    if key != group_by_col:
+        # Same rows, in the same order, as grouping on the names
+        names = df.drop_duplicates(key).set_index(key)[group_by_col]
+        agg_df.insert(0, group_by_col, names.reindex(agg_df.index).to_numpy())
+        agg_df = agg_df.sort_values(group_by_col, kind='stable')
+    agg_df = agg_df.reset_index(drop=key != group_by_col)
 
     # Flatten the multi-level column index
     agg_df.columns = ['_'.join(col).strip() if isinstance(col, tuple) and col[1] else col[0] for col in agg_df.columns.values]
@@ -85,19 +507,109 @@ def data_aggregation(df: pd.DataFrame, group_by_col: str) -> pd.DataFrame:
     return agg_df
 
 
-def neighborhood_aggregation_recursive(listings_df: pd.DataFrame) -> pd.DataFrame:
+def area_partials(listings: pd.DataFrame, group_col: str = 'area_name') -> pd.DataFrame:
+    """
+    Mergeable per-area state: listing count plus sum and non-null count of each averaged column.
+    Partials of disjoint sets of listings combine by adding them up.
+
+    :param group_col: Column the partials are keyed by, area_name or zip_code.
+    """
+    cols = ['latitude', 'longitude'] + SUMMARY_COLUMNS
+    # Summed in float64, the float32 listing columns would lose precision over large areas
+    values = listings[cols].apply(pd.to_numeric, errors='coerce').astype('float64')
+    parts = pd.concat([values.add_suffix('_sum'), values.notna().astype('int64').add_suffix('_count')], axis=1)
+    parts['rows'] = 1
+    parts[group_col] = listings[group_col].to_numpy()
+    return parts.groupby(group_col, observed=True).sum()
+
+def rollup_area_partials(partials: pd.DataFrame, sketches: AreaSketches, neighborhoods: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rolls per-area partials and quantile sketches up the neighborhood tree, deepest level first.
+    Each area covers its own listings plus everything below it. Means come from the summed partials,
+    medians from merging the children's sketches. Returns the same frame as neighborhood_aggregation_recursive.
+    """
+    own = partials.reindex(neighborhoods['name'])
+    area_listing_count = own['rows'].fillna(0)
+    own = own.fillna(0)
+    # Same listing_count as the exact path, where an area without listings of its own still adds one row
+    own['rows'] = own['rows'].clip(lower=1)
+
+    children = neighborhoods.groupby('parent_name')['name'].apply(list).to_dict()
+    totals, digests = {}, {}
+    for name in neighborhoods.sort_values('level', ascending=False)['name']:
+        kids = [k for k in children.get(name, []) if k in totals]
+        totals[name] = own.loc[name] + sum((totals[k] for k in kids), 0)
+        digests[name] = {col: TDigest.merge_all([sketches.get(name, col) or TDigest()] + [digests[k][col] for k in kids],
+                                                sketches.compression)
+                         for col in SUMMARY_COLUMNS}
+
+    rows = []
+    for name in neighborhoods['name']:
+        total = totals[name]
+        row = {'name': name}
+        for col in ['latitude', 'longitude']:
+            row[col] = total[f'{col}_sum'] / total[f'{col}_count'] if total[f'{col}_count'] else np.nan
+        for col in SUMMARY_COLUMNS:
+            row[f'{col}_mean'] = total[f'{col}_sum'] / total[f'{col}_count'] if total[f'{col}_count'] else np.nan
+            row[f'{col}_median'] = digests[name][col].median()
+        row['listing_count'] = int(total['rows'])
+        row['area_listing_count'] = float(area_listing_count[name])
+        rows.append(row)
+
+    final_agg_df = pd.merge(neighborhoods[['id', 'name', 'parent_id', 'level', 'parent_name']], pd.DataFrame(rows),
+                            on='name', how='left')
+    final_agg_df.loc[final_agg_df['id'] == 1, 'parent_name'] = 'All'
+    return final_agg_df
+
+def neighborhood_aggregation_sketch(listings: pd.DataFrame, neighborhoods: pd.DataFrame,
+                                    sketches: AreaSketches = None) -> pd.DataFrame:
+    """
+    neighborhood_aggregation_recursive in sketch mode: one pass over the listings, then a rollup of per-area state.
+
+    :param sketches: Area sketches of an earlier call to refresh in place (needs an id column in listings).
+    """
+    if neighborhoods.empty:
+        logging.warning("Input DataFrame is empty.")
+        return pd.DataFrame()
+    logging.info("Aggregating data by neighborhood with quantile sketches...")
+    if sketches is None:
+        sketches = AreaSketches(SUMMARY_COLUMNS).update(listings)
+    else:
+        sketches.refresh(listings)
+    final_agg_df = rollup_area_partials(area_partials(listings), sketches, neighborhoods)
+    logging.info("Neighborhood hierarchical aggregation complete.")
+    return final_agg_df
+
+def neighborhood_aggregation_recursive(listings_df: pd.DataFrame, quantile_mode: str = None,
+                                       neighborhoods: pd.DataFrame = None, sketches: AreaSketches = None) -> pd.DataFrame:
     """
     Alternative implementation of data aggregation by the specified column.
     This version includes logging and handles edge cases.
     
     :param df: The input DataFrame of listings.
-    :param group_by_col: The column to group by ('area_name' or 'zip_code').
+    :param quantile_mode: 'exact' or 'sketch', see QUANTILE_MODE. Defaults to QUANTILE_MODE.
+    :param neighborhoods: get_neighborhood_data() output, if already loaded.
+    :param sketches: Sketch mode only: area sketches of an earlier call, refreshed instead of rebuilt.
     :return: A DataFrame with aggregated metrics.
     """
-    listings = listings_df[['external_id', 'area_name', 'latitude', 'longitude', 'bedroom_count', 'price', 'living_area_size', 'state', 'zip_code']]
-    neighborhoods = get_neighborhood_data()
+    # One row per distinct unit (see analytics/dedup.py)
+    listings = collapse_units(listings_df)
+    # Listings join the tree on area_id where every listing has one, else on the area name
+    area_key = _group_key(listings, 'area_name')
+    columns = list(dict.fromkeys(['area_name', area_key, 'latitude', 'longitude', *SUMMARY_COLUMNS]))
+    if neighborhoods is None:
+        neighborhoods = get_neighborhood_data()
     neighborhoods = neighborhoods[['id', 'name', 'parent_id', 'level', 'parent_name']]
-    df = pd.merge(neighborhoods, listings, left_on='name', right_on='area_name', how='left')  
+    if (quantile_mode or QUANTILE_MODE) == 'sketch':
+        # Refreshing sketches tells listings apart by id
+        ids = ['id'] if sketches is not None else []
+        return neighborhood_aggregation_sketch(listings[[*ids, *columns]], neighborhoods, sketches)
+    listings = listings[columns]
+    if area_key == 'area_id':
+        tree_key, joined = 'id', listings.drop(columns='area_name').astype({'area_id': 'int64'})
+    else:
+        tree_key, joined = 'name', listings
+    df = pd.merge(neighborhoods, joined, left_on=tree_key, right_on=area_key, how='left')
 
     if df.empty:
         logging.warning("Input DataFrame is empty.")
@@ -138,12 +650,11 @@ def neighborhood_aggregation_recursive(listings_df: pd.DataFrame) -> pd.DataFram
 
 
     # # looks like the sizes of treemap shouldn't count their children (double sized). just overwrite this
-    listing_counts = listings.groupby('area_name')['external_id'].agg('count').reset_index()
-    listing_counts = listing_counts.rename(columns={'external_id': 'area_listing_count',
-                                                    'area_name': 'name'})
+    listing_counts = joined.groupby(area_key, observed=True).size().reset_index(name='area_listing_count')
+    listing_counts = listing_counts.rename(columns={area_key: tree_key})
     final_agg_df = pd.merge(final_agg_df, listing_counts, 
-                            on='name', how='left')
-    final_agg_df['area_listing_count'].fillna(0, inplace=True)
+                            on=tree_key, how='left')
+    final_agg_df['area_listing_count'] = final_agg_df['area_listing_count'].fillna(0)
 
     # # refill the parent of the root node 
     # final_agg_df.loc[final_agg_df['id'] == 1, 'parent_name'] = 'All'
@@ -0,0 +1,273 @@
+"""
+Figure builders shared by the dashboard pages and the static site build (tools/build_static_site.py).
+They only take data frames, so they can run outside a Dash app, e.g. in worker processes.
+"""
+import igraph as ig
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from analytics.hierarchy import EXCLUDED_AREA_IDS
+from app.geometry import location_keys
+
+# Metrics of the aggregated frames, shared by the map and treemap
+METRIC_OPTIONS = {
+    'price_mean': 'Mean Price',
+    'price_median': 'Median Price',
+    'bedroom_count_mean': 'Mean Bedrooms',
+    'bedroom_count_median': 'Median Bedrooms',
+    'living_area_size_mean': 'Mean Size (sqft)',
+    'living_area_size_median': 'Median Size (sqft)',
+    'listing_count': 'Number of Listings'
+}
+
+
+SIZE_MAX = 30       # Max bubble diameter in px, same as px.scatter_mapbox(size_max=30)
+DEFAULT_SIZE = 8    # Bubble diameter when no size metric is selected
+
+
+def get_format_string(metric):
+    """Returns a d3-format string based on the metric name."""
+    if 'price' in metric:
+        return ':$,.0f'  # Format as currency, no decimals
+    if 'listing' in metric:
+        return ':.0f'
+    return ':.1f'       # Default to one decimal place for other floats (like size/bedrooms)
+
+
+def get_hovertemplate(color_metric, size_metric):
+    """
+    Builds the hover template. Every metric is shipped once in customdata (in METRIC_OPTIONS order),
+    so changing metrics only needs a new template string, not new hover data.
+    """
+    metrics = list(METRIC_OPTIONS)
+    shown = ['listing_count', color_metric]
+    # If a size metric is selected and it's different from the color metric, add it to hover data
+    if size_metric and size_metric not in shown:
+        shown.append(size_metric)
+    lines = ['<b>%{hovertext}</b>', '']
+    for metric in shown:
+        lines.append(f"{METRIC_OPTIONS[metric]}=%{{customdata[{metrics.index(metric)}]{get_format_string(metric)}}}")
+    return '<br>'.join(lines) + '<extra></extra>'
+
+
+def get_marker_update(df, color_metric, size_metric):
+    """
+    Computes the parts of the figure that depend on the selected metrics: marker color/size arrays,
+    the colorbar range and the hover template. Used both for the full build and for patches.
+    """
+    color = df[color_metric]
+    if size_metric:
+        size = df[size_metric].fillna(0).clip(lower=0)
+        size_max = size.max()
+        # Same area-based scaling plotly express uses for size_max
+        sizeref = 2.0 * size_max / (SIZE_MAX ** 2) if size_max > 0 else 1
+        marker_size, sizemode = size.tolist(), 'area'
+    else:
+        marker_size, sizeref, sizemode = DEFAULT_SIZE, 1, 'diameter'
+    return {
+        'color': color.tolist(),
+        'size': marker_size,
+        'sizeref': sizeref,
+        'sizemode': sizemode,
+        'cmin': color.min(),
+        'cmax': color.max(),
+        'colorbar_title': METRIC_OPTIONS.get(color_metric, color_metric),
+        'hovertemplate': get_hovertemplate(color_metric, size_metric),
+    }
+
+
+def marker_update_spec():
+    """
+    What the dashboard's clientside metric switch needs to redo get_marker_update in the browser
+    from a figure's customdata: the customdata column order, labels, hover templates and bubble sizes.
+    """
+    metrics = list(METRIC_OPTIONS)
+    return {
+        'metrics': metrics,
+        'labels': METRIC_OPTIONS,
+        'hovertemplates': {f"{color}|{size or ''}": get_hovertemplate(color, size)
+                           for color in metrics for size in [None, *metrics]},
+        'size_max': SIZE_MAX,
+        'default_size': DEFAULT_SIZE,
+    }
+
+
+def build_map_figure(df, color_metric, size_metric, group_by):
+    """Constructs the full scatter map figure for the aggregated data."""
+    update = get_marker_update(df, color_metric, size_metric)
+    fig = go.Figure(go.Scattermapbox(
+        lat=df['latitude'],
+        lon=df['longitude'],
+        mode='markers',
+        hovertext=df[group_by],
+        customdata=df[list(METRIC_OPTIONS)].to_numpy(),
+        hovertemplate=update['hovertemplate'],
+        marker={
+            'color': update['color'],
+            'coloraxis': 'coloraxis',
+            'size': update['size'],
+            'sizeref': update['sizeref'],
+            'sizemode': update['sizemode'],
+        },
+    ))
+    return _apply_map_layout(fig, df, update, group_by)
+
+
+def build_choropleth_figure(df, color_metric, group_by, geojson):
+    """Constructs a polygon choropleth for the groups that have geometry."""
+    update = get_marker_update(df, color_metric, None)
+    fig = go.Figure(go.Choroplethmapbox(
+        geojson=geojson,
+        locations=location_keys(df[group_by], group_by),
+        featureidkey='id',
+        z=update['color'],
+        coloraxis='coloraxis',
+        hovertext=df[group_by],
+        customdata=df[list(METRIC_OPTIONS)].to_numpy(),
+        hovertemplate=update['hovertemplate'],
+        marker={'opacity': 0.6, 'line': {'width': 0.5}},
+    ))
+    return _apply_map_layout(fig, df, update, group_by)
+
+
+def _apply_map_layout(fig, df, update, group_by):
+    fig.update_layout(
+        coloraxis={
+            'colorscale': 'Turbo',
+            'cmin': update['cmin'],
+            'cmax': update['cmax'],
+            'colorbar': {'title': {'text': update['colorbar_title']}},
+        },
+        mapbox={
+            'style': 'carto-positron',
+            'zoom': 10,
+            'center': {'lat': df['latitude'].mean(), 'lon': df['longitude'].mean()},
+        },
+        margin={"r":0,"t":0,"l":0,"b":0},
+        # Keep the user's pan/zoom when the figure is rebuilt
+        uirevision=group_by,
+    )
+    return fig
+
+
+def build_treemap_figure(df, metric):
+    """Treemap of the neighborhood hierarchy (neighborhood_aggregation_recursive output) colored by a metric."""
+    hover_data = {
+        'name': True,
+        'parent_name': False,
+        'area_listing_count': False,
+        'listing_count': True,
+        metric: get_format_string(metric) if metric else False,
+    }
+    fig = px.treemap(
+        df,
+        names='name',
+        parents='parent_name',
+        values='area_listing_count', # Size of the sectors
+        color=metric if metric else None, # Color of the sectors based on the selected metric
+        hover_data=hover_data,
+        color_continuous_scale='Turbo',
+        range_color=[df[metric].min(), df[metric].max()],
+        title=f"NYC Neighborhoods by {METRIC_OPTIONS.get(metric, metric)}"
+    )
+    fig.update_layout(margin={"r":0,"t":40,"l":0,"b":0})
+    return fig
+
+
+def neighborhood_tree_frame(neighborhoods):
+    """Neighborhoods as a frame with parent names, sorted by level, without the excluded placeholder areas."""
+    df = pd.DataFrame(neighborhoods)
+    df = df[~df['id'].isin(EXCLUDED_AREA_IDS)]  # Remove Unassigned and childless NNJ
+    df['parent_name'] = df['parent_id'].map(df.set_index('id')['name'])
+    return df.sort_values(by=['level', 'name'])
+
+
+HIERARCHY_CHARTS = {
+    'treemap': px.treemap,
+    'sunburst': px.sunburst,
+    'icicle': px.icicle,
+}
+
+
+def build_hierarchy_chart(df, kind):
+    """Treemap, sunburst or icicle of the bare neighborhood tree (neighborhood_tree_frame output)."""
+    return HIERARCHY_CHARTS[kind](names=df['name'], parents=df['parent_name'])
+
+
+def build_tree_diagram(neighborhoods):
+    """
+    Node-link diagram of the neighborhood tree, laid out with Reingold-Tilford.
+    Returns None when the tree has no root.
+    """
+    neighborhoods = [dict(hood) for hood in neighborhoods]
+    # Create a mapping from neighborhood ID to its index in the list
+    id_to_index = {hood['id']: i for i, hood in enumerate(neighborhoods)}
+    all_ids = {hood['id'] for hood in neighborhoods}
+    root_nodes = [hood for hood in neighborhoods if hood['parent_id'] not in all_ids]
+    if not root_nodes:
+        return None
+
+    # If there are multiple root nodes. Create a super root
+    if len(root_nodes) > 1:
+        super_root = {
+            'id': -1,
+            'name': 'All',
+            'parent_id': -1,
+            'level': -1
+        }
+        neighborhoods.append(super_root)
+        id_to_index[super_root['id']] = len(neighborhoods) - 1
+        for hood in root_nodes:
+            hood['parent_id'] = super_root['id']
+        root_id = super_root['id']
+    else:
+        # There is only one root node
+        root_id = root_nodes[0]['id']
+
+    # Create the graph
+    g = ig.Graph()
+    g.add_vertices(len(neighborhoods))
+    edges = []
+    for hood in neighborhoods:
+        if hood['parent_id'] in id_to_index and hood['parent_id'] != hood['id']:
+            edges.append((id_to_index[hood['parent_id']], id_to_index[hood['id']]))
+    g.add_edges(edges)
+    g.vs['label'] = [hood['name'] for hood in neighborhoods]
+    layout = g.layout_reingold_tilford(root=[id_to_index[root_id]], mode='all')
+
+    fig = go.Figure()
+
+    # Add edges
+    edge_x = []
+    edge_y = []
+    for edge in g.get_edgelist():
+        edge_x.extend([layout[edge[0]][0], layout[edge[1]][0], None])
+        edge_y.extend([layout[edge[0]][1], layout[edge[1]][1], None])
+    fig.add_trace(go.Scatter(
+        x=edge_x,
+        y=edge_y,
+        mode='lines',
+        line=dict(width=1, color='black'),
+        hoverinfo='none'
+    ))
+
+    # Add nodes
+    fig.add_trace(go.Scatter(
+        x=[layout[i][0] for i in range(len(neighborhoods))],
+        y=[layout[i][1] for i in range(len(neighborhoods))],
+        mode='markers+text',
+        text=g.vs['label'],
+        textposition="bottom center",
+        marker=dict(size=10, color='lightblue'),
+        hoverinfo='text'
+    ))
+
+    fig.update_layout(
+        title_text="Neighborhood Hierarchy",
+        showlegend=False,
+        xaxis=dict(showline=False, zeroline=False, showticklabels=False),
+        yaxis=dict(showline=False, zeroline=False, showticklabels=False, autorange='reversed'),
+        hovermode='closest'
+    )
+    return fig
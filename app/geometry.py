@@ -0,0 +1,353 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from app.metrics import record_cache
+from config.settings import ROOT_DIR, env_str
+
+# Optional local GeoJSON files. Features are matched to groups by the configured property key.
+AREA_GEOJSON_PATH = env_str('AREA_GEOJSON_PATH')
+AREA_GEOJSON_KEY = env_str('AREA_GEOJSON_KEY', 'name')
+ZIP_GEOJSON_PATH = env_str('ZIP_GEOJSON_PATH')
+ZIP_GEOJSON_KEY = env_str('ZIP_GEOJSON_KEY', 'postalCode')
+
+NEIGHBORHOODS_JSON_PATH = os.path.join(ROOT_DIR, 'data', 'neighborhoods.json')
+GEOMETRY_CACHE_DIR = env_str('GEOMETRY_CACHE_DIR', os.path.join(ROOT_DIR, 'data', 'geometry_cache'))
+
+# Douglas-Peucker tolerances (degrees) for each resolution level, coarsest first.
+# 0.002 deg is ~170m at NYC's latitude, 0.0001 deg is ~8m.
+SIMPLIFY_TOLERANCES = {
+    'low': 0.002,
+    'medium': 0.0005,
+    'high': 0.0001,
+}
+# Map zoom at which each resolution level starts being used
+RESOLUTION_MIN_ZOOM = {
+    'low': 0,
+    'medium': 11.5,
+    'high': 13.5,
+}
+
+Ring = List[Tuple[float, float]]  # [(lon, lat), ...] as in GeoJSON
+
+# Per group_by: the sources fingerprint, {group key: {resolution level: geometry}} of every boundary
+# read from the sources so far and the groups the sources have no boundary for, then the listings
+# version the hulls were built from, the hulls and the groups without any geometry for that version.
+# Kept in memory so callbacks never touch disk twice.
+GeometryCache = Dict[str, Any]
+_memory_cache: Dict[str, GeometryCache] = {}
+
+
+def resolution_for_zoom(zoom: Optional[float]) -> str:
+    """Returns the resolution level to use for a map zoom."""
+    level = 'low'
+    for name, min_zoom in RESOLUTION_MIN_ZOOM.items():
+        if zoom is not None and zoom >= min_zoom:
+            level = name
+    return level
+
+
+def location_keys(series: pd.Series, group_by: str) -> pd.Series:
+    """
+    Normalizes group keys so they match feature ids. Zip codes lose their leading zero
+    when the stores round-trip through pd.read_json, so they are re-padded here.
+    """
+    series = series.astype(object)
+    if group_by == 'zip_code':
+        return series.map(lambda z: str(int(z)).zfill(5) if pd.notna(z) and str(z).isdigit() else str(z))
+    return series.astype(str)
+
+
+def decode_polyline(encoded: str, precision: int = 5) -> Ring:
+    """
+    Decodes a Google encoded polyline (the `encoded_boundary` format in neighborhoods.json)
+    into a list of (lon, lat) points.
+    """
+    points = []
+    index = lat = lon = 0
+    factor = 10 ** precision
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                b = ord(encoded[index]) - 63
+                index += 1
+                result |= (b & 0x1f) << shift
+                shift += 5
+                if b < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        points.append((lon / factor, lat / factor))
+    return points
+
+
+def convex_hull(points: Iterable[Tuple[float, float]]) -> Ring:
+    """Andrew's monotone chain convex hull. Returns a closed ring, or [] for degenerate inputs."""
+    pts = sorted(set(points))
+    if len(pts) < 3:
+        return []
+
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    lower, upper = [], []
+    for p in pts:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], p) <= 0:
+            lower.pop()
+        lower.append(p)
+    for p in reversed(pts):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], p) <= 0:
+            upper.pop()
+        upper.append(p)
+    hull = lower[:-1] + upper[:-1]
+    if len(hull) < 3:
+        return []  # all points collinear
+    return hull + [hull[0]]
+
+
+def _point_segment_distance(p, a, b) -> float:
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    if dx == 0 and dy == 0:
+        return ((p[0] - a[0]) ** 2 + (p[1] - a[1]) ** 2) ** 0.5
+    t = max(0.0, min(1.0, ((p[0] - a[0]) * dx + (p[1] - a[1]) * dy) / (dx * dx + dy * dy)))
+    px, py = a[0] + t * dx, a[1] + t * dy
+    return ((p[0] - px) ** 2 + (p[1] - py) ** 2) ** 0.5
+
+
+def simplify_ring(ring: Ring, tolerance: float) -> Ring:
+    """
+    Douglas-Peucker simplification of a closed ring. Falls back to the original ring
+    if simplification would collapse it below a valid polygon.
+    """
+    if len(ring) <= 4:
+        return ring
+    keep = [False] * len(ring)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(ring) - 1)]
+    while stack:
+        start, end = stack.pop()
+        max_dist, max_idx = 0.0, None
+        for i in range(start + 1, end):
+            dist = _point_segment_distance(ring[i], ring[start], ring[end])
+            if dist > max_dist:
+                max_dist, max_idx = dist, i
+        if max_idx is not None and max_dist > tolerance:
+            keep[max_idx] = True
+            stack.append((start, max_idx))
+            stack.append((max_idx, end))
+    # A closed ring has identical endpoints, so force a middle point to survive
+    keep[len(ring) // 2] = True
+    simplified = [p for p, k in zip(ring, keep) if k]
+    return simplified if len(simplified) >= 4 else ring
+
+
+def _round_ring(ring: Ring, digits: int = 5) -> list:
+    return [[round(lon, digits), round(lat, digits)] for lon, lat in ring]
+
+
+def _simplify_geometry(geometry: dict, tolerance: float) -> dict:
+    """Simplifies every ring of a Polygon or MultiPolygon geometry."""
+    if geometry['type'] == 'Polygon':
+        coords = [_round_ring(simplify_ring([tuple(p) for p in ring], tolerance)) for ring in geometry['coordinates']]
+    else:
+        coords = [[_round_ring(simplify_ring([tuple(p) for p in ring], tolerance)) for ring in polygon]
+                  for polygon in geometry['coordinates']]
+    return {'type': geometry['type'], 'coordinates': coords}
+
+
+def _load_geojson_geometries(path: str, key: str, group_by: str) -> Dict[str, dict]:
+    """Reads Polygon/MultiPolygon geometries from a local GeoJSON file, keyed by a feature property."""
+    with open(path, 'r') as f:
+        collection = json.load(f)
+    geometries = {}
+    for feature in collection.get('features', []):
+        geometry = feature.get('geometry') or {}
+        name = (feature.get('properties') or {}).get(key)
+        if name is None or geometry.get('type') not in ('Polygon', 'MultiPolygon'):
+            continue
+        name = location_keys(pd.Series([name]), group_by).iloc[0]
+        geometries[name] = geometry
+    logging.info(f"Loaded {len(geometries)} {group_by} geometries from {path}.")
+    return geometries
+
+
+def _load_neighborhood_boundaries() -> Dict[str, dict]:
+    """Decodes the area boundaries shipped in data/neighborhoods.json."""
+    with open(NEIGHBORHOODS_JSON_PATH, 'r') as f:
+        areas = json.load(f).get('data', {}).get('areas', [])
+    geometries = {}
+    for area in areas:
+        encoded = (area.get('map_coordinates') or {}).get('encoded_boundary')
+        if not encoded:
+            continue
+        ring = decode_polyline(encoded)
+        if len(ring) < 3:
+            continue
+        if ring[0] != ring[-1]:
+            ring.append(ring[0])
+        geometries[area['name']] = {'type': 'Polygon', 'coordinates': [ring]}
+    return geometries
+
+
+def _source_paths(group_by: str) -> List[str]:
+    if group_by == 'zip_code':
+        return [p for p in [ZIP_GEOJSON_PATH] if p]
+    return [p for p in [AREA_GEOJSON_PATH, NEIGHBORHOODS_JSON_PATH] if p]
+
+
+def _fingerprint(group_by: str) -> str:
+    """Identifies the geometry sources of a grouping: its source files and the simplification levels."""
+    h = hashlib.sha1(group_by.encode())
+    for path in _source_paths(group_by):
+        if os.path.exists(path):
+            stat = os.stat(path)
+            h.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    h.update(json.dumps(SIMPLIFY_TOLERANCES, sort_keys=True).encode())
+    return h.hexdigest()[:16]
+
+
+def _cache_path(group_by: str) -> str:
+    return os.path.join(GEOMETRY_CACHE_DIR, f"{group_by}.json")
+
+
+def _source_geometries(group_by: str) -> Dict[str, dict]:
+    """Geometry from the local GeoJSON (if configured), then the neighborhoods.json boundaries (area_name only)."""
+    source = {}
+    if group_by == 'zip_code' and ZIP_GEOJSON_PATH and os.path.exists(ZIP_GEOJSON_PATH):
+        source.update(_load_geojson_geometries(ZIP_GEOJSON_PATH, ZIP_GEOJSON_KEY, group_by))
+    if group_by == 'area_name':
+        source.update(_load_neighborhood_boundaries())
+        if AREA_GEOJSON_PATH and os.path.exists(AREA_GEOJSON_PATH):
+            source.update(_load_geojson_geometries(AREA_GEOJSON_PATH, AREA_GEOJSON_KEY, group_by))
+    return source
+
+
+def _hull_geometries(group_by: str, keys: Sequence[str], points: Optional[pd.DataFrame]) -> Dict[str, dict]:
+    """The convex hull of each group's listing coordinates, for groups with at least 3 distinct points."""
+    hulls = {}
+    if keys and points is not None and not points.empty:
+        pts = points.dropna(subset=['latitude', 'longitude']).copy()
+        pts['key'] = location_keys(pts[group_by], group_by)
+        pts = pts[pts['key'].isin(keys)]
+        for key, group in pts.groupby('key'):
+            hull = convex_hull(zip(group['longitude'].astype(float), group['latitude'].astype(float)))
+            if hull:
+                hulls[key] = {'type': 'Polygon', 'coordinates': [hull]}
+        logging.info(f"Derived hull geometry for {len(hulls)} of {len(keys)} {group_by} groups.")
+    return hulls
+
+
+def _levels(geometry: dict) -> Dict[str, dict]:
+    return {level: _simplify_geometry(geometry, tolerance) for level, tolerance in SIMPLIFY_TOLERANCES.items()}
+
+
+def _collections(geometries: Dict[str, Dict[str, dict]], keys: Sequence[str]) -> Dict[str, dict]:
+    """{resolution level: FeatureCollection} of the keys that have geometry, features have `id` set to the key."""
+    wanted = [k for k in keys if k in geometries]
+    return {
+        level: {
+            'type': 'FeatureCollection',
+            'features': [{'type': 'Feature', 'id': k, 'properties': {}, 'geometry': geometries[k][level]}
+                         for k in wanted],
+        }
+        for level in SIMPLIFY_TOLERANCES
+    }
+
+
+def build_geometries(group_by: str, keys: Sequence[str], points: Optional[pd.DataFrame] = None) -> Dict[str, dict]:
+    """
+    Builds one FeatureCollection per resolution level for the given group keys.
+    Geometry comes from the local GeoJSON (if configured), then the neighborhoods.json boundaries
+    (area_name only), and finally the convex hull of the group's listing coordinates.
+
+    :param group_by: 'area_name' or 'zip_code'.
+    :param keys: The group keys that need geometry.
+    :param points: Listing coordinates with group_by, latitude and longitude columns, used for hulls.
+    :return: {resolution level: FeatureCollection}, features have `id` set to the group key.
+    """
+    source = _source_geometries(group_by)
+    source.update(_hull_geometries(group_by, [k for k in keys if k not in source], points))
+    return _collections({k: _levels(source[k]) for k in keys if k in source}, keys)
+
+
+def _empty_cache(fingerprint: str, points_version: str) -> GeometryCache:
+    return {'fingerprint': fingerprint, 'geometries': {}, 'missing': [],
+            'points_version': points_version, 'hulls': {}, 'unavailable': []}
+
+
+def _load_cache(group_by: str, fingerprint: str) -> Optional[GeometryCache]:
+    cached = _memory_cache.get(group_by)
+    if cached is not None and cached['fingerprint'] == fingerprint:
+        return cached
+    path = _cache_path(group_by)
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                on_disk = json.load(f)
+            if on_disk.get('fingerprint') == fingerprint and 'hulls' in on_disk:
+                _memory_cache[group_by] = on_disk
+                return on_disk
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable geometry cache {path}: {e}")
+    return None
+
+
+def get_geometries(group_by: str, keys: Sequence[str], points_loader=None,
+                   points_version: Optional[str] = None) -> Dict[str, dict]:
+    """
+    Returns the multi-resolution geometries of the given groups, cached on disk per group_by.
+    Boundaries from the source files are kept until the sources change. Hulls, and the groups
+    that have no geometry at all, are only kept for the listings they were built from, so a
+    group gets a polygon, or a bigger one, once more listings arrive.
+
+    :param group_by: 'area_name' or 'zip_code'.
+    :param keys: The group keys shown on the map.
+    :param points_loader: Callable returning listing coordinates for hull fallback. Only called when
+                          groups without cached geometry are requested.
+    :param points_version: Identifies the listings points_loader returns, e.g. the data version.
+                           Without it hulls are rebuilt on every call.
+    """
+    keys = sorted(set(keys))
+    fingerprint = _fingerprint(group_by)
+    cache = _load_cache(group_by, fingerprint) or _empty_cache(fingerprint, points_version)
+    if points_version is None or cache['points_version'] != points_version:
+        cache.update(points_version=points_version, hulls={}, unavailable=[])
+    missing, unavailable = set(cache['missing']), set(cache['unavailable'])
+    new_keys = [k for k in keys if k not in cache['geometries'] and k not in cache['hulls'] and k not in unavailable]
+    record_cache('geometry', hit=not new_keys)
+
+    if new_keys:
+        logging.info(f"Building {group_by} geometries for {len(new_keys)} new groups...")
+        unsourced = [k for k in new_keys if k in missing]
+        candidates = [k for k in new_keys if k not in missing]
+        if candidates:
+            source = _source_geometries(group_by)
+            for k in candidates:
+                if k in source:
+                    cache['geometries'][k] = _levels(source[k])
+                else:
+                    unsourced.append(k)
+            # Groups without a boundary in the sources aren't looked up again until the sources change
+            cache['missing'] = sorted(missing | set(unsourced))
+        if unsourced:
+            points = points_loader() if points_loader else None
+            hulls = _hull_geometries(group_by, sorted(unsourced), points)
+            cache['hulls'].update({k: _levels(hull) for k, hull in hulls.items()})
+            cache['unavailable'] = sorted(unavailable | {k for k in unsourced if k not in hulls})
+
+        os.makedirs(GEOMETRY_CACHE_DIR, exist_ok=True)
+        path = _cache_path(group_by)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(cache, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+        _memory_cache[group_by] = cache
+
+    return _collections({**cache['hulls'], **cache['geometries']}, keys)
@@ -0,0 +1,195 @@
+"""
+Lightweight in-process metrics for the dashboard.
+
+Every Dash callback request is timed at the `_dash-update-component` endpoint, which is where all
+server-side callbacks registered in app.py and app/pages/* are dispatched. Database reads and cache
+lookups record into the same registry. Metrics are exposed in the Prometheus text format on
+`/metrics`, and the most recent slow callbacks as JSON on `/metrics/slow`.
+
+Metrics are per process: under gunicorn, each worker reports its own series.
+"""
+import bisect
+import functools
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Sequence, Tuple
+
+from config.settings import env_float, env_int
+
+SLOW_CALLBACK_SECONDS = env_float('SLOW_CALLBACK_SECONDS', 1.0)
+SLOW_CALLBACK_LOG_SIZE = env_int('SLOW_CALLBACK_LOG_SIZE', 100)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (1e3, 1e4, 1e5, 5e5, 1e6, 5e6, 1e7, 5e7)
+
+DASH_DISPATCH_ENDPOINT = '_dash-update-component'
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ''
+    escaped = [(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in pairs]
+    return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                yield f"{self.name}{_format_labels(labels)} {value}"
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float]):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._values.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0, 0])
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += bucket_count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    yield f"{self.name}_bucket{_format_labels(labels, (('le', le),))} {cumulative}"
+                yield f"{self.name}_sum{_format_labels(labels)} {total}"
+                yield f"{self.name}_count{_format_labels(labels)} {count}"
+
+
+CALLBACK_SECONDS = Histogram('dash_callback_seconds', 'Wall time of Dash callback requests.', LATENCY_BUCKETS)
+CALLBACK_INPUT_BYTES = Histogram('dash_callback_input_bytes', 'Request payload size of Dash callbacks.', BYTES_BUCKETS)
+CALLBACK_OUTPUT_BYTES = Histogram('dash_callback_output_bytes', 'Response payload size of Dash callbacks.', BYTES_BUCKETS)
+CALLBACK_ERRORS = Counter('dash_callback_errors_total', 'Dash callback requests that raised or returned 5xx.')
+DB_READ_SECONDS = Histogram('db_read_seconds', 'Wall time of database reads.', LATENCY_BUCKETS)
+CACHE_REQUESTS = Counter('cache_requests_total', 'Cache lookups by cache and result (hit/miss).')
+
+REGISTRY = [CALLBACK_SECONDS, CALLBACK_INPUT_BYTES, CALLBACK_OUTPUT_BYTES, CALLBACK_ERRORS,
+            DB_READ_SECONDS, CACHE_REQUESTS]
+
+# Rolling log of the most recent callbacks slower than SLOW_CALLBACK_SECONDS
+slow_callbacks = deque(maxlen=SLOW_CALLBACK_LOG_SIZE)
+
+
+def render_prometheus() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def timed_db_read(query_name: str):
+    """Decorator recording the wall time of a database read function."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                DB_READ_SECONDS.observe(time.perf_counter() - start, query=query_name)
+        return wrapper
+    return decorator
+
+
+def _callback_name(payload: dict) -> str:
+    """Identifies a callback by its output(s), the same way Dash keys callback_map."""
+    output = payload.get('output') or 'unknown'
+    # Multi-output callbacks are sent as "..a.prop...b.prop.."; keep them readable
+    return output.strip('.').replace('...', ',')
+
+
+def instrument_app(app):
+    """
+    Wraps the Dash callback dispatch view of `app` to record latency and payload sizes per callback,
+    and registers the /metrics and /metrics/slow routes on its Flask server.
+    """
+    from dash.exceptions import PreventUpdate
+    from flask import Response, request
+
+    server = app.server
+    endpoint = app.config.routes_pathname_prefix + DASH_DISPATCH_ENDPOINT
+    dispatch = server.view_functions[endpoint]
+
+    @functools.wraps(dispatch)
+    def instrumented_dispatch(*args, **kwargs):
+        payload = request.get_json(silent=True) or {}
+        name = _callback_name(payload)
+        input_bytes = request.content_length or 0
+        start = time.perf_counter()
+        status = 500
+        response = None
+        try:
+            response = server.make_response(dispatch(*args, **kwargs))
+            status = response.status_code
+            return response
+        except PreventUpdate:
+            # Dash turns this into a 204 No Content, it isn't an error
+            status = 204
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            output_bytes = 0
+            if response is not None:
+                # Streamed responses don't have a length; count them as 0
+                output_bytes = response.calculate_content_length() or 0
+            CALLBACK_SECONDS.observe(elapsed, callback=name)
+            CALLBACK_INPUT_BYTES.observe(input_bytes, callback=name)
+            CALLBACK_OUTPUT_BYTES.observe(output_bytes, callback=name)
+            if status >= 500:
+                CALLBACK_ERRORS.inc(callback=name)
+            if elapsed >= SLOW_CALLBACK_SECONDS:
+                entry = {
+                    'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    'callback': name,
+                    'seconds': round(elapsed, 4),
+                    'input_bytes': input_bytes,
+                    'output_bytes': output_bytes,
+                    'triggered': payload.get('changedPropIds', []),
+                }
+                slow_callbacks.append(entry)
+                logging.warning(f"Slow callback {name}: {elapsed:.2f}s, in={input_bytes}B out={output_bytes}B")
+
+    server.view_functions[endpoint] = instrumented_dispatch
+
+    @server.route('/metrics')
+    def metrics():
+        return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+    @server.route('/metrics/slow')
+    def metrics_slow():
+        return Response(json.dumps(list(slow_callbacks)), mimetype='application/json')
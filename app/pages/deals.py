@@ -0,0 +1,94 @@
+import dash
+from dash import dcc, html, callback, dash_table
+import dash_bootstrap_components as dbc
+from dash.dependencies import Input, Output
+import pandas as pd
+from io import StringIO
+
+from app.data_utils import get_comp_scores
+
+# Listing columns of the deals table, every listing. Comp scores are joined on id.
+dash.register_page(__name__, path='/deals',
+                   listing_columns=['area_name', 'street', 'unit', 'zip_code', 'price', 'bedroom_count',
+                                    'living_area_size', 'url_path'],
+                   listing_grain='listing')
+
+# Listings priced at or below this percentile of their comparables are shown by default
+DEFAULT_MAX_PERCENTILE = 20
+
+DEALS_COLUMNS = [
+    "neighborhood", "street", "unit", "zip_code", "price", "comp_median_price",
+    "price_percentile", "comp_count", "max_comp_distance_m", "bedrooms", "size (sq ft)", "available_date",
+]
+
+layout = dbc.Container([
+    dbc.Row([
+        dbc.Col([
+            html.H4("Best Deals"),
+            html.P("Listings priced lowest relative to their nearest comparable listings "
+                   "(same bedroom count, similar size). Percentile is the share of comparables that are cheaper."),
+        ], width=12),
+    ]),
+    dbc.Row([
+        dbc.Col([
+            dbc.Label("Bedrooms:"),
+            dcc.Dropdown(id='deals-bedrooms-dropdown', multi=True, placeholder="All"),
+        ], width=4),
+        dbc.Col([
+            dbc.Label("Max price percentile:"),
+            dcc.Slider(id='deals-percentile-slider', min=0, max=50, step=5, value=DEFAULT_MAX_PERCENTILE),
+        ], width=8),
+    ], className="mb-3 dbc"),
+    dbc.Row([
+        dbc.Col([
+            dcc.Loading(
+                id="loading-deals",
+                type="circle",
+                children=dash_table.DataTable(
+                    id='deals-table',
+                    columns=[
+                        {"name": "Link", "id": "listing_url", "presentation": "markdown"},
+                        *[{"name": i.replace('_', ' ').title(), "id": i} for i in DEALS_COLUMNS]
+                    ],
+                    page_size=50,
+                    style_table={'overflowX': 'auto'},
+                    sort_action="native",
+                    filter_action="native",
+                    style_cell={'verticalAlign': 'middle'},
+                ),
+            )
+        ],
+        className="dbc dbc-row-selectable",
+        width=12),
+    ]),
+], fluid=True)
+
+@callback(
+    Output('deals-table', 'data'),
+    Output('deals-bedrooms-dropdown', 'options'),
+    Input('filtered-listings-store', 'data'),
+    Input('deals-bedrooms-dropdown', 'value'),
+    Input('deals-percentile-slider', 'value'),
+)
+def update_deals_table(filtered_data_json, bedrooms, max_percentile):
+    if not filtered_data_json:
+        return [], []
+
+    df = pd.read_json(StringIO(filtered_data_json), orient='split')
+    bedroom_options = [{'label': f"{b:g}", 'value': b} for b in sorted(df['bedroom_count'].dropna().unique())]
+
+    # Scores are computed over the whole market; the date filter only limits which listings are shown
+    df = df.merge(get_comp_scores(), on='id', how='inner')
+    df = df[df['price_percentile'] <= max_percentile]
+    if bedrooms:
+        df = df[df['bedroom_count'].isin(bedrooms)]
+    df = df.sort_values(['price_percentile', 'price'])
+
+    df['listing_url'] = df['url_path'].apply(lambda url: f'[View](https://streeteasy.com{url})')
+    df.rename(columns={'bedroom_count': 'bedrooms',
+                       'area_name': 'neighborhood',
+                       'living_area_size': 'size (sq ft)',
+                       },
+              inplace=True)
+    df['available_date'] = pd.to_datetime(df['available_date']).dt.strftime('%Y-%m-%d')
+    return df.to_dict('records'), bedroom_options
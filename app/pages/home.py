@@ -1,32 +1,32 @@
 import dash
-from dash import dcc, html, callback
+from dash import dcc, html, callback, clientside_callback, ctx, no_update, Patch
 import dash_bootstrap_components as dbc
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State
 import plotly.graph_objects as go
-import plotly.express as px
+import json
 import pandas as pd
 from io import StringIO
 
-from app.data_utils import data_aggregation
+from analytics.hexbin import cell_polygon, nearest_zoom_level
+from app.data_utils import (MAP_LISTING_COLUMNS, aggregate_listings_json, filter_by_available_date, get_data_version,
+                            get_hex_bins, get_listing_coordinates, get_page_listings)
+from app.figures import METRIC_OPTIONS, build_choropleth_figure, build_map_figure, marker_update_spec
+from app.geometry import get_geometries, location_keys, resolution_for_zoom
 
 # Register the page
-dash.register_page(__name__, path='/')
-
-# Define metric options for the dropdown
-METRIC_OPTIONS = {
-    'price_mean': 'Mean Price',
-    'price_median': 'Median Price',
-    'bedroom_count_mean': 'Mean Bedrooms',
-    'bedroom_count_median': 'Median Bedrooms',
-    'living_area_size_mean': 'Mean Size (sqft)',
-    'living_area_size_median': 'Median Size (sqft)',
-    'listing_count': 'Number of Listings'
-}
+# Listing columns the map aggregates (loaded by app/app.py), one row per unit
+dash.register_page(__name__, path='/',
+                   listing_columns=MAP_LISTING_COLUMNS,
+                   listing_grain='unit')
+# Listing columns the density mode draws when few enough listings are in view
+DENSITY_LISTING_COLUMNS = ['latitude', 'longitude', 'street', 'display_unit', 'price', 'bedroom_count', 'available_at']
 
 # Define the layout for the page
 layout = dbc.Container([
     # This store is specific to the page and holds the aggregated data
     dcc.Store(id='agg-data-store'),
+    # Resolution level of the geometry currently drawn on the choropleth
+    dcc.Store(id='geometry-level-store'),
 
     dbc.Row([
         dbc.Col([
@@ -42,20 +42,37 @@ layout = dbc.Container([
                 inline=True,
             ),
             html.Br(),
+            dbc.Label("Map Type:"),
+            dbc.RadioItems(
+                options=[
+                    {'label': 'Bubble', 'value': 'bubble'},
+                    {'label': 'Choropleth', 'value': 'choropleth'},
+                    {'label': 'Listing Density', 'value': 'density'},
+                ],
+                value='bubble',
+                id='map-type-radio',
+                inline=True,
+            ),
+            html.Br(),
             dbc.Label("Color:"),
             dcc.Dropdown(
                 id='metric-dropdown',
                 options=[{'label': v, 'value': k} for k, v in METRIC_OPTIONS.items()],
-                value='price_median'
+                value='price_median',
+                # Every map mode needs a color metric
+                clearable=False
             ),
             html.Br(),
-            dbc.Label("Size:"),
+            dbc.Label("Size (bubble map only):"),
             dcc.Dropdown(
                 id='size-dropdown',
                 options=[{'label': v, 'value': k} for k, v in METRIC_OPTIONS.items()],
                 value='listing_count',
                 clearable=True
             ),
+            html.Br(),
+            html.Small("Use the box or lasso select tool on the map to filter the Table View to that area. "
+                       "Double-click the map to clear the selection."),
         ], width=12, md=3, className="bg-light p-3"),
         
         dbc.Col([
@@ -80,65 +97,218 @@ def update_aggregated_data(group_by, listings_json):
     if not listings_json:
         return None
     
-    df = pd.read_json(StringIO(listings_json), orient='split')
-    agg_df = data_aggregation(df, group_by)
-    return agg_df.to_json(date_format='iso', orient='split')
+    return aggregate_listings_json(listings_json, group_by)
+
+def _group_geometries(df, group_by):
+    """Multi-resolution geometry for the groups on the map, built on first use and cached on disk."""
+    keys = location_keys(df[group_by], group_by).tolist()
+    return get_geometries(group_by, keys, points_loader=get_listing_coordinates, points_version=get_data_version())
+
+
+# Listing density mode: hex bins for the viewport, individual listings once few enough are in view
+MAX_VISIBLE_LISTINGS = 1000
+DEFAULT_VIEW = {'zoom': 10, 'bounds': (40.48, 40.93, -74.28, -73.68)}  # lat_min, lat_max, lon_min, lon_max
+
+
+def _relayout_viewport(relayout_data):
+    """Extracts (zoom, (lat_min, lat_max, lon_min, lon_max)) from mapbox relayoutData."""
+    relayout_data = relayout_data or {}
+    zoom = relayout_data.get('mapbox.zoom', DEFAULT_VIEW['zoom'])
+    corners = (relayout_data.get('mapbox._derived') or {}).get('coordinates')
+    if not corners:
+        return zoom, DEFAULT_VIEW['bounds']
+    lons = [c[0] for c in corners]
+    lats = [c[1] for c in corners]
+    return zoom, (min(lats), max(lats), min(lons), max(lons))
 
-# 2. Update map when aggregated data or metric changes
+
+def _in_bounds(df, bounds):
+    lat_min, lat_max, lon_min, lon_max = bounds
+    return df[df['latitude'].between(lat_min, lat_max) & df['longitude'].between(lon_min, lon_max)]
+
+
+def build_density_figure(relayout_data, start_date, end_date):
+    """
+    Hex-binned listing density for the current viewport. Bins come from the precomputed
+    hex_z<zoom> columns, so a pan or zoom only filters the cached bin table for that zoom.
+    """
+    zoom, bounds = _relayout_viewport(relayout_data)
+    grid_zoom = nearest_zoom_level(zoom)
+    bins = _in_bounds(get_hex_bins(grid_zoom, start_date, end_date), bounds)
+
+    if bins['listing_count'].sum() <= MAX_VISIBLE_LISTINGS:
+        listings = filter_by_available_date(get_page_listings(DENSITY_LISTING_COLUMNS), start_date, end_date)
+        listings = _in_bounds(listings.dropna(subset=['latitude', 'longitude']), bounds)
+        fig = go.Figure(go.Scattermapbox(
+            lat=listings['latitude'],
+            lon=listings['longitude'],
+            mode='markers',
+            hovertext=listings['street'].fillna('') + ' ' + listings['display_unit'].fillna(''),
+            customdata=listings[['price', 'bedroom_count']].to_numpy(),
+            hovertemplate='<b>%{hovertext}</b><br>Price=%{customdata[0]:$,.0f}<br>Bedrooms=%{customdata[1]}<extra></extra>',
+            marker={'size': 8, 'color': listings['price'], 'coloraxis': 'coloraxis'},
+        ))
+        color_title = 'Price'
+    else:
+        geojson = {
+            'type': 'FeatureCollection',
+            'features': [{'type': 'Feature', 'id': int(cell), 'properties': {},
+                          'geometry': {'type': 'Polygon', 'coordinates': [cell_polygon(cell, grid_zoom)]}}
+                         for cell in bins['cell_id']],
+        }
+        fig = go.Figure(go.Choroplethmapbox(
+            geojson=geojson,
+            locations=bins['cell_id'],
+            featureidkey='id',
+            z=bins['listing_count'],
+            coloraxis='coloraxis',
+            customdata=bins[['listing_count', 'price_median']].to_numpy(),
+            hovertemplate='Listings=%{customdata[0]:.0f}<br>Median Price=%{customdata[1]:$,.0f}<extra></extra>',
+            marker={'opacity': 0.6, 'line': {'width': 0}},
+        ))
+        color_title = 'Number of Listings'
+
+    fig.update_layout(
+        coloraxis={'colorscale': 'Turbo', 'colorbar': {'title': {'text': color_title}}},
+        mapbox={
+            'style': 'carto-positron',
+            'zoom': zoom,
+            'center': {'lat': (bounds[0] + bounds[1]) / 2, 'lon': (bounds[2] + bounds[3]) / 2},
+        },
+        margin={"r":0,"t":0,"l":0,"b":0},
+        # Rebuilding on every pan/zoom must not snap the view back
+        uirevision='density',
+    )
+    return fig
+
+
+def _relayout_zoom(relayout_data):
+    if not relayout_data:
+        return None
+    return relayout_data.get('mapbox.zoom')
+
+
+# 2. Build the map. A full figure is only constructed when the aggregated data, grouping or map type
+# changes; switching the color/size metric is done in the browser by the clientside callback below.
 @callback(
     Output('map-graph', 'figure'),
+    Output('geometry-level-store', 'data'),
     Input('agg-data-store', 'data'),
-    Input('metric-dropdown', 'value'), 
-    Input('size-dropdown', 'value'),   
-    Input('group-by-radio', 'value')
+    Input('map-type-radio', 'value'),
+    Input('map-graph', 'relayoutData'),
+    State('metric-dropdown', 'value'),
+    State('size-dropdown', 'value'),
+    State('group-by-radio', 'value'),
+    State('geometry-level-store', 'data'),
+    State('date-picker-range', 'start_date'),
+    State('date-picker-range', 'end_date')
 )
-def update_map(agg_data_json, color_metric, size_metric, group_by):
+def update_map(agg_data_json, map_type, relayout_data, color_metric, size_metric, group_by, current_level,
+               start_date, end_date):
     if not agg_data_json:
-        return go.Figure().update_layout(title="No data available.")
+        return go.Figure().update_layout(title="No data available."), None
+
+    triggered = set(ctx.triggered_prop_ids.values())
+
+    # Density mode works off the server-side listings cache; the metric dropdowns don't apply to it
+    if map_type == 'density':
+        # Relayouts that don't move the map (e.g. autosize) don't change what's in view
+        if triggered == {'map-graph'} and 'mapbox._derived' not in (relayout_data or {}):
+            return no_update, no_update
+        return build_density_figure(relayout_data, start_date, end_date), None
+
+    # Pans and zooms only matter to the choropleth, and only when they cross into another resolution level
+    if triggered == {'map-graph'}:
+        zoom = _relayout_zoom(relayout_data)
+        if map_type != 'choropleth' or zoom is None or resolution_for_zoom(zoom) == current_level:
+            return no_update, no_update
 
     df = pd.read_json(StringIO(agg_data_json), orient='split')
-    
+
     if df.empty:
-        return go.Figure().update_layout(title="No data to display for the selected criteria.")
-    
-    def get_format_string(metric):
-        """Returns a d3-format string based on the metric name."""
-        if 'price' in metric:
-            return ':$,.0f'  # Format as currency, no decimals
-        if 'listing' in metric: 
-            return ':.0f' 
-        return ':.1f'       # Default to one decimal place for other floats (like size/bedrooms)
-
-    # Define hover data, starting with the essentials
-    hover_data = {
-        'latitude': False,
-        'longitude': False,
-        'listing_count': True, # Always show listing count with default formatting
-        color_metric: get_format_string(color_metric),
+        return go.Figure().update_layout(title="No data to display for the selected criteria."), None
+
+    if triggered == {'map-graph'}:
+        level = resolution_for_zoom(_relayout_zoom(relayout_data))
+        patched = Patch()
+        patched['data'][0]['geojson'] = _group_geometries(df, group_by)[level]
+        return patched, level
+
+    if map_type == 'choropleth':
+        level = current_level or resolution_for_zoom(_relayout_zoom(relayout_data))
+        geojson = _group_geometries(df, group_by)[level]
+        return build_choropleth_figure(df, color_metric, group_by, geojson), level
+
+    return build_map_figure(df, color_metric, size_metric, group_by), None
+
+
+# get_marker_update in the browser: every metric is already in the figure's customdata, so a metric
+# switch never sends the aggregated data back to the server or re-parses it there.
+clientside_callback(
+    """
+    function(colorMetric, sizeMetric, figure, mapType) {
+        const spec = %s;
+        const trace = figure && figure.data && figure.data[0];
+        if (mapType === 'density' || !colorMetric || !trace || !trace.customdata) {
+            return window.dash_clientside.no_update;
+        }
+        const column = metric => trace.customdata.map(row => row[spec.metrics.indexOf(metric)]);
+        const color = column(colorMetric);
+        const known = color.filter(v => v !== null && !Number.isNaN(v));
+        const updated = {...trace};
+        if (mapType === 'choropleth') {
+            updated.z = color;
+            updated.hovertemplate = spec.hovertemplates[colorMetric + '|'];
+        } else {
+            const marker = {...trace.marker, color: color};
+            if (sizeMetric) {
+                // Same area-based scaling as get_marker_update
+                const size = column(sizeMetric).map(v => (v === null || Number.isNaN(v)) ? 0 : Math.max(v, 0));
+                const sizeMax = size.reduce((a, b) => Math.max(a, b), 0);
+                Object.assign(marker, {size: size, sizemode: 'area',
+                                       sizeref: sizeMax > 0 ? 2.0 * sizeMax / (spec.size_max ** 2) : 1});
+            } else {
+                Object.assign(marker, {size: spec.default_size, sizemode: 'diameter', sizeref: 1});
+            }
+            updated.marker = marker;
+            updated.hovertemplate = spec.hovertemplates[colorMetric + '|' + (sizeMetric || '')];
+        }
+        const coloraxis = {...figure.layout.coloraxis};
+        coloraxis.cmin = known.length ? known.reduce((a, b) => Math.min(a, b)) : null;
+        coloraxis.cmax = known.length ? known.reduce((a, b) => Math.max(a, b)) : null;
+        coloraxis.colorbar = {...coloraxis.colorbar, title: {...(coloraxis.colorbar || {}).title,
+                                                              text: spec.labels[colorMetric]}};
+        return {...figure, data: [updated, ...figure.data.slice(1)], layout: {...figure.layout, coloraxis: coloraxis}};
     }
+    """ % json.dumps(marker_update_spec()),
+    Output('map-graph', 'figure', allow_duplicate=True),
+    Input('metric-dropdown', 'value'),
+    Input('size-dropdown', 'value'),
+    State('map-graph', 'figure'),
+    State('map-type-radio', 'value'),
+    prevent_initial_call=True
+)
 
-    # If a size metric is selected and it's different from the color metric, add it to hover data
-    if size_metric and size_metric != color_metric:
-        hover_data[size_metric] = get_format_string(size_metric)
-
-    # Create the map figure using Plotly Express for simplicity
-    fig = px.scatter_mapbox(
-        df,
-        lat='latitude',
-        lon='longitude',
-        size=size_metric if size_metric else 5, # Use a default size if None
-        color=color_metric,
-        hover_name=group_by,
-        hover_data=hover_data,
-        color_continuous_scale='Turbo',
-        range_color=[df[color_metric].min(), df[color_metric].max()] if color_metric else None,
-        size_max=30, # Set max bubble size
-        zoom=10
-    )
 
-    fig.update_layout(
-        mapbox = {"style":"carto-positron"},
-        margin={"r":0,"t":0,"l":0,"b":0}
-    )
+def selection_from_selected_data(selected_data):
+    """Converts mapbox selectedData into the map-selection-store format used by select_listing_ids."""
+    if not selected_data:
+        return None
+    box = (selected_data.get('range') or {}).get('mapbox')
+    if box:
+        (lon_1, lat_1), (lon_2, lat_2) = box
+        return {'bbox': [min(lat_1, lat_2), max(lat_1, lat_2), min(lon_1, lon_2), max(lon_1, lon_2)]}
+    lasso = (selected_data.get('lassoPoints') or {}).get('mapbox')
+    if lasso:
+        return {'lasso': {'lat': [p[1] for p in lasso], 'lon': [p[0] for p in lasso]}}
+    return None
 
-    return fig
+
+@callback(
+    Output('map-selection-store', 'data'),
+    Input('map-graph', 'selectedData'),
+    prevent_initial_call=True
+)
+def update_map_selection(selected_data):
+    # Only the selection geometry is stored; the Table View resolves it to listings with the spatial index
+    return selection_from_selected_data(selected_data)
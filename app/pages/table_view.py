@@ -5,7 +5,14 @@ from dash.dependencies import Input, Output
 import pandas as pd
 from io import StringIO
 
-dash.register_page(__name__, path='/table')
+from app.data_utils import search_addresses, select_listing_ids
+
+# Listing columns the table shows or derives its columns from, every listing
+dash.register_page(__name__, path='/table',
+                   listing_columns=['area_name', 'street', 'unit', 'zip_code', 'price', 'bedroom_count',
+                                    'full_bathroom_count', 'half_bathroom_count', 'furnished', 'living_area_size',
+                                    'status', 'building_type', 'date_updated', 'url_path'],
+                   listing_grain='listing')
 
 # Define the columns to display in the table
 TABLE_COLUMNS = [
@@ -19,6 +26,10 @@ layout = dbc.Container([
     dbc.Row([
         dbc.Col([
             html.H4("Listings Data"),
+            dbc.Input(id='address-search', type='search', debounce=True, className="mb-2",
+                      placeholder="Search street, unit or zip code (typos are fine)"),
+            html.Div(id='address-search-info', className="mb-2"),
+            html.Div(id='map-selection-info', className="mb-2"),
             dcc.Loading(
                 id="loading-table",
                 type="circle",
@@ -44,13 +55,33 @@ layout = dbc.Container([
 
 @callback(
     Output('listings-table', 'data'),
-    Input('filtered-listings-store', 'data')
+    Output('map-selection-info', 'children'),
+    Output('address-search-info', 'children'),
+    Input('filtered-listings-store', 'data'),
+    Input('map-selection-store', 'data'),
+    Input('address-search', 'value')
 )
-def update_table(filtered_data_json):
+def update_table(filtered_data_json, map_selection, address_query):
     if not filtered_data_json:
-        return []
+        return [], None, None
     
     df = pd.read_json(StringIO(filtered_data_json), orient='split')
+
+    search_info = None
+    if address_query and address_query.strip():
+        # Ranked server-side over every listing, then narrowed to the current filters
+        scores = search_addresses(address_query)
+        rank = pd.Series(range(len(scores)), index=scores.index)
+        df = df.assign(_rank=df['id'].map(rank)).dropna(subset=['_rank']).sort_values('_rank').drop(columns='_rank')
+        search_info = html.Small(f"{len(df)} listings match '{address_query.strip()}', best matches first.")
+
+    selection_info = None
+    if map_selection:
+        df = df[df['id'].isin(select_listing_ids(map_selection))]
+        selection_info = dbc.Alert([
+            f"Showing {len(df)} listings inside the map selection. ",
+            dbc.Button("Clear selection", id='clear-map-selection', size="sm", color="link"),
+        ], color="info", className="py-1")
     
     # Create a markdown link for the streeteasy url
     df['listing_url'] = df['url_path'].apply(lambda url: f'[View](https://streeteasy.com{url})')
@@ -64,4 +95,14 @@ def update_table(filtered_data_json):
 
     # Format date for display
     df['available_date'] = pd.to_datetime(df['available_date']).dt.strftime('%Y-%m-%d')
-    return df.to_dict('records')
\ No newline at end of file
+    return df.to_dict('records'), selection_info, search_info
+
+@callback(
+    Output('map-selection-store', 'data', allow_duplicate=True),
+    Input('clear-map-selection', 'n_clicks'),
+    prevent_initial_call=True
+)
+def clear_map_selection(n_clicks):
+    if not n_clicks:
+        return dash.no_update
+    return None
@@ -5,21 +5,14 @@ from dash.dependencies import Input, Output
 import plotly.express as px
 import pandas as pd
 from io import StringIO 
-from app.data_utils import neighborhood_aggregation_recursive, data_aggregation
+from app.data_utils import HIERARCHY_LISTING_COLUMNS, hierarchy_listings_json
+from app.figures import METRIC_OPTIONS, build_treemap_figure
 
 # Register the page with a specific path
-dash.register_page(__name__, path='/treemap')
-
-# Define metric options for the dropdown, similar to the map page
-METRIC_OPTIONS = {
-    'price_mean': 'Mean Price',
-    'price_median': 'Median Price',
-    'bedroom_count_mean': 'Mean Bedrooms',
-    'bedroom_count_median': 'Median Bedrooms',
-    'living_area_size_mean': 'Mean Size (sqft)',
-    'living_area_size_median': 'Median Size (sqft)',
-    'listing_count': 'Number of Listings'
-}
+# Listing columns the hierarchy aggregates (loaded by app/app.py), one row per unit
+dash.register_page(__name__, path='/treemap',
+                   listing_columns=HIERARCHY_LISTING_COLUMNS,
+                   listing_grain='unit')
 
 # Define the layout for the treemap page
 layout = dbc.Container([
@@ -58,10 +51,7 @@ def prepare_treemap_data(listings_json):
     if not listings_json:
         return None
 
-    # Load listings data
-    df = pd.read_json(StringIO(listings_json), orient='split')
-    hierarchical_data = neighborhood_aggregation_recursive(df)
-    return hierarchical_data.to_json(date_format='iso', orient='split')
+    return hierarchy_listings_json(listings_json)
 
 
 # 2. Update treemap when the prepared data or metric changes
@@ -75,36 +65,4 @@ def update_treemap(treemap_data_json, metric):
         return px.treemap().update_layout(title_text="Loading data...")
 
     df = pd.read_json(StringIO(treemap_data_json), orient='split')
-
-    def get_format_string(metric):
-        """Returns a d3-format string based on the metric name."""
-        if not metric:
-            return ''
-        if 'price' in metric:
-            return ':$,.0f'  # Format as currency, no decimals
-        if 'listing' in metric: 
-            return ':.0f' 
-        return ':.1f'       # Default to one decimal place for other floats (like size/bedrooms)
-    
-    hover_data={
-        'name': True,
-        'parent_name': False,
-        'area_listing_count': False,
-        'listing_count': True,
-        metric: get_format_string(metric)
-    }
-
-    fig = px.treemap(
-        df,
-        names='name', 
-        parents='parent_name',
-        values='area_listing_count', # Size of the sectors
-        color=metric if metric else None, # Color of the sectors based on the selected metric
-        # hover_data=[metric, 'total_listing_count'],
-        hover_data=hover_data,
-        color_continuous_scale='Turbo',
-        range_color=[df[metric].min(), df[metric].max()],
-        title=f"NYC Neighborhoods by {METRIC_OPTIONS.get(metric, metric)}"
-    )
-    fig.update_layout(margin={"r":0,"t":40,"l":0,"b":0})
-    return fig
+    return build_treemap_figure(df, metric)
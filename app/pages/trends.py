@@ -0,0 +1,85 @@
+import dash
+from dash import dcc, html, callback
+import dash_bootstrap_components as dbc
+from dash.dependencies import Input, Output
+import plotly.express as px
+
+from analytics.trends import ALL_AREAS, ALL_BEDROOMS
+from app.data_utils import get_weekly_trends
+
+# Reads weekly_trends only, no listings
+dash.register_page(__name__, path='/trends', listing_columns=[])
+
+TREND_METRIC_OPTIONS = {
+    'new_listings': 'New Listings',
+    'median_price': 'Median Asking Price (new listings)',
+    'median_days_on_market': 'Median Days on Market',
+    'off_market_listings': 'Listings Gone Off Market',
+}
+
+BEDROOM_OPTIONS = [{'label': 'All', 'value': ALL_BEDROOMS}] + \
+    [{'label': str(b), 'value': b} for b in [0, 1, 2, 3, 4]]
+
+layout = dbc.Container([
+    dbc.Row([
+        dbc.Col([
+            html.H4("Controls"),
+            dbc.Label("Metric:"),
+            dcc.Dropdown(
+                id='trends-metric-dropdown',
+                options=[{'label': v, 'value': k} for k, v in TREND_METRIC_OPTIONS.items()],
+                value='median_price',
+                clearable=False
+            ),
+            html.Br(),
+            dbc.Label("Areas:"),
+            dcc.Dropdown(id='trends-area-dropdown', value=[ALL_AREAS], multi=True),
+            html.Br(),
+            dbc.Label("Bedrooms:"),
+            dcc.Dropdown(id='trends-bedrooms-dropdown', options=BEDROOM_OPTIONS, value=ALL_BEDROOMS, clearable=False),
+            html.Br(),
+            html.Small("Weekly figures by the week a listing was added (new listings, asking price) "
+                       "or went off market (days on market)."),
+        ], width=12, md=3, className="bg-light p-3"),
+
+        dbc.Col([
+            dcc.Loading(
+                id="loading-trends",
+                type="circle",
+                children=dcc.Graph(id='trends-graph', style={'height': '70vh'})
+            )
+        ], width=12, md=9),
+    ]),
+], fluid=True)
+
+# --- Callbacks ---
+
+@callback(
+    Output('trends-graph', 'figure'),
+    Output('trends-area-dropdown', 'options'),
+    Input('trends-metric-dropdown', 'value'),
+    Input('trends-area-dropdown', 'value'),
+    Input('trends-bedrooms-dropdown', 'value')
+)
+def update_trends(metric, areas, bedrooms):
+    df = get_weekly_trends()
+    if df.empty:
+        return px.line().update_layout(title_text="No trend data yet. Run `python -m analytics.trends`."), []
+
+    area_options = [{'label': 'All areas', 'value': ALL_AREAS}] + \
+        [{'label': a, 'value': a} for a in sorted(df['area_name'].unique()) if a != ALL_AREAS]
+
+    df = df[df['area_name'].isin(areas or [ALL_AREAS]) & (df['bedroom_count'] == bedrooms)]
+    df = df.assign(area=df['area_name'].replace(ALL_AREAS, 'All areas'))
+    fig = px.line(
+        df,
+        x='week_start',
+        y=metric,
+        color='area',
+        markers=True,
+        labels={'week_start': 'Week', metric: TREND_METRIC_OPTIONS[metric], 'area': 'Area'},
+    )
+    if 'price' in metric:
+        fig.update_yaxes(tickformat='$,.0f')
+    fig.update_layout(margin={"r": 0, "t": 20, "l": 0, "b": 0})
+    return fig, area_options
@@ -0,0 +1,150 @@
+"""
+Streaming aggregation of the listings table in fixed-size chunks.
+
+data_aggregation and neighborhood_aggregation_recursive need every listing in memory at once.
+Here listings are read from an unbuffered (server-side) cursor STREAM_CHUNK_SIZE rows at a time,
+and each chunk is folded into mergeable per-group state, then dropped:
+
+  - counts, sums and non-null counts of the averaged columns (area_partials), which add up
+  - one t-digest per group and summary column (AreaSketches), which merge
+
+Peak memory is one chunk plus the per-group state, which doesn't grow with the number of listings.
+Unit deduplication (analytics/dedup.py collapse_units) needs to see a whole cluster at once, so it
+is done by the query: a window function keeps the most recently updated listing of each cluster.
+
+Counts and means equal the in-memory path's up to float rounding. Medians come from the t-digests,
+so they are exact for groups of fewer than about 50 listings and for repeated values, and otherwise
+within the rank bound documented in analytics/sketches.py, as in QUANTILE_MODE=sketch.
+"""
+import logging
+from typing import Iterable, Iterator, Optional
+
+import pandas as pd
+
+from analytics.sketches import AreaSketches
+from app.data_utils import GROUP_BY_OPTIONS, SUMMARY_COLUMNS, area_partials, rollup_area_partials
+from config.settings import env_int
+from database.listing_schema import apply_listing_dtypes
+from database.mysql_client import MySQLClient
+
+STREAM_CHUNK_SIZE = env_int('STREAM_CHUNK_SIZE', 50000)
+STREAM_COLUMNS = ['id', 'unit_cluster_id', 'date_updated', 'area_name', 'zip_code', 'latitude', 'longitude',
+                  *SUMMARY_COLUMNS]
+
+
+def stream_query(start_date=None, end_date=None):
+    """
+    The streamed listings query and its parameters: one row per unit cluster, optionally limited
+    to listings available between start_date and end_date (inclusive, like filter_by_available_date).
+    Ties on date_updated keep the lowest id, the first row in table order, as collapse_units does.
+    """
+    where, params = [], []
+    if start_date is not None:
+        where.append("available_at >= %s")
+        params.append(str(start_date))
+    if end_date is not None:
+        where.append("available_at <= %s")
+        params.append(str(end_date))
+    columns = ', '.join(STREAM_COLUMNS)
+    query = f"""
+        SELECT {columns} FROM (
+            SELECT {columns},
+                   ROW_NUMBER() OVER (PARTITION BY COALESCE(unit_cluster_id, id) ORDER BY date_updated DESC, id) AS unit_rank
+            FROM listings
+            {'WHERE ' + ' AND '.join(where) if where else ''}
+        ) ranked
+        WHERE unit_rank = 1
+    """
+    return query, tuple(params)
+
+
+def iter_listing_chunks(start_date=None, end_date=None, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Yields the deduplicated listings as typed frames of at most chunk_size rows.
+
+    :param start_date: Earliest available_at, or None.
+    :param end_date: Latest available_at, or None.
+    :param chunk_size: Rows fetched from the server per chunk.
+    """
+    query, params = stream_query(start_date, end_date)
+    with MySQLClient() as db:
+        # mysql-connector cursors are unbuffered: rows stay on the server until fetched
+        cursor = db.conn.cursor()
+        try:
+            cursor.execute(query, params)
+            names = [d[0] for d in cursor.description]
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield apply_listing_dtypes(pd.DataFrame.from_records(rows, columns=names))
+        finally:
+            cursor.close()
+
+
+class StreamingAggregator:
+    """Per-group partials and quantile sketches, folded in one chunk of listings at a time."""
+
+    def __init__(self, group_cols: Iterable[str] = GROUP_BY_OPTIONS):
+        self.group_cols = list(group_cols)
+        self.partials = {col: None for col in self.group_cols}
+        self.sketches = {col: AreaSketches(SUMMARY_COLUMNS) for col in self.group_cols}
+        self.rows = 0
+
+    def update(self, chunk: pd.DataFrame) -> 'StreamingAggregator':
+        """Folds one chunk of already deduplicated listings into the state of every group column."""
+        for col in self.group_cols:
+            parts = area_partials(chunk, col)
+            total = self.partials[col]
+            self.partials[col] = parts if total is None else total.add(parts, fill_value=0)
+            self.sketches[col].update(chunk, area_col=col)
+        self.rows += len(chunk)
+        return self
+
+    def group_aggregation(self, group_by_col: str) -> pd.DataFrame:
+        """The data_aggregation frame for group_by_col."""
+        parts = self.partials[group_by_col]
+        if parts is None or parts.empty:
+            return pd.DataFrame()
+        parts = parts.sort_index()
+        agg_df = pd.DataFrame({group_by_col: parts.index.to_numpy()})
+
+        def mean(col):
+            return (parts[f'{col}_sum'] / parts[f'{col}_count'].where(parts[f'{col}_count'] > 0)).to_numpy()
+
+        agg_df['latitude'] = mean('latitude')
+        agg_df['longitude'] = mean('longitude')
+        sketches = self.sketches[group_by_col]
+        for col in SUMMARY_COLUMNS:
+            agg_df[f'{col}_mean'] = mean(col)
+            agg_df[f'{col}_median'] = [sketches.get(group, col).median() for group in parts.index]
+        agg_df['listing_count'] = parts['rows'].astype('int64').to_numpy()
+        return agg_df
+
+    def neighborhood_aggregation(self, neighborhoods: pd.DataFrame) -> pd.DataFrame:
+        """The neighborhood_aggregation_recursive frame, rolled up from the per-area state."""
+        if neighborhoods.empty:
+            return pd.DataFrame()
+        neighborhoods = neighborhoods[['id', 'name', 'parent_id', 'level', 'parent_name']]
+        partials = self.partials['area_name']
+        if partials is None:
+            partials = area_partials(pd.DataFrame(columns=STREAM_COLUMNS))
+        return rollup_area_partials(partials, self.sketches['area_name'], neighborhoods)
+
+
+def stream_aggregations(start_date=None, end_date=None, chunk_size: int = STREAM_CHUNK_SIZE,
+                        chunks: Optional[Iterable[pd.DataFrame]] = None) -> StreamingAggregator:
+    """
+    Streams the listings table through a StreamingAggregator.
+
+    :param start_date: Earliest available_at, or None.
+    :param end_date: Latest available_at, or None.
+    :param chunk_size: Rows per chunk.
+    :param chunks: Deduplicated listing chunks to fold instead of reading the database.
+    :return: The aggregator. Call group_aggregation or neighborhood_aggregation on it.
+    """
+    aggregator = StreamingAggregator()
+    for chunk in chunks if chunks is not None else iter_listing_chunks(start_date, end_date, chunk_size):
+        aggregator.update(chunk)
+    logging.info(f"Streamed {aggregator.rows} listings in chunks of {chunk_size}.")
+    return aggregator
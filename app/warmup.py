@@ -0,0 +1,96 @@
+import logging
+import threading
+import time
+
+import dash
+
+from app import cache_store
+from app.data_utils import (DEFAULT_DATE_RANGE, GROUP_BY_OPTIONS, aggregate_listings_json, filter_listings_json,
+                            get_data_version, get_listings_json, get_page_listings_json, hierarchy_listings_json)
+from config.settings import env_int
+
+# How often the refresher looks for the ingest stamp, and how often it asks the database for a new version
+STAMP_POLL_SECONDS = env_int('CACHE_STAMP_POLL_SECONDS', 5)
+VERSION_POLL_SECONDS = env_int('CACHE_VERSION_POLL_SECONDS', 300)
+
+
+def warm_caches() -> str:
+    """
+    Computes everything a first page load needs for the current data version: every page's listings
+    store and default date-filtered store, the map aggregates for every grouping and the treemap
+    hierarchy, plus the same over all columns for the JSON API. Results land in the shared cache
+    store, so only one process ever pays for them.
+
+    :return: The data version that was warmed.
+    """
+    start = time.monotonic()
+    version = get_data_version(force=True)
+    with cache_store.exclusive_lock():
+        start_date, end_date = (d.isoformat() for d in DEFAULT_DATE_RANGE)
+        filtered_json = filter_listings_json(get_listings_json(), start_date, end_date)
+        for group_by in GROUP_BY_OPTIONS:
+            aggregate_listings_json(filtered_json, group_by)
+        hierarchy_listings_json(filtered_json)
+        # Page stores, with the columns and grain each page declared (see app/app.py)
+        for page in dash.page_registry.values():
+            columns, grain = page.get('listing_columns'), page.get('listing_grain', 'listing')
+            if not columns:
+                continue
+            page_json = filter_listings_json(get_page_listings_json(columns, grain), start_date, end_date, grain)
+            # Aggregating pages (map, treemap) work on units
+            if grain == 'unit':
+                for group_by in GROUP_BY_OPTIONS:
+                    if group_by in columns:
+                        aggregate_listings_json(page_json, group_by)
+                if 'area_name' in columns:
+                    hierarchy_listings_json(page_json)
+    logging.info(f"Caches warm for data version {version} in {time.monotonic() - start:.1f}s.")
+    return version
+
+
+class CacheRefresher(threading.Thread):
+    """
+    Background thread that rebuilds the shared caches whenever an ingest finishes
+    (signalled through cache_store.mark_data_changed) or the data version changes,
+    so user requests never hit the cold path.
+    """
+
+    def __init__(self, warmed_version: str = None):
+        super().__init__(name='cache-refresher', daemon=True)
+        self.version = warmed_version
+        self.stamp = cache_store.last_data_change()
+        self.stop_event = threading.Event()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        last_version_check = time.monotonic()
+        while not self.stop_event.wait(STAMP_POLL_SECONDS):
+            stamp = cache_store.last_data_change()
+            due = time.monotonic() - last_version_check >= VERSION_POLL_SECONDS
+            if stamp == self.stamp and not due:
+                continue
+            self.stamp = stamp
+            last_version_check = time.monotonic()
+            try:
+                if get_data_version(force=True) == self.version:
+                    continue
+                old_version = self.version
+                self.version = warm_caches()
+                logging.info(f"Refreshed caches: data version {old_version} -> {self.version}.")
+                cache_store.prune(cache_store.MAX_AGE_SECONDS)
+            except Exception as e:
+                logging.error(f"Cache refresh failed: {e}")
+
+
+def start_refresher() -> CacheRefresher:
+    """Warms the caches and starts the background refresher. Called once per worker process."""
+    version = None
+    try:
+        version = warm_caches()
+    except Exception as e:
+        logging.error(f"Cache warmup failed, serving cold: {e}")
+    refresher = CacheRefresher(warmed_version=version)
+    refresher.start()
+    return refresher
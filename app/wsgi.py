@@ -0,0 +1,10 @@
+"""
+Production WSGI entry point. Run with the bundled gunicorn config:
+
+    gunicorn -c config/gunicorn.conf.py app.wsgi:application
+
+Each worker warms the shared caches on start and keeps them fresh in the background (see app/warmup.py).
+"""
+from app.app import server
+
+application = server
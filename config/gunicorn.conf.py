@@ -0,0 +1,24 @@
+# Gunicorn settings for serving the dashboard in production:
+#   gunicorn -c config/gunicorn.conf.py app.wsgi:application
+import multiprocessing
+import os
+
+bind = os.environ.get('APP_BIND', '0.0.0.0:8050')
+workers = int(os.environ.get('APP_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('APP_THREADS', 2))
+timeout = int(os.environ.get('APP_TIMEOUT', 120))
+# Import the Dash app once in the master so workers fork with pages and callbacks already registered
+preload_app = True
+
+
+def post_worker_init(worker):
+    # Warm up before the worker takes traffic. The shared disk store and its lock mean only the
+    # first worker actually loads from MySQL; the others read its results.
+    from app.warmup import start_refresher
+    worker.cache_refresher = start_refresher()
+
+
+def worker_exit(server, worker):
+    refresher = getattr(worker, 'cache_refresher', None)
+    if refresher is not None:
+        refresher.stop()
@@ -1,5 +1,6 @@
 import os
 from dataclasses import dataclass
+from functools import lru_cache
 from dotenv import load_dotenv
 from typing import Optional
 
@@ -53,6 +54,8 @@ class ScrapeConfig:
     request_delay_seconds: float
     request_timeout_seconds: int
     use_proxy_rotator: bool
+    base_url: str
+    retry_backoff_seconds: float
 
 
 @dataclass
@@ -61,7 +64,12 @@ class AppConfig:
     scrape: ScrapeConfig
 
 
+@lru_cache(maxsize=None)
 def load_config() -> AppConfig:
+    """
+    The configuration from the environment, read once per process. Every MySQLClient and
+    StreetEasyScraper shares it; call load_config.cache_clear() after changing the environment.
+    """
     db = DBConfig(
         host=env_str('DB_HOST', '127.0.0.1'),
         port=env_int('DB_PORT', 3306),
@@ -74,5 +82,8 @@ def load_config() -> AppConfig:
         request_delay_seconds=env_float('REQUEST_DELAY_SECONDS', 2.5),
         request_timeout_seconds=env_int('REQUEST_TIMEOUT_SECONDS', 20),
         use_proxy_rotator=env_bool('USE_PROXY_ROTATOR', False),
+        # Point the scraper at a stand-in server, e.g. tools/fake_streeteasy.py
+        base_url=env_str('STREETEASY_BASE_URL', 'https://streeteasy.com'),
+        retry_backoff_seconds=env_float('RETRY_BACKOFF_SECONDS', 15.0),
     )
     return AppConfig(db=db, scrape=scrape)
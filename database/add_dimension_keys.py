@@ -0,0 +1,56 @@
+import logging
+import mysql.connector
+
+from database.dimensions import LOOKUP_DIMENSIONS
+from database.mysql_client import MySQLClient
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# id column -> SQL type
+KEY_COLUMN_TYPES = {'area_id': 'INT', **{id_col: 'SMALLINT' for _, id_col in LOOKUP_DIMENSIONS.values()}}
+KEY_INDEXES = {'idx_area_id': 'area_id', 'idx_zip_id': 'zip_id'}
+
+
+def add_dimension_keys():
+    """
+    Adds integer keys for the area and the categorical columns of the 'listings' table (see
+    database/dimensions.py) and backfills them: the lookup tables get every stored value, and every
+    listing gets the ids of its values. Later ingests assign the ids themselves.
+    """
+    logging.info("Starting migration to add dimension keys to 'listings' table.")
+
+    with MySQLClient() as db:
+        try:
+            for col, sql_type in KEY_COLUMN_TYPES.items():
+                try:
+                    db.cursor.execute(f"ALTER TABLE listings ADD COLUMN {col} {sql_type}")
+                    db.conn.commit()
+                    logging.info(f"Column '{col}' added successfully.")
+                except mysql.connector.Error as err:
+                    if err.errno == 1060: # Error code for "Duplicate column name"
+                        logging.info(f"Column '{col}' already exists. Skipping.")
+                    else:
+                        raise
+            for name, col in KEY_INDEXES.items():
+                try:
+                    db.cursor.execute(f"ALTER TABLE listings ADD INDEX {name} ({col})")
+                    db.conn.commit()
+                except mysql.connector.Error as err:
+                    if err.errno != 1061: # Error code for "Duplicate key name"
+                        raise
+
+            # Setting date_updated to itself keeps the backfill from looking like an update of every listing
+            for col, (table, id_col) in LOOKUP_DIMENSIONS.items():
+                db.cursor.execute(f"INSERT IGNORE INTO {table} (name) SELECT DISTINCT {col} FROM listings WHERE {col} IS NOT NULL")
+                db.cursor.execute(f"UPDATE listings l JOIN {table} t ON t.name = l.{col} "
+                                  f"SET l.{id_col} = t.id, l.date_updated = l.date_updated")
+                logging.info(f"Backfilled '{id_col}' for {db.cursor.rowcount} listings.")
+            db.cursor.execute("UPDATE listings l JOIN neighborhoods n ON n.name = l.area_name "
+                              "SET l.area_id = n.id, l.date_updated = l.date_updated")
+            logging.info(f"Backfilled 'area_id' for {db.cursor.rowcount} listings.")
+            db.conn.commit()
+            logging.info("Migration completed successfully.")
+
+        except mysql.connector.Error as err:
+            logging.error(f"A database error occurred: {err}")
+            db.conn.rollback()
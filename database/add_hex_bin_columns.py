@@ -0,0 +1,73 @@
+import logging
+import mysql.connector
+import pandas as pd
+
+from analytics.hexbin import HEX_ZOOM_LEVELS, assign_hex_columns, hex_column
+from database.mysql_client import MySQLClient
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def add_hex_bin_columns():
+    """
+    Adds a 'hex_z<zoom>' cell id column per map zoom level to the 'listings' table
+    and backfills it for rows ingested before the columns existed.
+    New rows get their cell ids at ingest time (see scraping/ingest_listings.py).
+    """
+    logging.info("Starting migration to add hex bin columns to 'listings' table.")
+
+    with MySQLClient() as db:
+        try:
+            # Step 1: Add one indexed BIGINT column per zoom level if it doesn't exist.
+            # The index is added on its own: schema.sql creates the columns on a fresh database.
+            for zoom in HEX_ZOOM_LEVELS:
+                col = hex_column(zoom)
+                try:
+                    db.cursor.execute(f"ALTER TABLE listings ADD COLUMN {col} BIGINT")
+                    db.conn.commit()
+                    logging.info(f"Column '{col}' added successfully.")
+                except mysql.connector.Error as err:
+                    if err.errno == 1060: # Error code for "Duplicate column name"
+                        logging.info(f"Column '{col}' already exists. Skipping.")
+                    else:
+                        raise
+                try:
+                    db.cursor.execute(f"ALTER TABLE listings ADD INDEX idx_{col} ({col})")
+                    db.conn.commit()
+                    logging.info(f"Index 'idx_{col}' added successfully.")
+                except mysql.connector.Error as err:
+                    if err.errno == 1061: # Error code for "Duplicate key name"
+                        logging.info(f"Index 'idx_{col}' already exists. Skipping.")
+                    else:
+                        raise
+
+            # Step 2: Backfill cell ids for rows that have coordinates but no bins yet
+            logging.info("Backfilling hex bins for existing listings...")
+            rows = db.execute_query(
+                f"SELECT id, latitude, longitude FROM listings "
+                f"WHERE {hex_column(HEX_ZOOM_LEVELS[0])} IS NULL AND latitude IS NOT NULL AND longitude IS NOT NULL"
+            )
+            if not rows:
+                logging.info("No listings needed backfilling.")
+                return
+
+            df = assign_hex_columns(pd.DataFrame(rows, columns=['id', 'latitude', 'longitude']))
+            cols = [hex_column(zoom) for zoom in HEX_ZOOM_LEVELS]
+            update_query = f"UPDATE listings SET {', '.join(f'{c} = %s' for c in cols)} WHERE id = %s"
+            values = [tuple(None if pd.isna(v) else int(v) for v in row[1:]) + (int(row[0]),)
+                      for row in df[['id'] + cols].itertuples(index=False)]
+            for start in range(0, len(values), BACKFILL_BATCH_SIZE):
+                db.cursor.executemany(update_query, values[start:start + BACKFILL_BATCH_SIZE])
+                db.conn.commit()
+            logging.info(f"Successfully backfilled hex bins for {len(values)} listings.")
+
+            logging.info("Migration completed successfully.")
+
+        except mysql.connector.Error as err:
+            logging.error(f"A database error occurred: {err}")
+            db.conn.rollback()
+        except Exception as e:
+            logging.error(f"An unexpected error occurred: {e}")
+            db.conn.rollback()
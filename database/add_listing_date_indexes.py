@@ -0,0 +1,43 @@
+import logging
+import mysql.connector
+
+from database.mysql_client import MySQLClient
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Incremental jobs select by date_updated (watermarks) and by the week of date_added / off_market_at
+DATE_INDEXES = {
+    'idx_date_updated': 'date_updated',
+    'idx_date_added': 'date_added',
+    'idx_off_market_at': 'off_market_at',
+}
+
+
+def add_listing_date_indexes():
+    """
+    Adds indexes on the date columns of the 'listings' table used by incremental analytics
+    (see analytics/trends.py), so they read only the rows they need.
+    """
+    logging.info("Starting migration to add date indexes to 'listings' table.")
+
+    with MySQLClient() as db:
+        try:
+            for name, col in DATE_INDEXES.items():
+                try:
+                    db.cursor.execute(f"ALTER TABLE listings ADD INDEX {name} ({col})")
+                    db.conn.commit()
+                    logging.info(f"Index '{name}' added successfully.")
+                except mysql.connector.Error as err:
+                    if err.errno == 1061: # Error code for "Duplicate key name"
+                        logging.info(f"Index '{name}' already exists. Skipping.")
+                    else:
+                        raise
+
+            logging.info("Migration completed successfully.")
+
+        except mysql.connector.Error as err:
+            logging.error(f"A database error occurred: {err}")
+            db.conn.rollback()
+        except Exception as e:
+            logging.error(f"An unexpected error occurred: {e}")
+            db.conn.rollback()
@@ -0,0 +1,36 @@
+import logging
+import mysql.connector
+
+from analytics.dedup import assign_unit_clusters
+from database.mysql_client import MySQLClient
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def add_unit_cluster_column():
+    """
+    Adds a 'unit_cluster_id' column to the 'listings' table and backfills it by clustering
+    all existing listings. Later scraping runs keep it up to date (see analytics/dedup.py).
+    """
+    logging.info("Starting migration to add 'unit_cluster_id' column to 'listings' table.")
+
+    with MySQLClient() as db:
+        try:
+            try:
+                db.cursor.execute("ALTER TABLE listings ADD COLUMN unit_cluster_id BIGINT, "
+                                  "ADD INDEX idx_unit_cluster_id (unit_cluster_id)")
+                db.conn.commit()
+                logging.info("Column 'unit_cluster_id' added successfully.")
+            except mysql.connector.Error as err:
+                if err.errno == 1060: # Error code for "Duplicate column name"
+                    logging.info("Column 'unit_cluster_id' already exists. Skipping.")
+                else:
+                    raise
+        except mysql.connector.Error as err:
+            logging.error(f"A database error occurred: {err}")
+            db.conn.rollback()
+            return
+
+    logging.info("Backfilling unit clusters for existing listings...")
+    assign_unit_clusters()
+    logging.info("Migration completed successfully.")
@@ -0,0 +1,69 @@
+import logging
+import mysql.connector
+import pandas as pd
+
+from database.listing_schema import read_listings
+from database.mysql_client import MySQLClient
+from scraping.validation import ZERO_AS_UNKNOWN, failure_reasons, quarantine_listings, rule_failures
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Columns the validation rules read
+RULE_COLUMNS = ['id', 'source', 'external_id', 'latitude', 'longitude', 'price', 'living_area_size']
+
+
+def clean_listing_values():
+    """
+    Stores the sizes and prices of listings stored before ingest validation (scraping/validation.py)
+    existed as NULL where they are 0, as ingest does now, so readers no longer need to clean the
+    listings they load. Idempotent: once applied there are no zeros left to update.
+    """
+    logging.info("Starting migration to clean stored listing values.")
+
+    with MySQLClient() as db:
+        try:
+            for col in ZERO_AS_UNKNOWN:
+                # Setting date_updated to itself keeps this from looking like an update of every listing
+                db.cursor.execute(f"UPDATE listings SET {col} = NULL, date_updated = date_updated WHERE {col} = 0")
+                logging.info(f"Set {db.cursor.rowcount} zero '{col}' values to NULL.")
+            db.conn.commit()
+            logging.info("Migration completed successfully.")
+
+        except mysql.connector.Error as err:
+            logging.error(f"A database error occurred: {err}")
+            db.conn.rollback()
+
+
+def quarantine_stored_listings():
+    """
+    One-time, opt-in: copies stored listings that fail the ingest validation rules into
+    'listing_quarantine', with the rules they failed, for review. The listings stay in 'listings'
+    with their scores, comps and saved search matches. Not part of `python -m database.migrate`:
+
+        python -m database.clean_listing_values
+    """
+    logging.info("Copying stored listings that fail validation to 'listing_quarantine'.")
+
+    with MySQLClient() as db:
+        try:
+            df = read_listings(f"SELECT {', '.join(RULE_COLUMNS)} FROM listings", db.sqlalchemy_engine)
+            failures = rule_failures(df)
+            failed = failures.any(axis=1)
+            if failed.any():
+                rejected = df[failed].assign(reasons=failure_reasons(failures[failed]))
+                # Keep the full stored row in the quarantine payload
+                ids = rejected['id'].tolist()
+                placeholders = ', '.join(['%s'] * len(ids))
+                full = pd.read_sql_query(f"SELECT * FROM listings WHERE id IN ({placeholders})", db.sqlalchemy_engine,
+                                         params=tuple(ids))
+                rejected = full.merge(rejected[['id', 'reasons']], on='id')
+                quarantine_listings(rejected.drop(columns='id'), db)
+            logging.info(f"Copied {int(failed.sum())} listings failing validation to 'listing_quarantine'.")
+
+        except mysql.connector.Error as err:
+            logging.error(f"A database error occurred: {err}")
+            db.conn.rollback()
+
+
+if __name__ == '__main__':
+    quarantine_stored_listings()
@@ -0,0 +1,65 @@
+"""
+Integer keys of the `listings` table's repeated strings.
+
+Every listing carries its area as `area_id` (the id of the `neighborhoods` row named area_name)
+and its status, building type, source type and zip code as ids into small lookup tables. Joins and
+group-bys use the ids; the string columns stay for display. Ids are assigned at ingest from
+in-memory name -> id maps, loaded once per process and extended when a batch brings a new value.
+"""
+from typing import Dict
+
+import pandas as pd
+
+# listings column -> (lookup table, id column)
+LOOKUP_DIMENSIONS = {
+    'status': ('listing_statuses', 'status_id'),
+    'building_type': ('building_types', 'building_type_id'),
+    'source_type': ('source_types', 'source_type_id'),
+    'zip_code': ('zip_codes', 'zip_id'),
+}
+# listings column -> id column, for every dimension
+KEY_COLUMNS = {'area_name': 'area_id', **{col: id_col for col, (_, id_col) in LOOKUP_DIMENSIONS.items()}}
+
+
+class DimensionIds:
+    """name -> id maps of the neighborhoods and the lookup tables, filled from the database on first use."""
+
+    def __init__(self):
+        self.maps: Dict[str, Dict[str, int]] = {}
+
+    def _load(self, db, col: str):
+        if col == 'area_name':
+            rows = db.execute_query("SELECT name, id FROM neighborhoods")
+        else:
+            rows = db.execute_query(f"SELECT name, id FROM {LOOKUP_DIMENSIONS[col][0]}")
+        self.maps[col] = {name: int(id_) for name, id_ in rows}
+
+    def ids(self, db, col: str, values: pd.Series) -> pd.Series:
+        """Ids of values of a KEY_COLUMNS column. New lookup values are added to their table first."""
+        if col not in self.maps:
+            self._load(db, col)
+        names = values.astype('string')
+        mapping = self.maps[col]
+        if col in LOOKUP_DIMENSIONS:
+            new = [name for name in names.dropna().unique() if name not in mapping]
+            if new:
+                # An upsert, in case another writer added the same value meanwhile
+                db.insert_many(LOOKUP_DIMENSIONS[col][0], ['name'], [(name,) for name in new], on_duplicate='update')
+                self._load(db, col)
+                mapping = self.maps[col]
+        # An area missing from neighborhoods has no id
+        return names.map(mapping).astype('Int32')
+
+
+_dimension_ids = DimensionIds()
+
+
+def assign_dimension_ids(df: pd.DataFrame, db) -> pd.DataFrame:
+    """
+    Adds the id column of every KEY_COLUMNS column present in df. Returns a new frame.
+
+    :param df: Normalized listings (see scraping/ingest_listings.py).
+    :param db: An active MySQLClient instance.
+    """
+    ids = {id_col: _dimension_ids.ids(db, col, df[col]) for col, id_col in KEY_COLUMNS.items() if col in df.columns}
+    return df.assign(**ids)
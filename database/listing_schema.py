@@ -0,0 +1,98 @@
+"""
+In-memory dtypes of the `listings` table.
+
+pd.read_sql_query infers each column from the driver's values: VARCHARs arrive as Python strings
+in object columns, DECIMALs as Decimal objects and DATEs as datetime.date. Every loader of listing
+rows passes its frame through apply_listing_dtypes (or reads with read_listings), so a column has
+the same compact dtype wherever it is used:
+
+  - low-cardinality strings (areas, zip codes, statuses, ...) are categoricals
+  - coordinates are float64, so they serialize as stored (DECIMAL(10,7)) and not as float32 noise
+  - bedroom counts are float32, as are prices and sizes: exact for whole numbers below 16.7M, NaN when unknown
+  - small counts and the dimension ids (database/dimensions.py) are nullable integers, flags are
+    nullable booleans
+  - dates and timestamps are datetime64
+
+Columns not listed here (free text such as street, unit or url_path, and the hex bin columns) keep
+whatever type they were read with. Frames sent to clients (the dashboard stores, the JSON API) go
+through json_listings first, so the compact dtypes never change what clients see.
+"""
+from typing import Optional
+
+import pandas as pd
+
+CATEGORY_COLUMNS = ['source', 'area_name', 'zip_code', 'state', 'status', 'building_type', 'source_group_label',
+                    'source_type', 'tier']
+
+# INT columns held as float32 in memory, sent to clients as integers
+WHOLE_NUMBER_COLUMNS = ['price', 'net_effective_price', 'living_area_size']
+
+LISTING_DTYPES = {
+    'id': 'int64',
+    **{col: 'category' for col in CATEGORY_COLUMNS},
+    'latitude': 'float64',
+    'longitude': 'float64',
+    'bedroom_count': 'float32',
+    'price': 'float32',
+    'net_effective_price': 'float32',
+    'living_area_size': 'float32',
+    'interesting_price_delta': 'Int32',
+    'full_bathroom_count': 'Int8',
+    'half_bathroom_count': 'Int8',
+    'months_free': 'Int8',
+    'lease_term': 'Int16',
+    'furnished': 'boolean',
+    'has_tour_3d': 'boolean',
+    'has_videos': 'boolean',
+    'is_new_development': 'boolean',
+    'unit_cluster_id': 'Int64',
+    'area_id': 'Int32',
+    'status_id': 'Int16',
+    'building_type_id': 'Int16',
+    'source_type_id': 'Int16',
+    'zip_id': 'Int16',
+    'available_at': 'datetime64[ns]',
+    'off_market_at': 'datetime64[ns]',
+    'upcoming_open_house_start_time': 'datetime64[ns]',
+    'date_added': 'datetime64[ns]',
+    'date_updated': 'datetime64[ns]',
+}
+
+
+def _convert(values: pd.Series, dtype: str) -> pd.Series:
+    if dtype == 'category':
+        return values.astype('category')
+    if dtype.startswith('datetime64'):
+        return pd.to_datetime(values, errors='coerce').astype(dtype)
+    # Decimal objects and numeric strings go through to_numeric first
+    numeric = pd.to_numeric(values, errors='coerce')
+    if dtype == 'boolean':
+        return numeric.astype('Float64').astype('boolean')
+    return numeric.astype(dtype)
+
+
+def apply_listing_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts the listing columns present in df to their LISTING_DTYPES. Returns a new frame.
+    Values that can't be converted become missing.
+    """
+    converted = {col: _convert(df[col], dtype) for col, dtype in LISTING_DTYPES.items()
+                 if col in df.columns and str(df[col].dtype) != dtype}
+    return df.assign(**converted) if converted else df.copy()
+
+
+def read_listings(query: str, engine, params: Optional[tuple] = None) -> pd.DataFrame:
+    """pd.read_sql_query for queries over listings, with the columns converted to LISTING_DTYPES."""
+    return apply_listing_dtypes(pd.read_sql_query(query, engine, params=params))
+
+
+def json_listings(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Listing frame as clients should see it: WHOLE_NUMBER_COLUMNS as nullable integers (2500, not
+    2500.0) and any other float32 column as float64 (1.5, not 1.5000000000 noise). Returns a new frame.
+    """
+    converted = {col: df[col].round().astype('Int64') for col in WHOLE_NUMBER_COLUMNS
+                 if col in df.columns and pd.api.types.is_float_dtype(df[col])}
+    converted.update({col: df[col].astype('float64') for col in df.columns
+                      if col not in converted and str(df[col].dtype) == 'float32'})
+    return df.assign(**converted) if converted else df
@@ -5,6 +5,11 @@ from pathlib import Path
 
 from config.settings import load_config
 from database.add_slug_column import add_slug_column
+from database.add_hex_bin_columns import add_hex_bin_columns
+from database.add_listing_date_indexes import add_listing_date_indexes
+from database.add_unit_cluster_column import add_unit_cluster_column
+from database.clean_listing_values import clean_listing_values
+from database.add_dimension_keys import add_dimension_keys
 
 def apply_schema(cursor, schema_sql: str):
     statements = [s.strip() for s in schema_sql.split(';') if s.strip()]
@@ -34,6 +39,11 @@ def main():
         # After applying the base schema, run the data migrations
         print("\nRunning data migrations (e.g., adding slug column)...")
         add_slug_column()
+        add_hex_bin_columns()
+        add_listing_date_indexes()
+        add_unit_cluster_column()
+        clean_listing_values()
+        add_dimension_keys()
         print("All migrations completed successfully.")
 
     except mysql.connector.Error as err:
@@ -2,7 +2,6 @@ from __future__ import annotations
 from typing import List, Any, Tuple
 import mysql.connector
 from mysql.connector import errorcode
-from sqlalchemy import create_engine
 import logging
 
 from config.settings import load_config
@@ -21,11 +20,20 @@ class MySQLClient:
             'password': cfg.db.password,
         }
         self.db_name = cfg.db.name
-        self.sqlalchemy_engine = create_engine(f"mysql+mysqlconnector://{cfg.db.user}:{cfg.db.password}@{cfg.db.host}:{cfg.db.port}/{cfg.db.name}")
+        self._engine = None
         self.conn = None
         self.cursor = None
         self._column_cache = {}
 
+    @property
+    def sqlalchemy_engine(self):
+        """SQLAlchemy engine for pandas reads, created on first use: most clients only need the cursor."""
+        if self._engine is None:
+            from sqlalchemy import create_engine
+            c = self.db_config
+            self._engine = create_engine(f"mysql+mysqlconnector://{c['user']}:{c['password']}@{c['host']}:{c['port']}/{c['database']}")
+        return self._engine
+
     def __enter__(self) -> MySQLClient:
         try:
             self.conn = mysql.connector.connect(**self.db_config)
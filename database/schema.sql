@@ -35,8 +35,58 @@ CREATE TABLE IF NOT EXISTS listings (
   tier VARCHAR(64),
   -- Use API id (external_id) together with source as natural key for upsert
   unit VARCHAR(64),
+  -- Precomputed hex cell ids per map zoom level (analytics/hexbin.py)
+  hex_z9 BIGINT,
+  hex_z10 BIGINT,
+  hex_z11 BIGINT,
+  hex_z12 BIGINT,
+  hex_z13 BIGINT,
+  hex_z14 BIGINT,
+  hex_z15 BIGINT,
+  -- Listings of the same unit across brokers share this id (analytics/dedup.py)
+  unit_cluster_id BIGINT,
+  -- Integer keys of the repeated strings above, for joins and grouping (database/dimensions.py)
+  area_id INT,                                   -- neighborhoods.id of area_name
+  status_id SMALLINT,                            -- listing_statuses.id
+  building_type_id SMALLINT,                     -- building_types.id
+  source_type_id SMALLINT,                       -- source_types.id
+  zip_id SMALLINT,                               -- zip_codes.id
   date_added DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
   date_updated DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  UNIQUE KEY uniq_source_external (source, external_id),
+  KEY idx_area_id (area_id),
+  KEY idx_zip_id (zip_id)
+);
+
+-- Lookup tables of the listings' categorical columns, filled at ingest
+CREATE TABLE IF NOT EXISTS listing_statuses (
+  id SMALLINT PRIMARY KEY AUTO_INCREMENT,
+  name VARCHAR(32) NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS building_types (
+  id SMALLINT PRIMARY KEY AUTO_INCREMENT,
+  name VARCHAR(32) NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS source_types (
+  id SMALLINT PRIMARY KEY AUTO_INCREMENT,
+  name VARCHAR(32) NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS zip_codes (
+  id SMALLINT PRIMARY KEY AUTO_INCREMENT,
+  name VARCHAR(16) NOT NULL UNIQUE
+);
+
+-- Listings that failed ingest validation (scraping/validation.py), latest attempt per listing
+CREATE TABLE IF NOT EXISTS listing_quarantine (
+  id BIGINT PRIMARY KEY AUTO_INCREMENT,
+  source VARCHAR(32) NOT NULL,
+  external_id VARCHAR(128) NOT NULL,
+  reasons VARCHAR(255) NOT NULL,                 -- failed rules, e.g. 'coordinates,price'
+  payload TEXT,                                  -- the normalized listing as JSON
+  quarantined_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   UNIQUE KEY uniq_source_external (source, external_id)
 );
 
@@ -49,6 +99,84 @@ CREATE TABLE IF NOT EXISTS neighborhoods (
   UNIQUE KEY uniq_name (name)
 );
 
+-- Price model output (analytics/price_model.py). One row per listing, from the latest scoring run.
+CREATE TABLE IF NOT EXISTS listing_scores (
+  listing_id BIGINT PRIMARY KEY,
+  model_version VARCHAR(32) NOT NULL,
+  predicted_price INT,
+  residual INT,                                  -- price - predicted_price, negative is cheaper than expected
+  listing_updated_at DATETIME,                   -- listings.date_updated at scoring time, to detect changes
+  scored_at DATETIME NOT NULL,
+  KEY idx_model_version (model_version),
+  FOREIGN KEY (listing_id) REFERENCES listings(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS listing_comps (
+  listing_id BIGINT PRIMARY KEY,
+  comp_count INT NOT NULL,                       -- comparables found (same bedrooms, similar size, nearest first)
+  comp_median_price INT,
+  price_percentile DECIMAL(4,1),                 -- share of comparables cheaper than this listing, low is a good deal
+  max_comp_distance_m INT,                       -- distance to the furthest comparable used
+  scored_at DATETIME NOT NULL,
+  KEY idx_price_percentile (price_percentile),
+  FOREIGN KEY (listing_id) REFERENCES listings(id) ON DELETE CASCADE
+);
+
+-- Weekly listing trends (analytics/trends.py). area_name '*' and bedroom_count -1 are rollups over all values.
+CREATE TABLE IF NOT EXISTS weekly_trends (
+  week_start DATE NOT NULL,                      -- Monday of the week
+  area_name VARCHAR(128) NOT NULL,
+  bedroom_count DECIMAL(3,1) NOT NULL,
+  new_listings INT NOT NULL,                     -- listings added during the week
+  median_price INT,                              -- median asking price of the listings added during the week
+  off_market_listings INT NOT NULL,              -- listings that went off market during the week
+  median_days_on_market DECIMAL(6,1),            -- median date_added to off_market_at of those listings
+  PRIMARY KEY (week_start, area_name, bedroom_count),
+  KEY idx_area_bedrooms (area_name, bedroom_count)
+);
+
+-- High-water marks of incremental analytics jobs, e.g. the last listings.date_updated they processed
+CREATE TABLE IF NOT EXISTS analytics_watermarks (
+  name VARCHAR(64) PRIMARY KEY,
+  value DATETIME
+);
+
+-- Week each listing was last counted off market in by analytics/trends.py, to recompute it when off_market_at moves
+CREATE TABLE IF NOT EXISTS trend_off_market_weeks (
+  listing_id BIGINT PRIMARY KEY,
+  week_start DATE NOT NULL,
+  FOREIGN KEY (listing_id) REFERENCES listings(id) ON DELETE CASCADE
+);
+
+-- Saved searches (analytics/saved_searches.py). NULL criteria match anything, area_name also matches every area below it.
+CREATE TABLE IF NOT EXISTS saved_searches (
+  id INT PRIMARY KEY AUTO_INCREMENT,
+  name VARCHAR(128) NOT NULL,
+  area_name VARCHAR(128),
+  min_price INT,
+  max_price INT,
+  min_bedrooms DECIMAL(3,1),
+  max_bedrooms DECIMAL(3,1),
+  furnished BOOLEAN,
+  active BOOLEAN NOT NULL DEFAULT TRUE,
+  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- New or price-cut listings that met a saved search at ingest time
+CREATE TABLE IF NOT EXISTS search_matches (
+  search_id INT NOT NULL,
+  listing_id BIGINT NOT NULL,
+  reason VARCHAR(16) NOT NULL,                   -- 'new' or 'price_cut'
+  price INT NOT NULL,
+  previous_price INT,                            -- price before the cut
+  matched_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (search_id, listing_id, price),
+  KEY idx_matched_at (matched_at),
+  FOREIGN KEY (search_id) REFERENCES saved_searches(id) ON DELETE CASCADE,
+  FOREIGN KEY (listing_id) REFERENCES listings(id) ON DELETE CASCADE
+);
+
 -- Add foreign key from `listings` to `neighborhoods`
 ALTER TABLE listings ADD CONSTRAINT fk_area_name
 FOREIGN KEY (area_name) REFERENCES neighborhoods(name);
@@ -0,0 +1 @@
+"""The `nyc` command line: `python -m nyc <command>`. Commands are defined in nyc/cli.py."""
@@ -0,0 +1,4 @@
+from nyc.cli import cli
+
+if __name__ == '__main__':
+    cli(prog_name='nyc')
@@ -0,0 +1,107 @@
+"""
+One entry point for the project's scripts: `python -m nyc <command> [options]`.
+
+Every command lives in its own module and is imported only when it runs, so `nyc --help` and
+quick commands like `nyc config` don't pay for pandas, plotly, Dash or SQLAlchemy. Keep this
+module's imports to the standard library, click and config.settings; tests/test_cli.py holds it
+to an import-time budget.
+
+Click commands are used as they are. Scripts with a plain `main()` (argparse, or no options)
+get their remaining arguments through sys.argv, so they keep their own options and --help.
+"""
+import importlib
+import sys
+from typing import Dict, List, Optional, Tuple
+
+import click
+
+# name -> ('module:function', one-line help). The help is shown without importing the module.
+COMMANDS: Dict[str, Tuple[str, str]] = {
+    'migrate': ('database.migrate:main', 'Apply schema.sql and the data migrations.'),
+    'neighborhoods': ('scraping.ingest_neighborhoods:main', 'Load StreetEasy neighborhoods into the database.'),
+    'scrape': ('scraping.scrape_listings:main', 'Scrape listings of every neighborhood from StreetEasy.'),
+    'sources': ('scraping.run_sources:main', 'Ingest listings from several sources concurrently.'),
+    'dedup': ('analytics.dedup:main', 'Cluster listings of the same unit.'),
+    'comps': ('analytics.comps:main', 'Compute comparable listings.'),
+    'price-model': ('analytics.price_model:cli', 'Train and score the price model.'),
+    'trends': ('analytics.trends:main', 'Rebuild the weekly trend rollups.'),
+    'searches': ('analytics.saved_searches:main', 'Manage saved searches.'),
+    'pipeline': ('nyc.pipeline:main', 'Run the out-of-date stages of the nightly pipeline.'),
+    'export': ('tools.export_csv:main', 'Export listings to CSV.'),
+    'build-site': ('tools.build_static_site:main', 'Build the static site.'),
+    'treemap': ('tools.neighborhood_treemap:main', 'Write the neighborhood treemap.'),
+    'stream-aggregation': ('tools.stream_aggregation:main', 'Aggregate the listings table in chunks.'),
+    'synthetic-data': ('tools.synthetic_data:main', 'Write synthetic search API pages.'),
+    'benchmarks': ('tools.benchmarks:main', 'Run the benchmark suite against its baselines.'),
+    'fake-streeteasy': ('tools.fake_streeteasy:main', 'Serve a fake StreetEasy search API.'),
+    'scrape-throughput': ('tools.scrape_throughput:main', 'Measure scrape throughput against the fake API.'),
+}
+
+
+def _script_command(name: str, func, help_text: str) -> click.Command:
+    """Wraps a plain main() that parses sys.argv itself."""
+
+    @click.command(name, help=help_text, add_help_option=False,
+                   context_settings={'ignore_unknown_options': True, 'allow_extra_args': True})
+    @click.pass_context
+    def command(ctx):
+        sys.argv = [f"nyc {name}", *ctx.args]
+        func()
+
+    return command
+
+
+class LazyGroup(click.Group):
+    """A group whose commands are imported on first use, from COMMANDS-style 'module:function' paths."""
+
+    def __init__(self, *args, lazy_commands: Optional[Dict[str, Tuple[str, str]]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = lazy_commands or {}
+
+    def list_commands(self, ctx) -> List[str]:
+        return sorted([*super().list_commands(ctx), *self.lazy_commands])
+
+    def get_command(self, ctx, name: str) -> Optional[click.Command]:
+        if name in self.commands or name not in self.lazy_commands:
+            return super().get_command(ctx, name)
+        path, help_text = self.lazy_commands[name]
+        module_name, attr = path.split(':')
+        func = getattr(importlib.import_module(module_name), attr)
+        command = func if isinstance(func, click.Command) else _script_command(name, func, help_text)
+        self.commands[name] = command
+        return command
+
+    def format_commands(self, ctx, formatter):
+        # The command list comes from the registry: listing commands must not import them
+        rows = [(name, command.get_short_help_str()) for name, command in self.commands.items()]
+        rows += [(name, help_text) for name, (_, help_text) in self.lazy_commands.items() if name not in self.commands]
+        with formatter.section('Commands'):
+            formatter.write_dl(sorted(rows))
+
+
+@click.group(cls=LazyGroup, lazy_commands=COMMANDS)
+def cli():
+    """NYC apartments: scraping, analytics and tools."""
+
+
+@cli.command('serve')
+@click.option('--debug/--no-debug', default=True, help='Dash development server with reloading.')
+def serve(debug: bool):
+    """Run the Dash app's development server."""
+    from app.app import app
+    app.run_server(debug=debug)
+
+
+@cli.command('config')
+def show_config():
+    """Print the configuration, without the password."""
+    from dataclasses import asdict
+    from config.settings import load_config
+
+    for section, values in asdict(load_config()).items():
+        for key, value in values.items():
+            click.echo(f"{section}.{key} = {'***' if key == 'password' else value}")
+
+
+if __name__ == '__main__':
+    cli(prog_name='nyc')
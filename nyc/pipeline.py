@@ -0,0 +1,309 @@
+"""
+The nightly pipeline as a DAG of `nyc` commands that only runs what is out of date.
+
+Every stage is one `python -m nyc <command>` run, with the stages it depends on and the inputs
+it reads. Before a stage runs its inputs are fingerprinted (neighborhoods.json's hash, the
+listings data version, the day) and combined with its command and the output keys of the stages
+it depends on into one key. A stage whose key matches its last successful run, and whose outputs
+exist, is skipped. A stage that runs, for whatever reason (changed inputs, --force, a missing
+output), gets a new output key, so everything downstream runs too.
+Independent stages run in parallel, up to --jobs at a time. Keys are kept in PIPELINE_STATE_FILE.
+
+    python -m nyc pipeline                  # the nightly run
+    python -m nyc pipeline --dry-run        # what would run
+    python -m nyc pipeline --force trends --stage build_site
+"""
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import click
+
+from config.settings import ROOT_DIR, env_str
+
+PIPELINE_STATE_FILE = env_str('PIPELINE_STATE_FILE', os.path.join(ROOT_DIR, 'logs', 'pipeline_state.json'))
+NEIGHBORHOODS_FILE = os.path.join(ROOT_DIR, 'data', 'neighborhoods.json')
+
+
+@dataclass(frozen=True)
+class Stage:
+    """One step of the pipeline: the `nyc` command it runs, what it needs first and what it reads and writes."""
+    name: str
+    command: Tuple[str, ...]
+    deps: Tuple[str, ...] = ()
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _listings_version() -> str:
+    from app.data_utils import get_data_version
+    version = get_data_version(force=True)
+    if version == 'unknown':
+        raise RuntimeError("the listings data version is unavailable")
+    return version
+
+
+def _listing_rows_version() -> str:
+    """
+    Like the listings data version, but without the unit clustering stamp (analytics/dedup.py), so
+    dedup doesn't count its own writes as a change of its input.
+    """
+    from database.mysql_client import MySQLClient
+    with MySQLClient() as db:
+        rows = db.execute_query("SELECT COUNT(*), MAX(date_updated) FROM listings")
+    if not rows:
+        raise RuntimeError("the listings table is unavailable")
+    return f"{rows[0][0]}:{rows[0][1]}"
+
+
+# Input name -> function returning its current fingerprint. Evaluated right before a stage starts,
+# after the stages it depends on have finished.
+FINGERPRINTS: Dict[str, Callable[[], str]] = {
+    'neighborhoods_json': lambda: _file_hash(NEIGHBORHOODS_FILE),
+    'listings': _listings_version,
+    'listing_rows': _listing_rows_version,
+    # The crawl reads StreetEasy itself, which can't be fingerprinted: at most once a day
+    'day': lambda: date.today().isoformat(),
+}
+
+STAGES: List[Stage] = [
+    Stage('ingest_neighborhoods', ('neighborhoods',), inputs=('neighborhoods_json',)),
+    Stage('scrape_listings', ('scrape',), deps=('ingest_neighborhoods',), inputs=('day',)),
+    # Unit clusters, which everything reading listings below depends on
+    Stage('dedup', ('dedup',), deps=('scrape_listings',), inputs=('listing_rows',)),
+    # Aggregation refresh: independent of each other, run in parallel once the clusters are up to date
+    Stage('trends', ('trends',), deps=('dedup',), inputs=('listings',)),
+    Stage('comps', ('comps',), deps=('dedup',), inputs=('listings',)),
+    Stage('price_scores', ('price-model', 'score'), deps=('dedup',), inputs=('listings',)),
+    Stage('export_csv', ('export', '--out', 'data/listings.csv'), deps=('dedup',), inputs=('listings',),
+          outputs=('data/listings.csv',)),
+    # Charts
+    Stage('neighborhood_charts', ('treemap',), deps=('ingest_neighborhoods',), inputs=('neighborhoods_json',),
+          outputs=('img/neighborhood_treemap.html',)),
+    Stage('build_site', ('build-site', '--out', 'site'), deps=('trends', 'comps', 'price_scores'),
+          inputs=('listings',), outputs=('site/index.html',)),
+]
+
+
+def topological_order(stages: Iterable[Stage]) -> List[Stage]:
+    """The stages with every stage after its dependencies. Raises ValueError on unknown dependencies or cycles."""
+    by_name = {stage.name: stage for stage in stages}
+    order, state = [], {}
+
+    def visit(stage: Stage, path: Tuple[str, ...]):
+        if state.get(stage.name) == 'done':
+            return
+        if state.get(stage.name) == 'visiting':
+            raise ValueError(f"Pipeline stages form a cycle: {' -> '.join(path + (stage.name,))}")
+        state[stage.name] = 'visiting'
+        for dep in stage.deps:
+            if dep not in by_name:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dep}'")
+            visit(by_name[dep], path + (stage.name,))
+        state[stage.name] = 'done'
+        order.append(stage)
+
+    for stage in by_name.values():
+        visit(stage, ())
+    return order
+
+
+def select_stages(stages: List[Stage], names: Optional[Iterable[str]]) -> List[Stage]:
+    """The named stages and everything they depend on. All stages when names is empty."""
+    if not names:
+        return list(stages)
+    by_name = {stage.name: stage for stage in stages}
+    unknown = [name for name in names if name not in by_name]
+    if unknown:
+        raise ValueError(f"Unknown pipeline stages: {', '.join(unknown)}")
+    selected, todo = set(), list(names)
+    while todo:
+        name = todo.pop()
+        if name not in selected:
+            selected.add(name)
+            todo.extend(by_name[name].deps)
+    return [stage for stage in stages if stage.name in selected]
+
+
+def stage_key(stage: Stage, fingerprints: Dict[str, str], dep_keys: Dict[str, str]) -> str:
+    """Identifies one stage's work: its command, its input fingerprints and its dependencies' output keys."""
+    payload = json.dumps({'command': stage.command, 'inputs': fingerprints,
+                          'deps': {dep: dep_keys.get(dep) for dep in stage.deps}}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def output_key(key: str) -> str:
+    """Output key of one successful run of a stage with the given key: unique to the run."""
+    return hashlib.sha256(f"{key}:{time.time_ns()}:{os.getpid()}".encode('utf-8')).hexdigest()
+
+
+def load_state(path: str = PIPELINE_STATE_FILE) -> Dict[str, dict]:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logging.warning(f"Ignoring unreadable pipeline state {path}: {e}")
+        return {}
+
+
+def save_state(state: Dict[str, dict], path: str = PIPELINE_STATE_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def run_command(stage: Stage) -> bool:
+    """Runs a stage's `nyc` command in its own process. True when it exits with status 0."""
+    result = subprocess.run([sys.executable, '-m', 'nyc', *stage.command], cwd=ROOT_DIR)
+    return result.returncode == 0
+
+
+def _fingerprint(stage: Stage, fingerprints: Dict[str, Callable[[], str]]) -> Optional[Dict[str, str]]:
+    """Current values of a stage's inputs, or None if one can't be read (the stage then always runs)."""
+    try:
+        return {name: str(fingerprints[name]()) for name in stage.inputs}
+    except Exception as e:
+        logging.warning(f"Can't fingerprint the inputs of '{stage.name}', running it: {e}")
+        return None
+
+
+def run_pipeline(stages: List[Stage] = None, jobs: int = 2, force: Iterable[str] = (), dry_run: bool = False,
+                 state_path: str = PIPELINE_STATE_FILE, runner: Callable[[Stage], bool] = run_command,
+                 fingerprints: Dict[str, Callable[[], str]] = None) -> Dict[str, str]:
+    """
+    Runs every out-of-date stage, dependencies first, independent stages in parallel.
+
+    :param stages: Stages to consider. Defaults to STAGES.
+    :param jobs: Stages running at the same time.
+    :param force: Stage names to run even when up to date.
+    :param dry_run: Decide and report, but run nothing and keep the state. Stages downstream of one
+                    that would run are reported as 'run'.
+    :param state_path: JSON file with the key and output key of every stage's last successful run.
+    :param runner: Runs one stage and returns whether it succeeded.
+    :param fingerprints: Input name -> fingerprint function. Defaults to FINGERPRINTS.
+    :return: Outcome by stage name: 'ran', 'skipped', 'failed', 'blocked' (a dependency failed),
+             or 'run' for a dry run.
+    """
+    stages = topological_order(STAGES if stages is None else stages)
+    fingerprints = FINGERPRINTS if fingerprints is None else fingerprints
+    force = set(force)
+    state = load_state(state_path)
+    # Output keys: what dependents' keys are built from
+    keys: Dict[str, Optional[str]] = {}
+    # Keys of the stages started in this run, stored once they succeed
+    run_keys: Dict[str, Optional[str]] = {}
+    outcome: Dict[str, str] = {}
+    pending = {stage.name: stage for stage in stages}
+    running = {}
+
+    def decide(stage: Stage) -> Tuple[Optional[str], bool]:
+        """The stage's key and whether it has to run."""
+        inputs = _fingerprint(stage, fingerprints)
+        if inputs is None or any(keys.get(dep) is None for dep in stage.deps):
+            return None, True
+        key = stage_key(stage, inputs, keys)
+        outputs_missing = any(not os.path.exists(os.path.join(ROOT_DIR, p)) for p in stage.outputs)
+        return key, stage.name in force or outputs_missing or state.get(stage.name, {}).get('key') != key
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while pending or running:
+            for name, stage in list(pending.items()):
+                if len(running) >= max(1, jobs):
+                    break
+                dep_outcomes = [outcome.get(dep) for dep in stage.deps]
+                if any(o in ('failed', 'blocked') for o in dep_outcomes):
+                    outcome[name] = 'blocked'
+                    del pending[name]
+                    logging.error(f"Pipeline stage '{name}' blocked: a dependency failed.")
+                    continue
+                if any(o is None for o in dep_outcomes):
+                    continue
+                del pending[name]
+                # A dry run can't know the keys downstream of a stage it doesn't run
+                if dry_run and any(o == 'run' for o in dep_outcomes):
+                    keys[name], outcome[name] = None, 'run'
+                    continue
+                key, needed = decide(stage)
+                keys[name] = run_keys[name] = key
+                if not needed:
+                    # Dependents see the output of the stage's last run. State from before output keys: the key.
+                    keys[name] = state[name].get('output', key)
+                    outcome[name] = 'skipped'
+                    logging.info(f"Pipeline stage '{name}' is up to date.")
+                elif dry_run:
+                    keys[name], outcome[name] = None, 'run'
+                else:
+                    logging.info(f"Pipeline stage '{name}': nyc {' '.join(stage.command)}")
+                    running[pool.submit(runner, stage)] = (stage, time.perf_counter())
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, started = running.pop(future)
+                try:
+                    ok = bool(future.result())
+                except Exception as e:
+                    logging.error(f"Pipeline stage '{stage.name}' raised: {e}")
+                    ok = False
+                seconds = time.perf_counter() - started
+                outcome[stage.name] = 'ran' if ok else 'failed'
+                if not ok:
+                    logging.error(f"Pipeline stage '{stage.name}' failed after {seconds:.1f}s.")
+                    continue
+                logging.info(f"Pipeline stage '{stage.name}' finished in {seconds:.1f}s.")
+                key = run_keys[stage.name]
+                # A new output key even when the key is unchanged (forced, or rerun for a missing output),
+                # so everything downstream runs too. Without a key (unfingerprintable inputs) nothing is stored
+                # and dependents have no key either, so they run.
+                keys[stage.name] = output_key(key) if key is not None else None
+                if key is not None:
+                    state[stage.name] = {'key': key, 'output': keys[stage.name],
+                                         'finished_at': time.strftime('%Y-%m-%d %H:%M:%S'), 'seconds': round(seconds, 1)}
+                    save_state(state, state_path)
+    return outcome
+
+
+@click.command()
+@click.option('--jobs', default=2, type=int, help='Stages to run at the same time.')
+@click.option('--stage', 'stage_names', multiple=True, help='Only this stage and its dependencies. Repeatable.')
+@click.option('--force', multiple=True, help='Run this stage even if it is up to date. Repeatable.')
+@click.option('--dry-run', is_flag=True, help='Show what would run without running it.')
+def main(jobs: int, stage_names, force, dry_run: bool):
+    """Run the out-of-date stages of the nightly pipeline."""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        stages = select_stages(STAGES, stage_names)
+        unknown = set(force) - {stage.name for stage in STAGES}
+        if unknown:
+            raise ValueError(f"Unknown pipeline stages: {', '.join(sorted(unknown))}")
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    outcome = run_pipeline(stages, jobs=jobs, force=force, dry_run=dry_run)
+    for stage in topological_order(stages):
+        click.echo(f"{stage.name:<22} {outcome.get(stage.name, '-')}")
+    if any(o in ('failed', 'blocked') for o in outcome.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,12 @@
 from typing import List, Dict
+import logging
 import pandas as pd
 import re
+from database.dimensions import assign_dimension_ids
 from database.mysql_client import MySQLClient
+from analytics.hexbin import assign_hex_columns
+from analytics.saved_searches import notify_matches, stored_prices
+from scraping.validation import quarantine_listings, validate_listings
 
 
 def ingest_listings(listings: List[Dict], db: MySQLClient):
@@ -13,7 +18,15 @@ def ingest_listings(listings: List[Dict], db: MySQLClient):
     """
     if not listings:
         return
+    write_listings(normalize_listings(listings), db)
 
+
+def normalize_listings(listings: List[Dict]) -> pd.DataFrame:
+    """
+    Turns StreetEasy API listing nodes (camelCase, nested geoPoint) into a frame of `listings`
+    columns, with the map hex bins precomputed. Columns the table doesn't have are kept, and
+    dropped by write_listings.
+    """
     df = pd.DataFrame(listings)
 
     # API gives us lat/lon nested in geoPoint. Flatten it.
@@ -22,6 +35,8 @@ def ingest_listings(listings: List[Dict], db: MySQLClient):
         df['latitude'] = geo_points['latitude']
         df['longitude'] = geo_points['longitude']
         df.drop(columns=['geoPoint'], inplace=True)
+        # Precompute map hex bins for every zoom level so the map never bins on the read path
+        df = assign_hex_columns(df)
 
     # Define a function to convert camelCase to snake_case
     def camel_to_snake(name):
@@ -35,10 +50,32 @@ def ingest_listings(listings: List[Dict], db: MySQLClient):
     rename_map = {
         'id': 'external_id',
     }
-    df = df.rename(columns=rename_map)
+    return df.rename(columns=rename_map)
+
+
+def write_listings(df: pd.DataFrame, db: MySQLClient):
+    """
+    Validates normalized listings (see normalize_listings and scraping/validation.py), upserts the
+    valid ones into the `listings` table and matches them against saved searches. Invalid ones go
+    to the `listing_quarantine` table.
+
+    :param df: Listings with `listings` column names. Other columns are ignored.
+    :param db: An active MySQLClient instance.
+    """
+    if df.empty:
+        return
+
+    df, rejected = validate_listings(df)
+    quarantine_listings(rejected, db)
+    if df.empty:
+        return
 
     # Get the list of columns from the database schema to ensure we only insert what's needed
     db_columns = db.get_table_columns('listings')
+
+    # Integer keys of the area and categorical columns, once the dimension keys migration has run
+    if 'area_id' in db_columns:
+        df = assign_dimension_ids(df, db)
     
     # Filter DataFrame to only include columns that exist in the database
     df_to_insert = df[[col for col in df.columns if col in db_columns]]
@@ -50,4 +87,13 @@ def ingest_listings(listings: List[Dict], db: MySQLClient):
     df_prepared = df_to_insert.astype(object).where(pd.notna(df_to_insert), None)
     values_to_insert = [tuple(row) for row in df_prepared.to_numpy()]
 
-    db.insert_many('listings', columns_to_insert, values_to_insert, on_duplicate='update')
\ No newline at end of file
+    # Prices before the upsert tell new and price-cut listings apart for saved search matching
+    previous = stored_prices(db, df_to_insert)
+
+    db.insert_many('listings', columns_to_insert, values_to_insert, on_duplicate='update')
+
+    # A failed notification must never lose the batch, which is already committed
+    try:
+        notify_matches(db, df_to_insert, previous)
+    except Exception as e:
+        logging.error(f"Failed to match listings against saved searches: {e}")
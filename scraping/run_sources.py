@@ -0,0 +1,172 @@
+"""
+Runs several listing sources (scraping/sources.py) at once and writes their listings in batches.
+
+Every source runs in its own worker process with its own rate limit, so a slow or throttled
+source never holds back the others. Workers put normalized listing frames on one bounded queue.
+The parent process is the only writer: it collects frames into batches of INGEST_BATCH_SIZE rows
+and upserts each batch over a single database connection.
+
+    python -m scraping.run_sources --streeteasy --pages 2 --files data/replay
+    python -m scraping.run_sources --files data/replay --files data/replay2 --file-rate 50
+"""
+import logging
+import multiprocessing
+import queue
+import time
+from typing import Callable, Dict, List, Optional
+
+import click
+import pandas as pd
+
+from config.settings import env_int
+from database.mysql_client import MySQLClient
+from scraping.ingest_listings import write_listings
+from scraping.sources import ListingSource, LocalFileSource, StreetEasySource
+
+# Rows per write. Larger batches mean fewer round trips and commits.
+INGEST_BATCH_SIZE = env_int('INGEST_BATCH_SIZE', 1000)
+# Frames waiting for the writer. A full queue blocks the workers until the writer catches up.
+QUEUE_SIZE = 64
+
+
+def _run_source(worker: int, source: ListingSource, frames):
+    """Worker process: every task of one source, fetched, parsed and normalized in order."""
+    try:
+        for task in source.tasks():
+            try:
+                for payload in source.fetch(task):
+                    records = source.parse(payload)
+                    if records:
+                        frames.put((worker, source.normalize(records)))
+            except Exception as e:
+                # One failed task (a neighborhood, a file) doesn't stop the source
+                logging.error(f"Source '{source.name}' failed on {task!r}: {e}")
+    except Exception as e:
+        logging.error(f"Source '{source.name}' failed: {e}")
+    finally:
+        frames.put((worker, None))
+
+
+class BatchWriter:
+    """Collects listing frames and writes them batch_size rows at a time."""
+
+    def __init__(self, write: Callable[[pd.DataFrame], None], batch_size: int = INGEST_BATCH_SIZE):
+        self.write = write
+        self.batch_size = batch_size
+        self.pending: List[pd.DataFrame] = []
+        self.pending_rows = 0
+        self.written = 0
+        self.batches = 0
+
+    def add(self, df: pd.DataFrame):
+        self.pending.append(df)
+        self.pending_rows += len(df)
+        if self.pending_rows >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        batch = pd.concat(self.pending, ignore_index=True)
+        # A listing seen twice in one batch (e.g. on two result pages) is written once, latest wins
+        batch = batch.drop_duplicates(['source', 'external_id'], keep='last')
+        self.pending, self.pending_rows = [], 0
+        self.write(batch)
+        self.written += len(batch)
+        self.batches += 1
+
+
+def run_sources(sources: List[ListingSource], batch_size: int = INGEST_BATCH_SIZE,
+                write: Optional[Callable[[pd.DataFrame], None]] = None) -> Dict:
+    """
+    Runs every source in its own process until all are done, writing their listings in batches.
+
+    :param sources: Sources to run concurrently.
+    :param batch_size: Rows per write.
+    :param write: Writes one batch. Defaults to write_listings over one database connection.
+    :return: Run statistics: listings received per source, listings and batches written, seconds.
+    """
+    if write is None:
+        with MySQLClient() as db:
+            return run_sources(sources, batch_size, lambda batch: write_listings(batch, db))
+
+    started = time.perf_counter()
+    frames = multiprocessing.Queue(maxsize=QUEUE_SIZE)
+    workers = [multiprocessing.Process(target=_run_source, args=(i, source, frames), name=f"source-{source.name}-{i}")
+               for i, source in enumerate(sources)]
+    for worker in workers:
+        worker.start()
+
+    writer = BatchWriter(write, batch_size)
+    received = [0] * len(sources)
+    running = len(workers)
+    finished = False
+    try:
+        while running:
+            try:
+                worker, df = frames.get(timeout=1)
+            except queue.Empty:
+                if not any(w.is_alive() for w in workers):
+                    # A worker died without reporting; nothing more will arrive
+                    break
+                continue
+            if df is None:
+                running -= 1
+                continue
+            received[worker] += len(df)
+            writer.add(df)
+        writer.flush()
+        finished = True
+    finally:
+        if not finished:
+            # The writer failed. Workers blocked on the full queue would never exit, and their
+            # unread frames would keep the interpreter from exiting.
+            for worker in workers:
+                worker.terminate()
+            frames.cancel_join_thread()
+        for worker in workers:
+            worker.join()
+        frames.close()
+
+    elapsed = time.perf_counter() - started
+    stats = {
+        'received': {f"{source.name}-{i}": count for i, (source, count) in enumerate(zip(sources, received))},
+        'written': writer.written,
+        'batches': writer.batches,
+        'seconds': elapsed,
+    }
+    logging.info(f"Wrote {writer.written} listings in {writer.batches} batches from {len(sources)} sources "
+                 f"in {elapsed:.1f}s ({writer.written / max(elapsed, 1e-9):.0f} listings/s).")
+    return stats
+
+
+@click.command()
+@click.option('--streeteasy', is_flag=True, help='Scrape StreetEasy')
+@click.option('--level', default=3, type=int, help='StreetEasy neighborhood level to scrape')
+@click.option('--pages', default=0, type=int, help='Max StreetEasy pages per neighborhood, 0 for all')
+@click.option('--streeteasy-rate', default=0.0, type=float,
+              help='Max StreetEasy requests per second. Default: one per REQUEST_DELAY_SECONDS.')
+@click.option('--files', 'file_paths', multiple=True, type=click.Path(exists=True),
+              help='File, or directory of .json/.jsonl files, to ingest. Repeat for one source per path.')
+@click.option('--file-rate', default=0.0, type=float, help='Max files per second per file source, 0 for no limit')
+@click.option('--batch-size', default=INGEST_BATCH_SIZE, type=int, help='Rows per database write')
+def main(streeteasy: bool, level: int, pages: int, streeteasy_rate: float, file_paths, file_rate: float,
+         batch_size: int):
+    """Ingests listings from several sources concurrently."""
+    from scraping.scrape_listings import finish_scraping_run, setup_logging
+    # Logs to logs/scraping.log like the single-source scraper
+    setup_logging()
+
+    sources = [LocalFileSource(path, rate_per_second=file_rate) for path in file_paths]
+    if streeteasy:
+        sources.append(StreetEasySource(level=level, max_pages=pages, rate_per_second=streeteasy_rate))
+    if not sources:
+        raise click.UsageError("Give at least one source: --streeteasy or --files.")
+    stats = run_sources(sources, batch_size)
+    for name, count in stats['received'].items():
+        logging.info(f"  {name}: {count} listings")
+    finish_scraping_run()
+
+
+if __name__ == '__main__':
+    main()
@@ -2,37 +2,45 @@ import click
 import logging
 from typing import Optional, Set
 import os
+import sys
+from datetime import date
 
 from scraping.streeteasy import StreetEasyScraper
 from scraping.ingest_listings import ingest_listings
 from database.mysql_client import MySQLClient
+from app.cache_store import mark_data_changed
 
 LOG_DIR = 'logs'
-if not os.path.exists(LOG_DIR):
-    os.makedirs(LOG_DIR)
 
-PROCESSED_NEIGHBORHOODS_FILE = os.path.join(LOG_DIR, 'processed_neighborhoods.txt')
-
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(os.path.join(LOG_DIR, 'scraping.log')),
-        logging.StreamHandler()
-    ]
-)
-
-def get_processed_neighborhoods() -> Set[str]:
-    """Reads the list of already processed neighborhoods from the log file."""
-    if not os.path.exists(PROCESSED_NEIGHBORHOODS_FILE):
+# Neighborhoods finished by a run, one file per run so every run (by default every day) crawls everything
+PROCESSED_NEIGHBORHOODS_FILE = os.path.join(LOG_DIR, 'processed_neighborhoods-{run}.txt')
+
+
+def setup_logging():
+    """Logs to logs/scraping.log and the console. Called by the scraper commands, not at import."""
+    os.makedirs(LOG_DIR, exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(os.path.join(LOG_DIR, 'scraping.log')),
+            logging.StreamHandler()
+        ],
+        # Modules imported before this may already have configured the console
+        force=True,
+    )
+
+def get_processed_neighborhoods(run: str) -> Set[str]:
+    """Reads the list of neighborhoods already processed by a run from its log file."""
+    path = PROCESSED_NEIGHBORHOODS_FILE.format(run=run)
+    if not os.path.exists(path):
         return set()
-    with open(PROCESSED_NEIGHBORHOODS_FILE, 'r') as f:
+    with open(path, 'r') as f:
         return set(line.strip() for line in f)
 
-def mark_neighborhood_as_processed(neighborhood_name: str):
-    """Appends a neighborhood name to the processed log file."""
-    with open(PROCESSED_NEIGHBORHOODS_FILE, 'a') as f:
+def mark_neighborhood_as_processed(neighborhood_name: str, run: str):
+    """Appends a neighborhood name to a run's processed log file."""
+    with open(PROCESSED_NEIGHBORHOODS_FILE.format(run=run), 'a') as f:
         f.write(neighborhood_name + '\n')
 
 
@@ -42,12 +50,18 @@ def mark_neighborhood_as_processed(neighborhood_name: str):
 @click.option('--delay', default=None, type=float, help='Delay between requests in seconds')
 @click.option('--timeout', default=None, type=int, help='Request timeout seconds')
 @click.option('--level', default=3, type=int, help='Neighborhood level to scrape')
-def main(pages: int, start_page: int, delay: Optional[float], timeout: Optional[int], level: int):
+@click.option('--base-url', default=None, help='Scrape this server instead of StreetEasy, e.g. tools/fake_streeteasy.py')
+@click.option('--run', 'run', default=None,
+              help='Progress is tracked per run name. Default: today, so a rerun the same day resumes.')
+def main(pages: int, start_page: int, delay: Optional[float], timeout: Optional[int], level: int,
+         base_url: Optional[str], run: Optional[str]):
     """
     Scrapes listings for all neighborhoods from StreetEasy and ingests them into the database.
-    It tracks progress and can be resumed if it fails.
+    It tracks progress and can be resumed if it fails. Exits with status 1 if a neighborhood failed.
     """
-    se = StreetEasyScraper(delay_seconds=delay, timeout_seconds=timeout)
+    setup_logging()
+    run = run or date.today().isoformat()
+    se = StreetEasyScraper(delay_seconds=delay, timeout_seconds=timeout, base_url=base_url)
     
     with MySQLClient() as db:
         # Get neighborhoods
@@ -61,20 +75,23 @@ def main(pages: int, start_page: int, delay: Optional[float], timeout: Optional[
                     neighborhood_map[name] = name.lower().replace(' ', '-')
         except Exception as e:
             logging.error(f"Failed to fetch neighborhoods from database: {e}")
-            return
+            sys.exit(1)
+        if not neighborhood_map:
+            logging.error(f"No level-{level} neighborhoods in the database. Run scraping.ingest_neighborhoods first.")
+            sys.exit(1)
 
-        processed_neighborhoods = get_processed_neighborhoods()
+        processed_neighborhoods = get_processed_neighborhoods(run)
         
         neighborhoods_to_process = [name for name in neighborhood_map if name not in processed_neighborhoods]
         
-        logging.info(f"Found {len(neighborhood_map)} level-{level} neighborhoods. {len(processed_neighborhoods)} already processed.")
+        logging.info(f"Found {len(neighborhood_map)} level-{level} neighborhoods. {len(processed_neighborhoods)} already processed in run {run}.")
         logging.info(f"Starting to scrape {len(neighborhoods_to_process)} new neighborhoods.")
 
+        neighborhood_failed = False
         for neighborhood_name in neighborhoods_to_process:
             neighborhood_slug = neighborhood_map[neighborhood_name]
             logging.info(f"Scraping listings for '{neighborhood_name}' (slug: {neighborhood_slug})...")
             
-            neighborhood_failed = False
             try:
                 # Fetch the first page to determine pagination
                 current_page = start_page
@@ -83,7 +100,7 @@ def main(pages: int, start_page: int, delay: Optional[float], timeout: Optional[
 
                 if not listings:
                     logging.info(f"No listings found for '{neighborhood_slug}' on page {current_page}. Moving to next neighborhood.")
-                    mark_neighborhood_as_processed(neighborhood_name)
+                    mark_neighborhood_as_processed(neighborhood_name, run)
                     continue
 
                 ingest_listings(listings, db)
@@ -114,7 +131,7 @@ def main(pages: int, start_page: int, delay: Optional[float], timeout: Optional[
 
             except Exception as e:
                 logging.error(f"An error occurred while scraping '{neighborhood_slug}': {e}")
-                logging.info(f"To resume this neighborhood, run the script again. It will restart on '{neighborhood_name}'.")
+                logging.info(f"To resume this neighborhood, run the script again with --run {run}. It will restart on '{neighborhood_name}'.")
                 neighborhood_failed = True
             
             if neighborhood_failed:
@@ -122,13 +139,26 @@ def main(pages: int, start_page: int, delay: Optional[float], timeout: Optional[
                 break
             
             # Mark as processed only if the entire neighborhood was scraped without error
-            mark_neighborhood_as_processed(neighborhood_name)
+            mark_neighborhood_as_processed(neighborhood_name, run)
             logging.info(f"Finished scraping '{neighborhood_name}'. Marked as processed.")
         
-        if not neighborhoods_to_process and neighborhood_map:
-             logging.info(f"All level-{level} neighborhoods have already been processed.")
+        if not neighborhoods_to_process:
+             logging.info(f"All level-{level} neighborhoods have already been processed in run {run}.")
         
-        logging.info("Scraping run finished.")
+        finish_scraping_run()
+    # The listings ingested so far are kept, but the crawl is incomplete
+    if neighborhood_failed:
+        sys.exit(1)
+
+
+def finish_scraping_run():
+    """
+    Cache refresh that follows every scraping run. Unit clusters and weekly trends are derived by
+    their own commands (`nyc dedup`, `nyc trends`), which `nyc pipeline` runs after the crawl.
+    """
+    # Let running dashboard servers rebuild their caches for the new data
+    mark_data_changed()
+    logging.info("Scraping run finished.")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,159 @@
+"""
+Listing sources for scraping/run_sources.py.
+
+A source turns some external feed into rows of the `listings` table in three steps:
+
+    tasks()          units of work, e.g. one neighborhood
+    fetch(task)      raw payloads of a task, e.g. its result pages. Respects the source's rate limit.
+    parse(payload)   raw listing records of one payload
+    normalize(recs)  a DataFrame with `listings` column names, `source` and `external_id` set
+
+Each source runs in its own worker process, so fetch may block and keep state (sessions, cursors)
+between calls. Sources are pickled into the worker, so heavy state is created lazily in fetch.
+New sources subclass ListingSource and register themselves in SOURCES.
+"""
+import glob
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+from scraping.ingest_listings import normalize_listings
+from scraping.streeteasy import StreetEasyScraper
+
+
+class RateLimiter:
+    """Spaces calls at least 1 / rate_per_second apart. A rate of 0 or less means no limit."""
+
+    def __init__(self, rate_per_second: float = 0.0):
+        self.interval = 1.0 / rate_per_second if rate_per_second and rate_per_second > 0 else 0.0
+        self._next = 0.0
+
+    def wait(self):
+        now = time.monotonic()
+        if now < self._next:
+            time.sleep(self._next - now)
+            now = self._next
+        self._next = now + self.interval
+
+
+class ListingSource:
+    """Base class of listing sources. `name` is stored in `listings.source`."""
+    name = 'source'
+
+    def __init__(self, rate_per_second: float = 0.0):
+        self.rate_per_second = rate_per_second
+        self.limiter = RateLimiter(rate_per_second)
+
+    def tasks(self) -> Iterable[Any]:
+        raise NotImplementedError
+
+    def fetch(self, task) -> Iterator[Any]:
+        raise NotImplementedError
+
+    def parse(self, payload) -> List[Dict]:
+        raise NotImplementedError
+
+    def normalize(self, records: List[Dict]) -> pd.DataFrame:
+        df = normalize_listings(records)
+        df['source'] = self.name
+        return df
+
+
+class StreetEasySource(ListingSource):
+    """
+    StreetEasy's search API, one task per neighborhood of a level (or per given slug), every result
+    page of it. base_url and retry_backoff_seconds are passed to StreetEasyScraper.
+    """
+    name = 'streeteasy'
+
+    def __init__(self, level: int = 3, max_pages: int = 0, rate_per_second: float = 0.0,
+                 timeout_seconds: Optional[int] = None, slugs: Optional[List[str]] = None,
+                 base_url: Optional[str] = None, retry_backoff_seconds: Optional[float] = None):
+        super().__init__(rate_per_second)
+        self.level = level
+        self.max_pages = max_pages
+        self.timeout_seconds = timeout_seconds
+        self.slugs = slugs
+        self.base_url = base_url
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self._scraper = None
+
+    @property
+    def scraper(self) -> StreetEasyScraper:
+        # Created in the worker process: the session isn't shared across processes
+        if self._scraper is None:
+            # The scraper's own jittered delay is the rate limit. None keeps the configured delay.
+            delay = 1.0 / self.rate_per_second if self.rate_per_second > 0 else None
+            self._scraper = StreetEasyScraper(delay_seconds=delay, timeout_seconds=self.timeout_seconds,
+                                              base_url=self.base_url, retry_backoff_seconds=self.retry_backoff_seconds)
+        return self._scraper
+
+    def tasks(self) -> Iterable[str]:
+        if self.slugs is not None:
+            return self.slugs
+        from database.mysql_client import MySQLClient
+        with MySQLClient() as db:
+            rows = db.execute_query("SELECT name, slug FROM neighborhoods WHERE level = %s", (self.level,))
+        return [slug if slug and slug.strip() else name.lower().replace(' ', '-') for name, slug in rows]
+
+    def fetch(self, task: str) -> Iterator[dict]:
+        page, page_limit = 1, 1
+        while page <= page_limit:
+            listings, total_pages = self.scraper.search_rentals(neighborhood=task, page=page)
+            if not listings:
+                return
+            if page == 1:
+                # Same cap as scrape_listings: the API stops serving after 50 pages
+                page_limit = min(total_pages, 50)
+                if self.max_pages > 0:
+                    page_limit = min(page_limit, self.max_pages)
+            # search_rentals already parsed the page
+            yield {'listings': listings}
+            page += 1
+
+    def parse(self, payload: dict) -> List[Dict]:
+        return payload['listings']
+
+
+class LocalFileSource(ListingSource):
+    """
+    Listings read from files, for running the whole pipeline offline. Every file is one payload:
+    a `.json` file holds a saved StreetEasy search API response, a `.jsonl` file one listing
+    node per line.
+    """
+    name = 'file'
+
+    def __init__(self, path: str, name: str = 'file', rate_per_second: float = 0.0):
+        super().__init__(rate_per_second)
+        self.path = path
+        self.name = name
+
+    def tasks(self) -> Iterable[str]:
+        if os.path.isfile(self.path):
+            return [self.path]
+        return sorted(glob.glob(os.path.join(self.path, '*.json')) + glob.glob(os.path.join(self.path, '*.jsonl')))
+
+    def fetch(self, task: str) -> Iterator[tuple]:
+        self.limiter.wait()
+        with open(task, encoding='utf-8') as f:
+            yield task, f.read()
+
+    def parse(self, payload: tuple) -> List[Dict]:
+        file_name, text = payload
+        if file_name.endswith('.jsonl'):
+            return [json.loads(line) for line in text.splitlines() if line.strip()]
+        try:
+            return list(StreetEasyScraper._parse_search_json(json.loads(text)))
+        except json.JSONDecodeError as e:
+            logging.error(f"Skipping {file_name}: {e}")
+            return []
+
+
+SOURCES = {
+    StreetEasySource.name: StreetEasySource,
+    LocalFileSource.name: LocalFileSource,
+}
@@ -7,7 +7,6 @@ from typing import Iterator, List, Optional
 import random
 import requests
 from requests import Response
-from bs4 import BeautifulSoup
 import logging
 
 from config.settings import load_config
@@ -45,8 +44,14 @@ def _headers():
 
 
 class StreetEasyScraper:
-    def __init__(self, delay_seconds: Optional[float] = None, timeout_seconds: Optional[int] = None):
+    def __init__(self, delay_seconds: Optional[float] = None, timeout_seconds: Optional[int] = None,
+                 base_url: Optional[str] = None, retry_backoff_seconds: Optional[float] = None):
         cfg = load_config()
+        # Site root and search API the requests go to. Listing URLs stored in the database always use BASE_URL.
+        self.base_url = (base_url or cfg.scrape.base_url).rstrip('/')
+        self.api_base = f"{self.base_url}/srp-service-api"
+        # First wait after a 403/429/503, doubled on every retry
+        self.retry_backoff = retry_backoff_seconds if retry_backoff_seconds is not None else cfg.scrape.retry_backoff_seconds
         base_delay = delay_seconds if delay_seconds is not None else cfg.scrape.request_delay_seconds
         # Introduce small jitter window (±30%)
         self.delay = max(0.1, base_delay)
@@ -70,7 +75,7 @@ class StreetEasyScraper:
         self.session = requests.Session()
         # Warm-up: visit homepage to establish cookies
         try:
-            self.session.get(BASE_URL + "/", timeout=self.timeout, proxies=self.proxies)
+            self.session.get(self.base_url + "/", timeout=self.timeout, proxies=self.proxies)
         except requests.exceptions.RequestException as e:
             logging.warning(f"Session warm-up failed: {e}")
 
@@ -82,8 +87,8 @@ class StreetEasyScraper:
     def _get(self, url: str) -> Response:
         # Basic retry/backoff on 403 and some transient statuses
         attempts = 0
-        backoff = 15  # Start with a longer backoff
-        is_api = url.startswith(API_BASE)
+        backoff = self.retry_backoff  # Start with a longer backoff
+        is_api = url.startswith(self.api_base)
         while True:
             # Prepare request-specific headers
             headers = dict(self.session.headers)
@@ -93,8 +98,8 @@ class StreetEasyScraper:
                     "Sec-Fetch-Mode": "cors",
                     "Sec-Fetch-Site": "same-origin",
                     "Sec-Fetch-Dest": "empty",
-                    "Referer": f"{BASE_URL}/for-rent",
-                    "Origin": BASE_URL,
+                    "Referer": f"{self.base_url}/for-rent",
+                    "Origin": self.base_url,
                     "X-Requested-With": "XMLHttpRequest",
                 })
             headers["User-Agent"] = random.choice(USER_AGENTS) # Rotate User-Agent per request
@@ -129,7 +134,7 @@ class StreetEasyScraper:
         if filters:
             filter_part = "|".join(filters)
         
-        url = f"{API_BASE}/for-rent/{neighborhood}/{filter_part}?page={page}" if filter_part else f"{API_BASE}/for-rent/{neighborhood}?page={page}"
+        url = f"{self.api_base}/for-rent/{neighborhood}/{filter_part}?page={page}" if filter_part else f"{self.api_base}/for-rent/{neighborhood}?page={page}"
         self._sleep()
         resp = self._get(url)
         data = resp.json()
@@ -147,7 +152,8 @@ class StreetEasyScraper:
         digits = re.sub(r"[^0-9]", "", text)
         return int(digits) if digits else None
 
-    def _parse_search_json(self, data: dict) -> Iterator[dict]:
+    @staticmethod
+    def _parse_search_json(data: dict) -> Iterator[dict]:
         """
         Parses the JSON response from the StreetEasy SRP API.
         The main listings are in `listingData.edges`, where each edge has a `node`.
@@ -0,0 +1,123 @@
+"""
+Validation of normalized listings at ingest, once per batch, so readers can trust the stored rows.
+
+Every rule is a vectorized check over the whole batch:
+
+  - coordinates    latitude and longitude present and inside NYC_BOUNDS
+  - price          present and inside PRICE_RANGE
+  - size           living_area_size unknown or inside SIZE_RANGE
+
+Before the checks, the columns in ZERO_AS_UNKNOWN have 0 replaced with missing: the API reports
+an unknown size as 0. Rows failing any rule are not written to `listings`; they are upserted into
+`listing_quarantine` with the names of the rules they failed, keyed like `listings` on
+(source, external_id).
+
+`status` and `building_type` values outside ENUM_VALUES only log a warning: the lists are what
+has been seen so far, not what the API may send, so a new value is added here once confirmed
+rather than rejected.
+"""
+import logging
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Generous box around the five boroughs
+NYC_BOUNDS = {'latitude': (40.45, 40.95), 'longitude': (-74.30, -73.65)}
+# Monthly rent in dollars
+PRICE_RANGE = (100, 100_000)
+# Square feet
+SIZE_RANGE = (100, 20_000)
+ZERO_AS_UNKNOWN = ['living_area_size', 'net_effective_price']
+ENUM_VALUES = {
+    'status': {'ACTIVE', 'IN_CONTRACT', 'PENDING', 'OFF_MARKET', 'RENTED'},
+    'building_type': {'RENTAL', 'CONDO', 'COOP', 'CONDOP', 'HOUSE', 'TOWNHOUSE', 'MULTI_FAMILY', 'MIXED_USE'},
+}
+QUARANTINE_TABLE = 'listing_quarantine'
+QUARANTINE_COLUMNS = ['source', 'external_id', 'reasons', 'payload']
+
+
+def _numeric(df: pd.DataFrame, col: str) -> pd.Series:
+    if col not in df.columns:
+        return pd.Series(np.nan, index=df.index, dtype='float64')
+    return pd.to_numeric(df[col], errors='coerce')
+
+
+def rule_failures(df: pd.DataFrame) -> pd.DataFrame:
+    """One boolean column per rule, True where the row fails it. Expects ZERO_AS_UNKNOWN already applied."""
+    failures = {
+        'coordinates': ~(_numeric(df, 'latitude').between(*NYC_BOUNDS['latitude'])
+                         & _numeric(df, 'longitude').between(*NYC_BOUNDS['longitude'])),
+        'price': ~_numeric(df, 'price').between(*PRICE_RANGE),
+    }
+    size = _numeric(df, 'living_area_size')
+    failures['size'] = size.notna() & ~size.between(*SIZE_RANGE)
+    return pd.DataFrame(failures, index=df.index)
+
+
+def unknown_enum_values(df: pd.DataFrame) -> Dict[str, Dict[str, int]]:
+    """Rows per value of the ENUM_VALUES columns that isn't a known value, by column."""
+    unknown = {}
+    for col, allowed in ENUM_VALUES.items():
+        if col in df.columns:
+            values = df[col].dropna().astype(str)
+            counts = values[~values.isin(allowed)].value_counts()
+            if not counts.empty:
+                unknown[col] = counts.to_dict()
+    return unknown
+
+
+def validate_listings(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Normalizes zero-as-unknown values and splits a batch of normalized listings by the rules.
+
+    :param df: Listings with `listings` column names (see normalize_listings).
+    :return: The valid rows, and the failing rows with a `reasons` column ('coordinates,price').
+    """
+    df = df.copy()
+    for col in ZERO_AS_UNKNOWN:
+        if col in df.columns:
+            values = pd.to_numeric(df[col], errors='coerce')
+            df[col] = values.mask(values == 0)
+    for col, counts in unknown_enum_values(df).items():
+        logging.warning(f"Unknown '{col}' values, stored anyway: {counts}")
+    failures = rule_failures(df)
+    failed = failures.any(axis=1)
+    if not failed.any():
+        return df, df.iloc[:0].assign(reasons=pd.Series(dtype=object))
+
+    rejected = df[failed].assign(reasons=failure_reasons(failures[failed]))
+    return df[~failed], rejected
+
+
+def failure_reasons(failures: pd.DataFrame) -> pd.Series:
+    """The rules each row of rule_failures failed, comma separated."""
+    reasons = pd.Series('', index=failures.index, dtype=object)
+    for rule in failures.columns:
+        reasons = reasons.mask(failures[rule], reasons + rule + ',')
+    return reasons.str.rstrip(',')
+
+
+def rejection_counts(rejected: pd.DataFrame) -> Dict[str, int]:
+    """Rejected rows per rule."""
+    if rejected.empty:
+        return {}
+    return rejected['reasons'].str.split(',').explode().value_counts().to_dict()
+
+
+def quarantine_listings(rejected: pd.DataFrame, db):
+    """
+    Upserts rejected listings into listing_quarantine: their key, the rules they failed and the
+    whole normalized row as JSON.
+
+    :param rejected: Rows returned as rejected by validate_listings.
+    :param db: An active MySQLClient instance.
+    """
+    if rejected.empty:
+        return
+    payloads = rejected.drop(columns='reasons').to_json(orient='records', lines=True, date_format='iso',
+                                                        default_handler=str).splitlines()
+    values = [(source, str(external_id), reasons, payload) for source, external_id, reasons, payload
+              in zip(rejected['source'], rejected['external_id'], rejected['reasons'], payloads)]
+    db.insert_many(QUARANTINE_TABLE, QUARANTINE_COLUMNS, values, on_duplicate='update')
+    logging.warning(f"Quarantined {len(values)} listings: {rejection_counts(rejected)}")
@@ -0,0 +1,103 @@
+import dash
+import pandas as pd
+import pytest
+
+from app import api, cache_store
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(cache_store, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(cache_store, '_memory', type(cache_store._memory)())
+    version = {'value': 'v1'}
+    monkeypatch.setattr(api, 'get_data_version', lambda: version['value'])
+    listings = pd.DataFrame({
+        'id': [3, 1, 2],
+        'area_name': ['Chelsea', 'SoHo', 'Chelsea'],
+        'zip_code': ['10011', '10012', '10011'],
+        'price': [3000, 4500, 5200],
+        'bedroom_count': [1.0, 2.0, 2.0],
+        'available_date': pd.to_datetime(['2025-06-01', '2025-07-01', '2025-08-01']),
+    })
+    loads = []
+
+    def load():
+        loads.append(1)
+        return listings
+    monkeypatch.setattr(api, 'get_cached_listings', load)
+
+    app = dash.Dash(__name__)
+    app.layout = dash.html.Div()
+    api.register_api(app)
+    test_client = app.server.test_client()
+    test_client.loads = loads
+    test_client.version = version
+    return test_client
+
+
+def test_listing_search_filters_and_pages(client):
+    body = client.get('/api/v1/listings?area=Chelsea&min_price=2000&limit=1').get_json()
+    assert body['total'] == 2
+    assert [r['id'] for r in body['results']] == [2]
+
+
+def test_matching_etag_gets_304_without_recomputing(client):
+    first = client.get('/api/v1/listings?min_bedrooms=2')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+
+    repeat = client.get('/api/v1/listings?min_bedrooms=2', headers={'If-None-Match': etag})
+    assert repeat.status_code == 304
+    assert client.loads == [1]
+
+    # A new data version invalidates the tag
+    client.version['value'] = 'v2'
+    changed = client.get('/api/v1/listings?min_bedrooms=2', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+
+def test_responses_are_cached_per_data_version(client):
+    client.get('/api/v1/listings')
+    client.get('/api/v1/listings')
+    assert client.loads == [1]
+
+
+def test_invalid_parameters_are_rejected(client):
+    assert client.get('/api/v1/listings?min_price=cheap').status_code == 400
+    assert client.get('/api/v1/aggregates/borough').status_code == 400
+
+
+def test_half_open_date_ranges_apply_their_bound(client):
+    after = client.get('/api/v1/listings?available_from=2025-06-15').get_json()
+    assert sorted(r['id'] for r in after['results']) == [1, 2]
+    before = client.get('/api/v1/listings?available_to=2025-06-15').get_json()
+    assert [r['id'] for r in before['results']] == [3]
+
+
+def test_limit_must_be_positive(client):
+    assert client.get('/api/v1/listings?limit=0').status_code == 400
+    assert client.get('/api/v1/listings?offset=-1').status_code == 400
+    assert client.get('/api/v1/listings?limit=5000').get_json()['count'] == 3
+
+
+def test_aggregates_use_the_dashboards_unit_grain_stores(client, monkeypatch):
+    requested = []
+
+    def page_listings_json(columns, grain):
+        requested.append((columns, grain))
+        return 'listings'
+
+    def filter_listings_json(listings_json, start, end, grain):
+        requested.append((listings_json, grain))
+        return 'units'
+
+    def aggregate_listings_json(listings_json, group_by):
+        requested.append(listings_json)
+        return pd.DataFrame({'area_name': ['Chelsea'], 'listing_count': [2]}).to_json(orient='split')
+    monkeypatch.setattr(api, 'get_page_listings_json', page_listings_json)
+    monkeypatch.setattr(api, 'filter_listings_json', filter_listings_json)
+    monkeypatch.setattr(api, 'aggregate_listings_json', aggregate_listings_json)
+    body = client.get('/api/v1/aggregates/area_name').get_json()
+    assert requested == [(api.MAP_LISTING_COLUMNS, 'unit'), ('listings', 'unit'), 'units']
+    assert body['results'][0]['area_name'] == 'Chelsea'
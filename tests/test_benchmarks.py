@@ -0,0 +1,21 @@
+from tools import benchmarks
+from tools.synthetic_data import leaf_areas, load_areas, synthetic_raw_listings
+
+
+def test_synthetic_listings_live_in_leaf_areas():
+    leaves = {a['name'] for a in leaf_areas(load_areas())}
+    df = synthetic_raw_listings(2000)
+    assert set(df['area_name']) <= leaves
+    # Some listings repeat another broker's unit
+    assert df['unit_cluster_id'].nunique() < len(df)
+
+
+def test_every_benchmark_runs_on_a_small_input():
+    results = benchmarks.run_benchmarks([200], repeat=1)
+    assert set(results) == {f"{name}@200" for name in benchmarks.BENCHMARKS}
+
+
+def test_regressions_are_slowdowns_beyond_the_threshold():
+    baselines = {'a@10': 1.0, 'b@10': 1.0}
+    results = {'a@10': 1.2, 'b@10': 1.5, 'c@10': 9.0}
+    assert benchmarks.find_regressions(results, baselines, threshold=0.25) == {'b@10': 1.5}
@@ -0,0 +1,55 @@
+import importlib
+import os
+import re
+import subprocess
+import sys
+
+from click.testing import CliRunner
+
+from config.settings import ROOT_DIR, load_config
+from nyc.cli import COMMANDS, cli
+
+# Seconds `nyc --help` and `nyc config` may spend importing modules, interpreter startup included
+IMPORT_BUDGET_SECONDS = 0.5
+HEAVY_MODULES = ('pandas', 'numpy', 'plotly', 'dash', 'sqlalchemy', 'bs4', 'requests', 'mysql')
+
+
+def _import_profile(*args):
+    """Seconds spent in top-level imports, and the modules imported, for `python -m nyc <args>`."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-m', 'nyc', *args],
+                            cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    lines = [re.match(r"import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)", line) for line in result.stderr.splitlines()]
+    lines = [m for m in lines if m]
+    seconds = sum(int(m.group(1)) for m in lines if not m.group(2)) / 1e6
+    return seconds, {m.group(3) for m in lines}
+
+
+def test_quick_commands_stay_within_the_import_budget():
+    for args in (['--help'], ['config']):
+        seconds, modules = _import_profile(*args)
+        assert seconds < IMPORT_BUDGET_SECONDS, f"nyc {' '.join(args)} spent {seconds:.2f}s importing"
+        assert not [m for m in modules if m.split('.')[0] in HEAVY_MODULES]
+
+
+def test_help_lists_every_command_and_config_hides_the_password():
+    runner = CliRunner()
+    listed = runner.invoke(cli, ['--help']).output
+    assert all(name in listed for name in [*COMMANDS, 'serve', 'config'])
+    shown = runner.invoke(cli, ['config']).output
+    assert 'db.password = ***' in shown and load_config().db.password not in shown
+
+
+def test_every_command_resolves_and_config_is_read_once():
+    for name, (path, _) in COMMANDS.items():
+        module_name, attr = path.split(':')
+        assert callable(getattr(importlib.import_module(module_name), attr)), name
+        assert cli.get_command(None, name) is not None
+    assert load_config() is load_config()
+
+
+def test_importing_commands_writes_nothing(tmp_path):
+    # scraping.scrape_listings sets up its log file in main(), not at import
+    modules = sorted({path.split(':')[0] for path, _ in COMMANDS.values()})
+    subprocess.run([sys.executable, '-c', '; '.join(f"import {m}" for m in modules)], cwd=tmp_path,
+                   env={**os.environ, 'PYTHONPATH': ROOT_DIR}, capture_output=True, check=True)
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from analytics import comps
+from analytics.spatial_index import haversine_m
+
+
+def _synthetic_listings(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'id': np.arange(n),
+        'bedroom_count': rng.integers(0, 3, n).astype(float),
+        'living_area_size': rng.choice([0, 500, 700, 900], n),
+        'price': rng.integers(2000, 8000, n),
+        'latitude': 40.7 + rng.normal(0, 0.03, n),
+        'longitude': -73.95 + rng.normal(0, 0.03, n),
+    })
+
+
+def test_compute_comps_matches_brute_force():
+    df = _synthetic_listings(3000)
+    result = comps.compute_comps(df, k=10).set_index('listing_id')
+    sizes = df['living_area_size'].replace(0, np.nan).to_numpy(dtype=float)
+
+    for i in np.random.default_rng(1).choice(len(df), 50, replace=False):
+        row = df.iloc[i]
+        dist = haversine_m(row['latitude'], row['longitude'], df['latitude'], df['longitude'])
+        dist[i] = np.inf
+        dist[df['bedroom_count'].to_numpy() != row['bedroom_count']] = np.inf
+        if not np.isnan(sizes[i]):
+            dist[~np.isnan(sizes) & (np.abs(sizes - sizes[i]) > comps.SIZE_TOLERANCE * sizes[i])] = np.inf
+        prices = df['price'].to_numpy()[np.argsort(dist)[:10]]
+        expected = 100 * ((prices < row['price']).sum() + 0.5 * (prices == row['price']).sum()) / 10
+
+        scored = result.loc[row['id']]
+        assert scored['comp_count'] == 10
+        assert scored['comp_median_price'] == np.median(prices)
+        assert scored['price_percentile'] == expected
+
+
+def test_listings_without_enough_comps_are_unscored():
+    df = _synthetic_listings(3)
+    result = comps.compute_comps(df, k=10)
+    assert len(result) == 3
+    assert result['price_percentile'].isna().all()
+
+
+def test_unpriced_listings_get_no_percentile():
+    df = _synthetic_listings(500)
+    df['price'] = df['price'].astype(float)
+    df.loc[[0, 1], 'price'] = [np.nan, 0]
+    result = comps.compute_comps(df, k=10).set_index('listing_id')
+
+    assert result.loc[[0, 1], 'price_percentile'].isna().all()
+    assert result.loc[[0, 1], 'comp_count'].min() >= comps.MIN_COMPS
+    assert result['price_percentile'].drop([0, 1]).notna().any()
+
+
+def test_dense_cells_are_scored_in_chunks(monkeypatch):
+    df = _synthetic_listings(1000)
+    expected = comps.compute_comps(df, k=10)
+    monkeypatch.setattr(comps, 'MAX_MATRIX_ENTRIES', 500)
+    pd.testing.assert_frame_equal(comps.compute_comps(df, k=10), expected)
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+from analytics import dedup
+
+
+def _listings():
+    return pd.DataFrame({
+        'id': [1, 2, 3, 4, 5, 6],
+        'street': ['123 East 1st Street', '123 E. 1 St', '123 E 1 ST', '500 W 20th St', '500 West 20th Street', '9 Main St'],
+        'unit': ['4A', '#04A', '5B', None, None, '1'],
+        'display_unit': ['#4A', 'Apt 4-A', '#5B', '#2', '#2', '#1'],
+        'zip_code': ['10003', '10003', '10003', '10011', '10011', '11201'],
+        'latitude': [40.72, 40.72, 40.72, 40.745, 40.745, 40.69],
+        'longitude': [-73.98, -73.98, -73.98, -74.0, -74.0, -73.99],
+        'bedroom_count': [1, 1, 1, 2, 2, 1],
+        'price': [3000, 3100, 3000, 5000, 5200, 2500],
+        'living_area_size': [600, 0, 600, 900, 880, 500],
+        'date_updated': pd.date_range('2025-01-01', periods=6),
+    })
+
+
+def test_normalization_matches_spelling_variants():
+    assert dedup.normalize_street(pd.Series(['123 East 1st Street', '123 E. 1 St'])).nunique() == 1
+    assert dedup.normalize_unit(pd.Series(['#04A', 'Apt 4-A', '4A'])).tolist() == ['4A', '4A', '4A']
+
+
+def test_cluster_units_groups_cross_broker_duplicates():
+    assert dedup.cluster_units(_listings()).tolist() == [1, 1, 3, 4, 4, 6]
+
+
+def test_different_bedroom_counts_are_not_merged():
+    df = _listings()
+    df.loc[1, 'bedroom_count'] = 2
+    assert dedup.cluster_units(df).tolist()[:2] == [1, 2]
+
+
+def test_connected_components_follows_chains():
+    labels = dedup.connected_components(5, np.array([[3, 4], [2, 3], [0, 1]]))
+    assert labels.tolist() == [0, 0, 2, 2, 2]
+
+
+def test_collapse_units_keeps_the_latest_listing_per_unit():
+    df = _listings()
+    df['unit_cluster_id'] = dedup.cluster_units(df)
+    assert dedup.collapse_units(df)['id'].tolist() == [2, 3, 5, 6]
+
+
+def test_listings_without_a_unit_are_not_merged():
+    df = _listings()
+    df[['unit', 'display_unit']] = None
+    assert len(dedup.candidate_pairs(df)) == 0
+    assert dedup.cluster_units(df).tolist() == [1, 2, 3, 4, 5, 6]
+
+
+class DummyDB:
+    """Records the cluster id updates and watermark writes of assign_unit_clusters."""
+
+    def __init__(self):
+        self.updates, self.watermarks = [], []
+        self.sqlalchemy_engine = None
+        self.cursor = self.conn = self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def executemany(self, query, values):
+        self.updates.extend(values)
+
+    def commit(self):
+        pass
+
+    def insert_many(self, table, columns, values, on_duplicate='ignore'):
+        self.watermarks.extend(name for name, _ in values)
+
+
+def test_changed_clusters_stamp_the_clustering_watermark(monkeypatch):
+    db = DummyDB()
+    stored = _listings().assign(unit_cluster_id=pd.array([None] * 6, dtype='Int64'))
+    monkeypatch.setattr(dedup, 'MySQLClient', lambda: db)
+    monkeypatch.setattr(dedup, 'read_listings', lambda query, engine: stored)
+    assert dedup.assign_unit_clusters() == 6 and db.watermarks == [dedup.WATERMARK_NAME]
+    # Nothing changed: the data version must stay the same
+    stored['unit_cluster_id'] = dedup.cluster_units(stored).astype('Int64')
+    assert dedup.assign_unit_clusters() == 0 and db.watermarks == [dedup.WATERMARK_NAME]
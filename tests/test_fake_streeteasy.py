@@ -0,0 +1,33 @@
+from scraping.streeteasy import StreetEasyScraper
+from tools.fake_streeteasy import FakeStreetEasy, start_server
+
+
+def test_scraper_pages_through_the_fake_api():
+    fake = FakeStreetEasy(listings_per_area=20)
+    server, base_url = start_server(fake)
+    try:
+        scraper = StreetEasyScraper(delay_seconds=0.1, timeout_seconds=5, base_url=base_url)
+        first, total_pages = scraper.search_rentals('tribeca', page=1)
+        second, _ = scraper.search_rentals('tribeca', page=2)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert total_pages == 2 and len(first) == 14 and len(second) == 6
+    assert {node['areaName'] for node in first} == {'Tribeca'}
+    # Stored URLs point at StreetEasy, not the fake server
+    assert first[0]['url'].startswith('https://streeteasy.com/')
+    assert len({node['id'] for node in first + second}) == 20
+    assert fake.counts['pages'] == 2 and fake.counts['listings'] == 20
+
+
+def test_fake_api_injects_errors_and_keeps_ids_apart_per_area():
+    fake = FakeStreetEasy(listings_per_area=5, error_rate=1.0)
+    status, body = fake.respond('/srp-service-api/for-rent/tribeca?page=1')
+    assert status in (429, 503) and body is None
+    # The session warm-up is never failed
+    assert fake.respond('/')[0] == 200
+
+    fake.error_rate = 0.0
+    ids = [{node['id'] for node in fake.nodes(slug)} for slug in ('tribeca', 'soho')]
+    assert len(ids[0]) == 5 and not ids[0] & ids[1]
@@ -0,0 +1,111 @@
+import pandas as pd
+
+from app import geometry
+
+
+def test_decode_polyline_returns_lon_lat_pairs():
+    # Reference example from the encoded polyline algorithm docs
+    points = geometry.decode_polyline("_p~iF~ps|U_ulLnnqC_mqNvxq`@")
+    assert points == [(-120.2, 38.5), (-120.95, 40.7), (-126.453, 43.252)]
+
+
+def test_convex_hull_drops_interior_points_and_closes_ring():
+    points = [(0, 0), (2, 0), (2, 2), (0, 2), (1, 1)]
+    hull = geometry.convex_hull(points)
+    assert hull[0] == hull[-1]
+    assert set(hull) == {(0, 0), (2, 0), (2, 2), (0, 2)}
+
+
+def test_convex_hull_degenerate_inputs():
+    assert geometry.convex_hull([(0, 0), (1, 1)]) == []
+    assert geometry.convex_hull([(0, 0), (1, 1), (2, 2)]) == []
+
+
+def test_simplify_ring_keeps_a_valid_polygon():
+    # A square with many nearly-collinear points along each edge
+    edge = [(i / 10, 0.0001 * (i % 2)) for i in range(11)]
+    ring = edge + [(1, 1), (0, 1), (0, 0)]
+    simplified = geometry.simplify_ring(ring, tolerance=0.01)
+    assert len(simplified) < len(ring)
+    assert len(simplified) >= 4
+    assert simplified[0] == simplified[-1]
+
+
+def test_resolution_for_zoom():
+    assert geometry.resolution_for_zoom(None) == 'low'
+    assert geometry.resolution_for_zoom(10) == 'low'
+    assert geometry.resolution_for_zoom(12) == 'medium'
+    assert geometry.resolution_for_zoom(15) == 'high'
+
+
+def test_location_keys_repads_zip_codes():
+    keys = geometry.location_keys(pd.Series([7302, '10019']), 'zip_code')
+    assert keys.tolist() == ['07302', '10019']
+
+
+def test_get_geometries_falls_back_to_hulls_and_caches(tmp_path, monkeypatch):
+    monkeypatch.setattr(geometry, 'GEOMETRY_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(geometry, '_memory_cache', {})
+    points = pd.DataFrame({
+        'zip_code': ['10019'] * 4,
+        'latitude': [40.76, 40.77, 40.76, 40.77],
+        'longitude': [-73.99, -73.99, -73.98, -73.98],
+    })
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return points
+
+    levels = geometry.get_geometries('zip_code', ['10019'], points_loader=loader, points_version='v1')
+    assert set(levels) == set(geometry.SIMPLIFY_TOLERANCES)
+    assert levels['low']['features'][0]['id'] == '10019'
+    assert (tmp_path / 'zip_code.json').exists()
+
+    # Served from the disk cache without reloading points
+    monkeypatch.setattr(geometry, '_memory_cache', {})
+    geometry.get_geometries('zip_code', ['10019'], points_loader=loader, points_version='v1')
+    assert len(calls) == 1
+
+
+def test_get_geometries_only_builds_new_groups(tmp_path, monkeypatch):
+    monkeypatch.setattr(geometry, 'GEOMETRY_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(geometry, '_memory_cache', {})
+    points = pd.DataFrame({
+        'zip_code': ['10019'] * 3 + ['10001'] * 3,
+        'latitude': [40.76, 40.77, 40.76, 40.75, 40.76, 40.75],
+        'longitude': [-73.99, -73.99, -73.98, -74.00, -74.00, -73.99],
+    })
+    built = []
+    original = geometry._hull_geometries
+
+    def build(group_by, keys, pts):
+        built.append(list(keys))
+        return original(group_by, keys, pts)
+
+    monkeypatch.setattr(geometry, '_hull_geometries', build)
+    geometry.get_geometries('zip_code', ['10019', '10001'], lambda: points, 'v1')
+    # A narrower date range, then a new group: only the new group is built
+    levels = geometry.get_geometries('zip_code', ['10019'], lambda: points, 'v1')
+    assert [f['id'] for f in levels['low']['features']] == ['10019']
+    geometry.get_geometries('zip_code', ['10019', '99999'], lambda: points, 'v1')
+    geometry.get_geometries('zip_code', ['99999'], lambda: points, 'v1')
+    assert built == [['10001', '10019'], ['99999']]
+
+
+def test_hulls_follow_the_listings(tmp_path, monkeypatch):
+    monkeypatch.setattr(geometry, 'GEOMETRY_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(geometry, '_memory_cache', {})
+    few = pd.DataFrame({'zip_code': ['10019'] * 2, 'latitude': [40.76, 40.77], 'longitude': [-73.99, -73.98]})
+    more = pd.DataFrame({'zip_code': ['10019'] * 4, 'latitude': [40.76, 40.77, 40.76, 40.78],
+                         'longitude': [-73.99, -73.98, -73.97, -73.99]})
+    # Two listings make no polygon, and that isn't remembered past their data version
+    assert geometry.get_geometries('zip_code', ['10019'], lambda: few, 'v1')['low']['features'] == []
+    assert geometry.get_geometries('zip_code', ['10019'], lambda: more, 'v1')['low']['features'] == []
+    first = geometry.get_geometries('zip_code', ['10019'], lambda: more, 'v2')['low']['features']
+    assert len(first) == 1
+    # The hull grows with the listings
+    grown = pd.concat([more, pd.DataFrame({'zip_code': ['10019'], 'latitude': [40.80], 'longitude': [-73.95]})])
+    monkeypatch.setattr(geometry, '_memory_cache', {})
+    second = geometry.get_geometries('zip_code', ['10019'], lambda: grown, 'v3')['low']['features']
+    assert second[0]['geometry'] != first[0]['geometry']
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+from analytics import hexbin
+
+
+def test_cell_centers_are_within_one_hex_of_their_points():
+    rng = np.random.default_rng(0)
+    lat = 40.5 + rng.random(5000) * 0.4
+    lon = -74.2 + rng.random(5000) * 0.4
+    for zoom in hexbin.HEX_ZOOM_LEVELS:
+        ids = hexbin.cell_ids(lat, lon, zoom)
+        center_lat, center_lon = hexbin.cell_centers(ids, zoom)
+        dist = np.hypot(center_lat - lat, (center_lon - lon) * hexbin.LON_SCALE)
+        assert dist.max() <= hexbin.hex_size(zoom) + 1e-12
+
+
+def test_unpack_round_trips_negative_ids():
+    ids = hexbin.cell_ids([40.75], [-73.98], 15)
+    q, r = hexbin.unpack_cell_ids(ids)
+    assert q[0] < 0
+    assert ids[0] == q[0] * hexbin.HEX_ID_STRIDE + r[0]
+
+
+def test_assign_hex_columns_leaves_missing_coordinates_null():
+    df = pd.DataFrame({'latitude': [40.75, None], 'longitude': [-73.98, -73.9]})
+    df = hexbin.assign_hex_columns(df)
+    for zoom in hexbin.HEX_ZOOM_LEVELS:
+        col = hexbin.hex_column(zoom)
+        assert pd.notna(df.loc[0, col])
+        assert pd.isna(df.loc[1, col])
+
+
+def test_nearest_zoom_level_is_clamped():
+    assert hexbin.nearest_zoom_level(3) == hexbin.HEX_ZOOM_LEVELS[0]
+    assert hexbin.nearest_zoom_level(12.4) == 12
+    assert hexbin.nearest_zoom_level(20) == hexbin.HEX_ZOOM_LEVELS[-1]
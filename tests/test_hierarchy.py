@@ -0,0 +1,30 @@
+from analytics.hierarchy import AreaHierarchy
+
+
+def _hierarchy():
+    return AreaHierarchy([
+        {'id': 1, 'name': 'Manhattan', 'level': 1, 'parent_id': None},
+        {'id': 2, 'name': 'Upper West Side', 'level': 2, 'parent_id': 1},
+        {'id': 3, 'name': 'Lincoln Square', 'level': 3, 'parent_id': 2},
+        {'id': 4, 'name': 'Manhattan Valley', 'level': 3, 'parent_id': 2},
+        {'id': 800000, 'name': 'Unassigned', 'level': 1, 'parent_id': None},
+    ])
+
+
+def test_ancestors_walk_up_to_the_root():
+    hierarchy = _hierarchy()
+    assert hierarchy.parent('Lincoln Square') == 'Upper West Side'
+    assert hierarchy.parent('Manhattan') is None
+    assert hierarchy.ancestors('Lincoln Square') == ['Upper West Side', 'Manhattan']
+    assert hierarchy.ancestor_at_level('Lincoln Square', 1) == 'Manhattan'
+    assert hierarchy.ancestor_at_level('Upper West Side', 2) == 'Upper West Side'
+    assert hierarchy.ancestor_at_level('Manhattan', 2) is None
+    assert hierarchy.ancestor_at_level('Nowhere', 1) is None
+
+
+def test_subtree_and_excluded_areas():
+    hierarchy = _hierarchy()
+    assert sorted(hierarchy.subtree('Upper West Side')) == ['Lincoln Square', 'Manhattan Valley', 'Upper West Side']
+    assert hierarchy.subtree('Nowhere') == []
+    assert 'Unassigned' not in hierarchy.levels()
+    assert hierarchy.levels()['Lincoln Square'] == 3
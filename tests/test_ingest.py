@@ -1,247 +1,114 @@
-import os
-import types
-import builtins
+import pandas as pd
 import pytest
-from unittest.mock import patch, MagicMock
 
-# Target module
+from database import dimensions
 from scraping import ingest_listings as ingest
+from scraping.streeteasy import StreetEasyScraper
+from tools.benchmarks import listings_table_columns
+from tools.synthetic_data import synthetic_nodes, synthetic_search_pages
+
+
+class DummyDB:
+    """
+    Records insert_many calls into listings. The table has the listings columns of schema.sql,
+    the lookup tables number their names in insertion order and there is one neighborhood.
+    """
+
+    def __init__(self):
+        self.inserts = []
+        self.lookups = {}
+
+    def get_table_columns(self, table_name):
+        return listings_table_columns()
+
+    def execute_query(self, query, params=None):
+        if 'FROM neighborhoods' in query:
+            return [('Tribeca', 42)]
+        names = self.lookups.get(query.split('FROM ')[1], [])
+        return [(name, i) for i, name in enumerate(names, start=1)]
+
+    def insert_many(self, table_name, columns, values, on_duplicate='ignore'):
+        if table_name != 'listings':
+            self.lookups.setdefault(table_name, []).extend(name for name, in values)
+            return
+        self.inserts.append((table_name, columns, values, on_duplicate))
 
 
 @pytest.fixture(autouse=True)
-def set_env_defaults(monkeypatch):
-    # Ensure DEFAULT_PAGES if not provided
-    monkeypatch.setenv("DEFAULT_PAGES", "2")
-    # Generic settings required by dependencies
-    monkeypatch.setenv("DB_HOST", "localhost")
-    monkeypatch.setenv("DB_PORT", "3306")
-    monkeypatch.setenv("DB_NAME", "testdb")
-    monkeypatch.setenv("DB_USER", "user")
-    monkeypatch.setenv("DB_PASSWORD", "pass")
-    # Scrape config defaults
-    monkeypatch.setenv("SCRAPE_REQUEST_DELAY_SECONDS", "0.0")
-    monkeypatch.setenv("SCRAPE_REQUEST_TIMEOUT_SECONDS", "1")
-
-
-class DummyPreview:
-    def __init__(self, i, **overrides):
-        self.external_id = f"ext-{i}"
-        self.url = f"http://example.com/{i}"
-        self.address = f"Addr {i}"
-        self.neighborhood = "Midtown"
-        self.borough = "Manhattan"
-        self.beds = 1
-        self.baths = 1
-        self.sqft = None
-        self.price = 3000
-        self.fee = False
-        self.latitude = None
-        self.longitude = None
-        # Extended API fields used by ingest
-        self.area_name = self.neighborhood
-        self.available_at = None
-        self.building_type = "RENTAL"
-        self.full_bathroom_count = 1
-        self.half_bathroom_count = 0
-        self.furnished = False
-        self.has_tour_3d = False
-        self.has_videos = False
-        self.interesting_price_delta = None
-        self.is_new_development = False
-        self.lease_term = None
-        self.living_area_size = None
-        self.months_free = 0
-        self.net_effective_price = 0
-        self.off_market_at = None
-        self.rello_express = None
-        self.slug = None
-        self.source_group_label = "Test Broker"
-        self.source_type = "PARTNER"
-        self.state = "NY"
-        self.status = "ACTIVE"
-        self.street = self.address
-        self.upcoming_open_house = None
-        self.display_unit = None
-        self.url_path = f"/unit/{i}"
-        self.zip_code = "10019"
-        self.tier = None
-        self.typename = "TestEdge"
-        for k, v in overrides.items():
-            setattr(self, k, v)
-        # Keep living_area_size in sync with sqft override when provided
-        if self.sqft is not None and self.living_area_size is None:
-            self.living_area_size = self.sqft
-
-
-def _invoke_click(cmd, *args):
-    # Helper to invoke click command function directly
-    # We bypass click runner to keep dependencies minimal; call the underlying function.
-    return cmd.callback(*args)
-
-
-def test_ingest_ingests_multiple_pages_and_commits(monkeypatch):
-    # Arrange: mock scraper to return two pages then empty
-    previews_page1 = [DummyPreview(1), DummyPreview(2)]
-    previews_page2 = [DummyPreview(3)]
-
-    mock_scraper = MagicMock()
-    mock_scraper.search_rentals.side_effect = [previews_page1, previews_page2, []]
-
-    # Patch StreetEasyScraper to return our mock
-    with patch("scraping.ingest_listings.StreetEasyScraper", return_value=mock_scraper):
-        # Capture inserted rows via DB mock
-        upserts = []
-        class DummyDB:
-            def __enter__(self):
-                return self
-            def __exit__(self, exc_type, exc, tb):
-                return False
-            def upsert_listing(self, listing):
-                upserts.append(listing)
-                return len(upserts)
-        with patch("scraping.ingest_listings.MySQLClient", return_value=DummyDB()):
-            # Act
-            ingest.main.callback(
-                neighborhood="midtown",
-                beds=1,
-                max_price=4000,
-                pages=3,
-                delay=0.0,
-                timeout=1,
-                details=False,
-            )
-
-    # Assert
-    assert len(upserts) == 3
-    # Validate the constructed Listing has expected mapping
-    assert upserts[0].source == "streeteasy"
-    assert upserts[0].external_id == "ext-1"
-    assert upserts[0].price == 3000
-
-
-def test_ingest_stops_on_empty_previews(monkeypatch):
-    mock_scraper = MagicMock()
-    mock_scraper.search_rentals.side_effect = [[]]  # first page empty -> stop immediately
-    with patch("scraping.ingest_listings.StreetEasyScraper", return_value=mock_scraper):
-        upserts = []
-        class DummyDB:
-            def __enter__(self):
-                return self
-            def __exit__(self, exc_type, exc, tb):
-                return False
-            def upsert_listing(self, listing):
-                upserts.append(listing)
-                return 1
-        with patch("scraping.ingest_listings.MySQLClient", return_value=DummyDB()):
-            ingest.main.callback(
-                neighborhood="midtown",
-                beds=0,
-                max_price=2500,
-                pages=5,
-                delay=0.0,
-                timeout=1,
-                details=False,
-            )
-    assert len(upserts) == 0
-
-
-def test_ingest_uses_env_default_pages_when_none(monkeypatch):
-    # Ensure DEFAULT_PAGES is 2 per fixture; we expect exactly 2 page calls
-    mock_scraper = MagicMock()
-    # two non-empty pages then empty to ensure loop would break if exceeded
-    p1 = [DummyPreview(1)]
-    p2 = [DummyPreview(2)]
-    p3 = []
-    mock_scraper.search_rentals.side_effect = [p1, p2, p3]
-
-    with patch("scraping.ingest_listings.StreetEasyScraper", return_value=mock_scraper):
-        class DummyDB:
-            def __enter__(self):
-                return self
-            def __exit__(self, exc_type, exc, tb):
-                return False
-            def upsert_listing(self, listing):
-                return 1
-        with patch("scraping.ingest_listings.MySQLClient", return_value=DummyDB()):
-            ingest.main.callback(
-                neighborhood="midtown",
-                beds=1,
-                max_price=4000,
-                pages=None,
-                delay=0.0,
-                timeout=1,
-                details=False,
-            )
-
-    # Assert: called exactly for pages 1..2 (DEFAULT_PAGES=2)
-    calls = mock_scraper.search_rentals.call_args_list
-    assert len(calls) == 2
-    for idx, call in enumerate(calls, start=1):
-        kwargs = call.kwargs
-        assert kwargs["page"] == idx
-
-
-def test_ingest_preserves_optional_fields_with_getattr(monkeypatch):
-    # Provide preview missing some attributes to ensure getattr fallback works
-    previews = [
-        DummyPreview(1, sqft=550, latitude=40.0),
-        DummyPreview(2)  # defaults include None for many optional fields
-    ]
-    mock_scraper = MagicMock()
-    mock_scraper.search_rentals.side_effect = [previews, []]
-
-    captured = []
-    class DummyDB:
-        def __enter__(self):
-            return self
-        def __exit__(self, exc_type, exc, tb):
-            return False
-        def upsert_listing(self, listing):
-            captured.append(listing)
-            return len(captured)
-
-    with patch("scraping.ingest_listings.StreetEasyScraper", return_value=mock_scraper), \
-         patch("scraping.ingest_listings.MySQLClient", return_value=DummyDB()):
-        ingest.main.callback(
-            neighborhood="williamsburg",
-            beds=1,
-            max_price=4500,
-            pages=1,
-            delay=0.0,
-            timeout=1,
-            details=False,
-        )
-
-    assert captured[0].sqft == 550
-    assert captured[0].latitude == 40.0
-    assert captured[1].sqft is None
-    assert captured[1].latitude is None
-
-
-def test_ingest_passes_correct_filters_to_scraper(monkeypatch):
-    mock_scraper = MagicMock()
-    mock_scraper.search_rentals.side_effect = [[DummyPreview(1)], []]
-
-    with patch("scraping.ingest_listings.StreetEasyScraper", return_value=mock_scraper):
-        class DummyDB:
-            def __enter__(self):
-                return self
-            def __exit__(self, exc_type, exc, tb):
-                return False
-            def upsert_listing(self, listing):
-                return 1
-        with patch("scraping.ingest_listings.MySQLClient", return_value=DummyDB()):
-            ingest.main.callback(
-                neighborhood="upper-west-side",
-                beds=2,
-                max_price=5000,
-                pages=1,
-                delay=0.0,
-                timeout=1,
-                details=False,
-            )
-
-    # Verify called with expected args
-    mock_scraper.search_rentals.assert_any_call(
-        neighborhood="upper-west-side", beds=2, max_price=5000, page=1
-    )
\ No newline at end of file
+def fresh_dimension_ids(monkeypatch):
+    monkeypatch.setattr(dimensions, '_dimension_ids', dimensions.DimensionIds())
+
+
+def _nodes(n=5):
+    pages = synthetic_search_pages(synthetic_nodes(n), page_size=2)
+    return [node for page in pages for node in StreetEasyScraper._parse_search_json(page)]
+
+
+def test_parse_search_json_adds_url_source_and_open_house_time():
+    page = {'listingData': {'edges': [
+        {'node': {'id': '1', 'urlPath': '/building/a/1',
+                  'upcomingOpenHouse': {'startTime': '2025-06-07T12:00:00.000-04:00'}}},
+        {'node': None},
+    ]}}
+    nodes = list(StreetEasyScraper._parse_search_json(page))
+    assert len(nodes) == 1
+    assert nodes[0]['url'] == 'https://streeteasy.com/building/a/1'
+    assert nodes[0]['source'] == 'streeteasy'
+    assert nodes[0]['upcomingOpenHouseStartTime'] == '2025-06-07 12:00:00'
+    assert 'upcomingOpenHouse' not in nodes[0]
+
+
+def test_normalize_listings_maps_api_fields_to_listing_columns():
+    df = ingest.normalize_listings(_nodes())
+    assert {'external_id', 'area_name', 'bedroom_count', 'latitude', 'longitude', 'display_unit',
+            'upcoming_open_house_start_time', 'hex_z9'} <= set(df.columns)
+    assert 'geo_point' not in df.columns and 'id' not in df.columns
+
+
+def test_ingest_upserts_table_columns_with_missing_values_as_none(monkeypatch):
+    monkeypatch.setattr(ingest, 'stored_prices', lambda db, batch: pd.DataFrame())
+    notified = []
+    monkeypatch.setattr(ingest, 'notify_matches', lambda db, batch, previous: notified.append(len(batch)))
+    db = DummyDB()
+    ingest.ingest_listings(_nodes(), db)
+
+    (table, columns, values, on_duplicate), = db.inserts
+    assert table == 'listings' and on_duplicate == 'update'
+    assert set(columns) <= set(listings_table_columns())
+    assert len(values) == 5 and notified == [5]
+    row = dict(zip(columns, values[0]))
+    assert row['source'] == 'streeteasy' and row['interesting_price_delta'] is None
+
+
+def test_ingest_assigns_dimension_ids_from_the_name_maps(monkeypatch):
+    monkeypatch.setattr(ingest, 'stored_prices', lambda db, batch: pd.DataFrame())
+    monkeypatch.setattr(ingest, 'notify_matches', lambda db, batch, previous: None)
+    nodes = _nodes(6)
+    nodes[0]['areaName'] = 'Tribeca'
+    db = DummyDB()
+    ingest.ingest_listings(nodes, db)
+    ingest.ingest_listings(nodes, db)
+
+    rows = [dict(zip(columns, row)) for _, columns, values, _ in db.inserts for row in values]
+    assert rows[0]['area_id'] == 42 and rows[1]['area_id'] is None
+    for col, (table, id_col) in dimensions.LOOKUP_DIMENSIONS.items():
+        # Every value got one id, stable across batches
+        assert len(db.lookups[table]) == len({row[col] for row in rows})
+        assert all(db.lookups[table][row[id_col] - 1] == row[col] for row in rows)
+
+
+def test_ingest_keeps_the_batch_when_matching_fails(monkeypatch):
+    monkeypatch.setattr(ingest, 'stored_prices', lambda db, batch: pd.DataFrame())
+
+    def fail(db, batch, previous):
+        raise RuntimeError("saved searches unavailable")
+    monkeypatch.setattr(ingest, 'notify_matches', fail)
+    db = DummyDB()
+    ingest.ingest_listings(_nodes(2), db)
+    assert len(db.inserts) == 1
+
+
+def test_ingest_ignores_empty_pages():
+    db = DummyDB()
+    ingest.ingest_listings([], db)
+    assert db.inserts == []
@@ -0,0 +1,43 @@
+from datetime import date
+from decimal import Decimal
+
+import pandas as pd
+
+from database.listing_schema import apply_listing_dtypes, json_listings
+
+
+def _raw():
+    # Shaped like pd.read_sql_query output from the MySQL driver
+    return pd.DataFrame({
+        'id': [1, 2],
+        'area_name': ['Harlem', None],
+        'latitude': [Decimal('40.8115504'), None],
+        'bedroom_count': [Decimal('1.0'), Decimal('2.0')],
+        'price': [3000, None],
+        'full_bathroom_count': [1.0, None],
+        'furnished': [1.0, None],
+        'available_at': [date(2025, 6, 1), None],
+        'street': ['1 Main St', '2 Main St'],
+    })
+
+
+def test_listing_dtypes():
+    df = apply_listing_dtypes(_raw())
+    dtypes = df.dtypes.astype(str).to_dict()
+    assert dtypes == {'id': 'int64', 'area_name': 'category', 'latitude': 'float64', 'bedroom_count': 'float32',
+                      'price': 'float32', 'full_bathroom_count': 'Int8', 'furnished': 'boolean',
+                      'available_at': 'datetime64[ns]', 'street': 'object'}
+    assert abs(df['latitude'].iloc[0] - 40.8115504) < 1e-5
+    assert df['price'].isna().iloc[1] and df['full_bathroom_count'].isna().iloc[1] and df['furnished'].isna().iloc[1]
+
+
+def test_typed_frame_is_smaller_and_idempotent():
+    raw = _raw()
+    typed = apply_listing_dtypes(raw)
+    assert typed.memory_usage(deep=True).sum() < raw.memory_usage(deep=True).sum()
+    assert apply_listing_dtypes(typed).dtypes.equals(typed.dtypes)
+
+
+def test_json_listings_serialize_like_the_stored_values():
+    df = apply_listing_dtypes(pd.DataFrame({'latitude': [40.7128], 'price': [2500], 'bedroom_count': [1.5]}))
+    assert json_listings(df).to_json(orient='records') == '[{"latitude":40.7128,"price":2500,"bedroom_count":1.5}]'
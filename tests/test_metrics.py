@@ -0,0 +1,42 @@
+import dash
+from dash import html, Input, Output
+
+from app import metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    hist = metrics.Histogram('test_seconds', 'Test.', (0.1, 1.0))
+    hist.observe(0.05, callback='a')
+    hist.observe(0.5, callback='a')
+    hist.observe(5, callback='a')
+    lines = list(hist.render())
+    assert 'test_seconds_bucket{callback="a",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{callback="a",le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{callback="a",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{callback="a"} 3' in lines
+
+
+def test_instrument_app_times_callbacks_and_serves_metrics(monkeypatch):
+    monkeypatch.setattr(metrics, 'SLOW_CALLBACK_SECONDS', 0)
+    app = dash.Dash(__name__)
+    app.layout = html.Div([html.Div(id='in'), html.Div(id='out')])
+
+    @app.callback(Output('out', 'children'), Input('in', 'children'))
+    def echo(value):
+        return value
+
+    metrics.instrument_app(app)
+    client = app.server.test_client()
+    client.get('/')
+    response = client.post('/_dash-update-component', json={
+        'output': 'out.children',
+        'outputs': {'id': 'out', 'property': 'children'},
+        'inputs': [{'id': 'in', 'property': 'children', 'value': 'hello'}],
+        'changedPropIds': ['in.children'],
+    })
+    assert response.status_code == 200
+
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'dash_callback_seconds_count{callback="out.children"}' in body
+    assert 'dash_callback_output_bytes_count{callback="out.children"}' in body
+    assert metrics.slow_callbacks[-1]['callback'] == 'out.children'
@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import cache_store, data_utils
+
+
+@pytest.fixture
+def queries(monkeypatch, tmp_path):
+    monkeypatch.setattr(cache_store, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(cache_store, '_memory', type(cache_store._memory)())
+    monkeypatch.setattr(data_utils, 'get_data_version', lambda: 'v1')
+    monkeypatch.setattr(data_utils, '_listing_columns_cache', {})
+    monkeypatch.setattr(data_utils, '_spatial_index_cache', {})
+    monkeypatch.setattr(data_utils, '_address_index_cache', {})
+    table = pd.DataFrame({
+        'id': [1, 2, 3],
+        'area_name': ['Chelsea', 'Chelsea', 'SoHo'],
+        'price': [3000, 3100, 4500],
+        'living_area_size': [None, 700, 800],
+        'available_at': pd.to_datetime(['2025-06-01', '2025-07-01', '2027-01-01']),
+        'unit_cluster_id': [1, 1, 3],
+        'date_updated': pd.to_datetime(['2025-05-01', '2025-05-02', '2025-05-01']),
+        'street': ['1 W 1 St', '1 W 1 St', '2 Spring St'],
+        'display_unit': ['#1', '#1', '#2'],
+        'zip_code': ['10011', '10011', '10012'],
+        'latitude': [40.74, 40.74, 40.72],
+        'longitude': [-74.0, -74.0, -74.0],
+    })
+    seen = []
+
+    def query(columns):
+        seen.append(list(columns))
+        return table[['id', *columns]]
+    monkeypatch.setattr(data_utils, '_query_listing_columns', query)
+    return seen
+
+
+def test_page_listings_load_only_missing_columns(queries):
+    first = data_utils.get_page_listings(['area_name', 'price'])
+    assert list(first.columns) == ['id', 'area_name', 'price', 'available_date']
+    second = data_utils.get_page_listings(['area_name', 'living_area_size'])
+    assert queries == [['available_at', 'area_name', 'price'], ['living_area_size']]
+    # Unknown sizes are stored as NULL since ingest validation
+    assert second['living_area_size'].isna().tolist() == [True, False, False]
+
+
+def test_search_indexes_load_only_their_columns(queries):
+    assert data_utils.query_radius(40.74, -74.0, 100).tolist() == [1, 2]
+    assert data_utils.search_addresses('spring st').index.tolist() == [3]
+    assert queries == [['latitude', 'longitude'], ['street', 'display_unit', 'zip_code']]
+
+
+def test_unit_grain_collapses_after_the_date_filter(queries):
+    raw = data_utils.get_page_listings_json(['area_name', 'price'], grain='unit')
+    filtered = pd.read_json(data_utils.StringIO(
+        data_utils.filter_listings_json(raw, '2025-05-01', '2026-12-31', grain='unit')), orient='split')
+    # Listing 3 is outside the date range, listings 1 and 2 are one unit: the latest update wins
+    assert filtered['id'].tolist() == [2]
+
+
+def test_comp_scores_follow_the_scoring_run_and_failures_are_not_cached(queries, monkeypatch):
+    monkeypatch.setattr(data_utils, '_table_version_cache', {})
+    versions, loads = ['2025-06-01 00:00:00'], []
+
+    def load():
+        loads.append(versions[0])
+        if versions[0] is None:
+            raise RuntimeError("listing_comps is missing")
+        return pd.DataFrame({'id': [1], 'price_percentile': [10.0]})
+    monkeypatch.setattr(data_utils, '_query_table_version', lambda query, params=None: str(versions[0]))
+    monkeypatch.setattr(data_utils, '_load_comp_scores', load)
+
+    data_utils.get_comp_scores()
+    data_utils.get_comp_scores()
+    assert loads == ['2025-06-01 00:00:00']
+
+    # A new scoring run, without any change to listings
+    data_utils._table_version_cache.clear()
+    versions[0] = '2025-06-02 00:00:00'
+    assert data_utils.get_comp_scores()['price_percentile'].tolist() == [10.0]
+    assert len(loads) == 2
+
+    data_utils._table_version_cache.clear()
+    versions[0] = None
+    assert data_utils.get_comp_scores().empty
+    assert data_utils.get_comp_scores().empty
+    assert len(loads) == 4
+
+
+def test_weekly_trends_follow_the_trends_watermark(queries, monkeypatch):
+    monkeypatch.setattr(data_utils, '_table_version_cache', {})
+    watermark, loads = ['2025-06-01 00:00:00'], []
+    monkeypatch.setattr(data_utils, '_query_table_version', lambda query, params=None: watermark[0])
+    monkeypatch.setattr(data_utils, '_load_weekly_trends', lambda: loads.append(1) or pd.DataFrame({'week_start': []}))
+
+    data_utils.get_weekly_trends()
+    data_utils.get_weekly_trends()
+    data_utils._table_version_cache.clear()
+    watermark[0] = '2025-06-08 00:00:00'
+    data_utils.get_weekly_trends()
+    assert len(loads) == 2
+
+
+def test_integer_keys_give_the_same_aggregations_as_names():
+    neighborhoods = pd.DataFrame({
+        'id': [1, 2, 3, 4, 5, 6],
+        'name': ['All', 'Manhattan', 'Brooklyn', 'Chelsea', 'SoHo', 'Park Slope'],
+        'parent_id': [None, 1, 1, 2, 2, 3],
+        'level': [0, 1, 1, 2, 2, 2],
+        'parent_name': [None, 'All', 'All', 'Manhattan', 'Manhattan', 'Brooklyn'],
+    })
+    rng = np.random.default_rng(4)
+    n = 300
+    listings = pd.DataFrame({
+        'id': np.arange(1, n + 1),
+        'unit_cluster_id': pd.array([None] * n, dtype='Int64'),
+        'area_name': rng.choice(['Chelsea', 'SoHo', 'Park Slope', 'Manhattan'], n),
+        'zip_code': rng.choice([f"100{i:02d}" for i in range(30)], n),
+        'latitude': 40.7 + rng.random(n) * 0.1,
+        'longitude': -74 + rng.random(n) * 0.1,
+        'bedroom_count': rng.integers(0, 4, n).astype(float),
+        'price': rng.choice(np.arange(2000, 6000, 250), n).astype(float),
+        'living_area_size': rng.choice([np.nan, 500, 700, 900], n),
+    })
+    keyed = listings.assign(area_id=listings['area_name'].map(neighborhoods.set_index('name')['id']).astype('Int32'),
+                            zip_id=pd.factorize(listings['zip_code'])[0] + 1)
+    for group_by in data_utils.GROUP_BY_OPTIONS:
+        pd.testing.assert_frame_equal(data_utils.data_aggregation(keyed, group_by),
+                                      data_utils.data_aggregation(listings, group_by))
+    pd.testing.assert_frame_equal(
+        data_utils.neighborhood_aggregation_recursive(keyed, quantile_mode='exact', neighborhoods=neighborhoods),
+        data_utils.neighborhood_aggregation_recursive(listings, quantile_mode='exact', neighborhoods=neighborhoods),
+        check_dtype=False)
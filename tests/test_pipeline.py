@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+from nyc import pipeline
+from nyc.pipeline import Stage, run_pipeline, select_stages, topological_order
+
+STAGES = [
+    Stage('neighborhoods', ('neighborhoods',), inputs=('hoods',)),
+    Stage('scrape', ('scrape',), deps=('neighborhoods',), inputs=('day',)),
+    Stage('trends', ('trends',), deps=('scrape',), inputs=('listings',)),
+    Stage('comps', ('comps',), deps=('scrape',), inputs=('listings',)),
+    Stage('charts', ('treemap',), deps=('neighborhoods',), inputs=('hoods',)),
+]
+
+
+def _run(tmp_path, values, runner=None, **kwargs):
+    ran = []
+
+    def record(stage):
+        ran.append(stage.name)
+        return True
+    fingerprints = {name: (lambda n=name: values[n]) for name in values}
+    outcome = run_pipeline(STAGES, state_path=str(tmp_path / 'state.json'), runner=runner or record,
+                           fingerprints=fingerprints, **kwargs)
+    return outcome, sorted(ran)
+
+
+def test_unchanged_stages_are_skipped_and_changes_run_downstream(tmp_path):
+    values = {'hoods': 'a', 'day': '2025-06-01', 'listings': '10:x'}
+    assert _run(tmp_path, values)[1] == ['charts', 'comps', 'neighborhoods', 'scrape', 'trends']
+    outcome, ran = _run(tmp_path, values)
+    assert ran == [] and set(outcome.values()) == {'skipped'}
+
+    values['listings'] = '11:y'
+    assert _run(tmp_path, values)[1] == ['comps', 'trends']
+    # A new neighborhoods file reruns everything below it
+    values['hoods'] = 'b'
+    assert _run(tmp_path, values)[1] == ['charts', 'comps', 'neighborhoods', 'scrape', 'trends']
+    assert _run(tmp_path, values, force=['comps'])[1] == ['comps']
+    outcome, ran = _run(tmp_path, {**values, 'day': '2025-06-02'}, dry_run=True)
+    assert ran == [] and outcome['trends'] == 'run' and outcome['charts'] == 'skipped'
+
+
+def test_a_forced_stage_runs_everything_downstream(tmp_path):
+    values = {'hoods': 'a', 'day': 'd', 'listings': 'l'}
+    _run(tmp_path, values)
+    assert _run(tmp_path, values, force=['scrape'])[1] == ['comps', 'scrape', 'trends']
+    # Only once: the next run finds everything up to date again
+    assert _run(tmp_path, values)[1] == []
+
+
+def test_independent_stages_run_in_parallel(tmp_path):
+    # trends and comps only finish if both are running at the same time
+    barrier = threading.Barrier(2, timeout=5)
+
+    def runner(stage):
+        if stage.name in ('trends', 'comps'):
+            barrier.wait()
+        return True
+    outcome, _ = _run(tmp_path, {'hoods': 'a', 'day': 'd', 'listings': 'l'}, runner=runner, jobs=3)
+    assert outcome['trends'] == outcome['comps'] == 'ran'
+
+
+def test_failures_block_dependents_and_are_retried(tmp_path):
+    values = {'hoods': 'a', 'day': 'd', 'listings': 'l'}
+    outcome, _ = _run(tmp_path, values, runner=lambda stage: stage.name != 'scrape')
+    assert outcome['scrape'] == 'failed' and outcome['trends'] == outcome['comps'] == 'blocked'
+    assert outcome['charts'] == 'ran'
+    assert _run(tmp_path, values)[1] == ['comps', 'scrape', 'trends']
+
+
+def test_stage_graph_is_validated():
+    assert [s.name for s in select_stages(STAGES, ['trends'])] == ['neighborhoods', 'scrape', 'trends']
+    with pytest.raises(ValueError):
+        topological_order([Stage('a', ('a',), deps=('b',)), Stage('b', ('b',), deps=('a',))])
+    with pytest.raises(ValueError):
+        select_stages(STAGES, ['nope'])
+
+
+def test_cluster_dependent_stages_run_after_dedup():
+    for name in ('trends', 'comps', 'price_scores'):
+        assert 'dedup' in [s.name for s in select_stages(pipeline.STAGES, [name])]
+    # dedup stamps the data version, so its own input leaves that stamp out
+    dedup = next(s for s in pipeline.STAGES if s.name == 'dedup')
+    assert dedup.inputs == ('listing_rows',)
@@ -0,0 +1,78 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from analytics import price_model
+from analytics.hierarchy import AreaHierarchy
+
+
+def _hierarchy():
+    return AreaHierarchy([
+        {'id': 1, 'name': 'Manhattan', 'level': 1, 'parent_id': None},
+        {'id': 2, 'name': 'Upper West Side', 'level': 2, 'parent_id': 1},
+        {'id': 3, 'name': 'Lincoln Square', 'level': 3, 'parent_id': 2},
+    ])
+
+
+def _listings():
+    return pd.DataFrame({
+        'id': [1, 2, 3],
+        'price': [3000.0, np.nan, 5000.0],
+        'bedroom_count': [1.0, 2.0, None],
+        'full_bathroom_count': pd.array([1, 2, None], dtype='Int8'),
+        'half_bathroom_count': pd.array([1, None, None], dtype='Int8'),
+        'living_area_size': [650.0, 0.0, None],
+        'latitude': [40.77, 40.78, 40.79],
+        'longitude': [-73.98, -73.97, -73.96],
+        'building_type': pd.Series(['RENTAL', None, 'CONDO'], dtype='category'),
+        'furnished': pd.array([True, None, False], dtype='boolean'),
+        'area_name': pd.Series(['Lincoln Square', 'Upper West Side', None], dtype='category'),
+        'date_updated': pd.to_datetime(['2025-06-01', '2025-06-02', '2025-06-03']),
+    })
+
+
+def test_build_features_handles_bathrooms_and_categoricals():
+    features = price_model.build_features(_listings(), _hierarchy())
+
+    assert features.columns.tolist() == price_model.NUMERIC_FEATURES + price_model.CATEGORICAL_FEATURES
+    # Half baths count for half, unknown counts as none
+    assert features['bathrooms'].tolist() == [1.5, 2.0, 0.0]
+    assert features['living_area_size'].isna().tolist() == [False, True, True]
+    assert features['building_type'].tolist() == ['RENTAL', 'UNKNOWN', 'CONDO']
+    assert features['furnished'].tolist() == ['True', 'False', 'False']
+    assert features['area_name'].tolist() == ['Lincoln Square', 'Upper West Side', 'UNKNOWN']
+    assert features['area_level_2'].tolist() == ['Upper West Side', 'Upper West Side', 'UNKNOWN']
+    assert features['borough'].tolist() == ['Manhattan', 'Manhattan', 'UNKNOWN']
+
+
+def test_score_frame_has_a_row_per_listing_and_price_residuals():
+    scores = price_model.score_frame(_listings(), np.array([3200.4, 4100.0, 4999.6]), 'v1')
+
+    assert scores.columns.tolist() == price_model.SCORE_COLUMNS
+    assert scores['listing_id'].tolist() == [1, 2, 3]
+    assert scores['predicted_price'].tolist() == [3200, 4100, 5000]
+    assert scores['residual'].iloc[0] == -200
+    # An unpriced listing gets a prediction but no residual
+    assert np.isnan(scores['residual'].iloc[1])
+    assert scores['residual'].iloc[2] == 0
+
+
+def test_pending_rows_are_unscored_changed_or_from_another_model():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE listings (id INTEGER, date_updated TEXT)")
+    conn.execute("CREATE TABLE listing_scores (listing_id INTEGER, model_version TEXT, listing_updated_at TEXT)")
+    conn.executemany("INSERT INTO listings VALUES (?, ?)", [
+        (1, '2025-06-01 00:00:00'),  # scored, unchanged
+        (2, '2025-06-02 00:00:00'),  # never scored
+        (3, '2025-06-05 00:00:00'),  # updated since its score
+        (4, '2025-06-01 00:00:00'),  # scored by an older model
+    ])
+    conn.executemany("INSERT INTO listing_scores VALUES (?, ?, ?)", [
+        (1, 'v2', '2025-06-01 00:00:00'),
+        (3, 'v2', '2025-06-01 00:00:00'),
+        (4, 'v1', '2025-06-01 00:00:00'),
+    ])
+    # The same WHERE score_listings runs on MySQL, in sqlite's parameter style
+    query = f"SELECT l.id FROM listings l {price_model.PENDING_WHERE.replace('%s', '?')} ORDER BY l.id"
+    assert [row[0] for row in conn.execute(query, ('v2',))] == [2, 3, 4]
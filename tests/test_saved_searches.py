@@ -0,0 +1,61 @@
+import pandas as pd
+
+from analytics.hierarchy import AreaHierarchy
+from analytics.saved_searches import SearchIndex, triggering_listings
+
+
+def _hierarchy():
+    return AreaHierarchy([
+        {'id': 1, 'name': 'Manhattan', 'level': 1, 'parent_id': None},
+        {'id': 2, 'name': 'Upper West Side', 'level': 2, 'parent_id': 1},
+        {'id': 3, 'name': 'Lincoln Square', 'level': 3, 'parent_id': 2},
+        {'id': 4, 'name': 'Brooklyn', 'level': 1, 'parent_id': None},
+    ])
+
+
+def _searches():
+    return pd.DataFrame({
+        'id': [1, 2, 3, 4],
+        'name': ['uws cheap', 'manhattan 2br', 'anywhere furnished', 'brooklyn'],
+        'area_name': ['Upper West Side', 'Manhattan', None, 'Brooklyn'],
+        'min_price': [None, None, None, None],
+        'max_price': [3000, 6000, None, None],
+        'min_bedrooms': [None, 2, None, None],
+        'max_bedrooms': [None, None, None, None],
+        'furnished': [None, None, True, None],
+    })
+
+
+def _matches(listings):
+    found = SearchIndex(_searches(), _hierarchy()).match(listings)
+    return {row: sorted(group) for row, group in found.groupby('row')['search_id']}
+
+
+def test_search_area_matches_its_subtree():
+    listings = pd.DataFrame({
+        'area_name': ['Lincoln Square', 'Lincoln Square', 'Brooklyn'],
+        'price': [2500, 5000, 2500],
+        'bedroom_count': [2, 2, 1],
+        'furnished': [False, False, None],
+    }, index=[10, 11, 12])
+    assert _matches(listings) == {10: [1, 2], 11: [2], 12: [4]}
+
+
+def test_unknown_values_only_match_unconstrained_searches():
+    listings = pd.DataFrame({
+        'area_name': [None, 'Upper West Side', 'Upper West Side'],
+        'price': [2000, None, 2000],
+        'bedroom_count': [1, 1, None],
+        'furnished': [True, False, None],
+    })
+    # No area: only the area-free search. No price: nothing. No bedrooms: not the 2BR search.
+    assert _matches(listings) == {0: [3], 2: [1]}
+
+
+def test_triggering_listings_keeps_new_and_price_cut():
+    current = pd.DataFrame({'source': ['se'] * 4, 'external_id': ['1', '2', '3', '4'], 'price': [3000, 2800, 3000, 3300]})
+    previous = pd.DataFrame({'source': ['se'] * 3, 'external_id': [2, 3, 4], 'price': [3000, 3000, 3000]})
+    triggered = triggering_listings(current, previous)
+    assert triggered['external_id'].tolist() == ['1', '2']
+    assert triggered['reason'].tolist() == ['new', 'price_cut']
+    assert triggered['previous_price'].iloc[1] == 3000
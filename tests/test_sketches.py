@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+from analytics.sketches import DEFAULT_COMPRESSION, AreaSketches, TDigest
+from app import cache_store, data_utils
+
+
+def test_small_digests_are_exact_after_merging():
+    rng = np.random.default_rng(0)
+    for _ in range(100):
+        values = rng.integers(0, 20, rng.integers(1, 60)).astype(float)
+        digest = TDigest.merge_all(TDigest.from_values(part) for part in np.array_split(values, 3))
+        qs = np.linspace(0, 1, 11)
+        assert np.allclose(digest.quantile(qs), np.quantile(values, qs))
+
+
+def test_merged_digest_rank_error_is_within_documented_bound():
+    rng = np.random.default_rng(1)
+    values = rng.lognormal(8.2, 0.4, 100_000)
+    digest = TDigest()
+    for part in np.array_split(values, 100):
+        digest.merge(TDigest.from_values(part))
+    for q in [0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99]:
+        rank = (values < digest.quantile(q)).mean()
+        assert abs(rank - q) <= np.pi * np.sqrt(q * (1 - q)) / DEFAULT_COMPRESSION
+
+
+def test_digest_round_trips_through_dict():
+    digest = TDigest.from_values(np.arange(1000))
+    assert TDigest.from_dict(digest.to_dict()).quantile(0.37) == digest.quantile(0.37)
+
+
+def _neighborhoods():
+    df = pd.DataFrame({'id': [1, 100, 101, 1001, 1002, 1011],
+                       'name': ['NYC', 'Manhattan', 'Brooklyn', 'Chelsea', 'SoHo', 'Park Slope'],
+                       'level': [0, 1, 1, 2, 2, 2],
+                       'parent_id': [None, 1, 1, 100, 100, 101]})
+    df['parent_name'] = df['parent_id'].map(df.set_index('id')['name'])
+    return df.sort_values(by=['level', 'name'])
+
+
+def _hierarchy_listings(n=400, seed=2):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'external_id': np.arange(n).astype(str),
+        # Manhattan also has listings of its own, Brooklyn doesn't
+        'area_name': rng.choice(['Chelsea', 'SoHo', 'Park Slope', 'Manhattan'], n),
+        'latitude': 40.7 + rng.random(n) * 0.1,
+        'longitude': -74 + rng.random(n) * 0.1,
+        'bedroom_count': rng.integers(0, 4, n).astype(float),
+        'price': rng.choice(np.arange(2000, 6000, 250), n).astype(float),
+        'living_area_size': rng.choice([np.nan, 500, 700, 900], n),
+        'state': 'NY',
+        'zip_code': '10001',
+    })
+
+
+def test_sketch_mode_matches_exact_hierarchy_aggregation(monkeypatch):
+    monkeypatch.setattr(data_utils, 'get_neighborhood_data', _neighborhoods)
+    listings = _hierarchy_listings()
+    exact = data_utils.neighborhood_aggregation_recursive(listings, quantile_mode='exact')
+    sketch = data_utils.neighborhood_aggregation_recursive(listings, quantile_mode='sketch')
+    # Few distinct values, so the sketches are exact too
+    pd.testing.assert_frame_equal(exact, sketch, check_dtype=False)
+
+
+def test_refresh_only_folds_in_what_changed(monkeypatch):
+    listings = _hierarchy_listings().assign(id=np.arange(1, 401))
+    sketches = AreaSketches(data_utils.SUMMARY_COLUMNS).refresh(listings.iloc[:300])
+    folded = []
+    original = AreaSketches.update
+
+    def update(self, batch, area_col='area_name'):
+        folded.append(len(batch))
+        return original(self, batch, area_col)
+    monkeypatch.setattr(AreaSketches, 'update', update)
+
+    # Only the 100 new listings are folded in
+    sketches.refresh(listings)
+    assert sum(folded) == 100
+    # A changed price rebuilds its area only, a vanished area is dropped
+    changed = listings[listings['area_name'] != 'Park Slope'].copy()
+    changed.loc[changed.index[0], 'price'] += 1
+    folded.clear()
+    sketches.refresh(changed)
+    assert folded == [(changed['area_name'] == changed['area_name'].iloc[0]).sum()]
+    assert sketches.get('Park Slope', 'price') is None
+    fresh = AreaSketches(data_utils.SUMMARY_COLUMNS).update(changed)
+    for area in ['Chelsea', 'SoHo', 'Manhattan']:
+        assert sketches.get(area, 'price').median() == fresh.get(area, 'price').median()
+
+
+def test_sketch_hierarchies_start_from_the_last_area_sketches(monkeypatch, tmp_path):
+    monkeypatch.setattr(cache_store, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(cache_store, '_memory', type(cache_store._memory)())
+    monkeypatch.setattr(data_utils, 'QUANTILE_MODE', 'sketch')
+    monkeypatch.setattr(data_utils, 'get_data_version', lambda: 'v1')
+    monkeypatch.setattr(data_utils, 'get_neighborhood_data', _neighborhoods)
+    monkeypatch.setattr(data_utils, '_area_sketches', {'sketches': None})
+    listings = _hierarchy_listings().assign(id=np.arange(1, 401))
+    data_utils.hierarchy_listings_json(listings.iloc[:300].to_json(orient='split'))
+    # Another worker starts from the stored sketches of the data version
+    monkeypatch.setattr(data_utils, '_area_sketches', {'sketches': None})
+    refreshed = []
+    monkeypatch.setattr(AreaSketches, 'refresh', lambda self, df, area_col='area_name': refreshed.append(self) or self)
+    data_utils.hierarchy_listings_json(listings.to_json(orient='split'))
+    assert refreshed[0].fingerprints and data_utils._area_sketches['sketches'] is refreshed[0]
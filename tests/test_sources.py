@@ -0,0 +1,68 @@
+import json
+import multiprocessing
+
+import pytest
+
+from scraping.run_sources import run_sources
+from scraping.sources import LocalFileSource, RateLimiter
+
+
+def _node(i, price=3000):
+    return {'id': str(i), 'areaName': 'Chelsea', 'price': price, 'bedroomCount': 1,
+            'geoPoint': {'latitude': 40.745, 'longitude': -74.0}, 'urlPath': f"/building/{i}"}
+
+
+def _write_payloads(directory):
+    page = {'listingData': {'edges': [{'node': _node(i)} for i in range(3)], 'pageInfo': {'totalPages': 1}}}
+    (directory / 'page-1.json').write_text(json.dumps(page))
+    # Listing 2 again with a new price: the later row wins within a batch
+    (directory / 'page-2.jsonl').write_text('\n'.join(json.dumps(_node(i, 2500)) for i in (2, 3)))
+
+
+def test_file_source_normalizes_to_listing_columns(tmp_path):
+    _write_payloads(tmp_path)
+    source = LocalFileSource(str(tmp_path), name='replay')
+    frames = [source.normalize(source.parse(payload)) for task in source.tasks() for payload in source.fetch(task)]
+    df = frames[0]
+    assert df['external_id'].tolist() == ['0', '1', '2']
+    assert {'area_name', 'bedroom_count', 'latitude', 'url_path', 'hex_z9'} <= set(df.columns)
+    assert (df['source'] == 'replay').all()
+
+
+def test_sources_run_concurrently_into_one_batched_writer(tmp_path):
+    first, second = tmp_path / 'a', tmp_path / 'b'
+    first.mkdir()
+    second.mkdir()
+    _write_payloads(first)
+    (second / 'other.jsonl').write_text(json.dumps(_node(9)))
+    batches = []
+    stats = run_sources([LocalFileSource(str(first)), LocalFileSource(str(second), name='other')],
+                        batch_size=100, write=batches.append)
+    assert stats['received'] == {'file-0': 5, 'other-1': 1}
+    assert len(batches) == 1
+    written = batches[0].set_index(['source', 'external_id'])['price']
+    assert len(written) == 5 and written[('file', '2')] == 2500
+
+
+def test_rate_limiter_spaces_calls(monkeypatch):
+    clock = {'now': 100.0}
+    monkeypatch.setattr('scraping.sources.time.monotonic', lambda: clock['now'])
+    monkeypatch.setattr('scraping.sources.time.sleep', lambda s: clock.update(now=clock['now'] + s))
+    limiter = RateLimiter(rate_per_second=2)
+    for _ in range(3):
+        limiter.wait()
+    assert clock['now'] == 101.0
+
+
+def test_a_failing_writer_stops_the_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr('scraping.run_sources.QUEUE_SIZE', 1)
+    for i in range(20):
+        (tmp_path / f"page-{i}.jsonl").write_text(json.dumps(_node(i)))
+    source = LocalFileSource(str(tmp_path))
+
+    def write(batch):
+        raise RuntimeError("database is gone")
+
+    with pytest.raises(RuntimeError):
+        run_sources([source, LocalFileSource(str(tmp_path), name='other')], batch_size=1, write=write)
+    assert not multiprocessing.active_children()
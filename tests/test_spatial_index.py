@@ -0,0 +1,37 @@
+import numpy as np
+
+from analytics.spatial_index import GridIndex, haversine_m, points_in_polygon
+
+
+def _random_points(n=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    return 40.5 + rng.random(n) * 0.4, -74.2 + rng.random(n) * 0.45
+
+
+def test_query_radius_matches_full_scan():
+    lat, lon = _random_points()
+    index = GridIndex(lat, lon, 250)
+    for radius in [50, 800, 5000]:
+        expected = np.flatnonzero(haversine_m(40.75, -73.98, lat, lon) <= radius)
+        assert np.array_equal(np.sort(index.query_radius(40.75, -73.98, radius)), expected)
+
+
+def test_query_bbox_matches_full_scan():
+    lat, lon = _random_points()
+    index = GridIndex(lat, lon, 250)
+    expected = np.flatnonzero((lat >= 40.70) & (lat <= 40.76) & (lon >= -74.0) & (lon <= -73.95))
+    assert np.array_equal(np.sort(index.query_bbox(40.70, 40.76, -74.0, -73.95)), expected)
+
+
+def test_query_polygon_matches_full_scan():
+    lat, lon = _random_points()
+    index = GridIndex(lat, lon, 250)
+    ring_lat, ring_lon = [40.70, 40.75, 40.76, 40.71], [-74.00, -74.01, -73.95, -73.94]
+    expected = np.flatnonzero(points_in_polygon(lat, lon, ring_lat, ring_lon))
+    assert len(expected) > 0
+    assert np.array_equal(np.sort(index.query_polygon(ring_lat, ring_lon)), expected)
+
+
+def test_points_without_coordinates_are_never_returned():
+    index = GridIndex([40.75, np.nan], [-73.98, np.nan], 250)
+    assert index.query_bbox(-90, 90, -180, 180).tolist() == [0]
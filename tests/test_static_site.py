@@ -0,0 +1,24 @@
+import pandas as pd
+
+from tools import build_static_site as site
+
+
+def test_figure_tasks_cover_every_combination_once():
+    tasks = site.figure_tasks()
+    names = [t[0] for t in tasks]
+    assert len(names) == len(set(names))
+    maps = [t for t in tasks if t[3]['figure'] == 'map']
+    assert len(maps) == len(site.GROUP_BY_OPTIONS) * len(site.MAP_TYPES) * len(site.METRIC_OPTIONS)
+
+
+def test_rendered_pages_share_plotly_js():
+    neighborhoods = pd.DataFrame({'id': [1, 2, 3], 'name': ['NYC', 'Manhattan', 'Harlem'], 'level': [0, 1, 2],
+                                  'parent_id': [0, 1, 2], 'parent_name': [None, 'NYC', 'Manhattan']})
+    site._init_worker({'neighborhoods': neighborhoods, 'plotly_js': 'assets/plotly-test.min.js'})
+    page = site.render_task(('neighborhood-sunburst.html', 'Neighborhood Hierarchy', 'Neighborhood sunburst',
+                             {'figure': 'hierarchy', 'kind': 'sunburst'}))
+    assert 'src="../assets/plotly-test.min.js"' in page
+    assert len(page) < 100_000
+    # Deterministic output for the same data
+    assert page == site.render_task(('neighborhood-sunburst.html', 'Neighborhood Hierarchy', 'Neighborhood sunburst',
+                                     {'figure': 'hierarchy', 'kind': 'sunburst'}))
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from app import data_utils
+from app.streaming import StreamingAggregator, stream_query
+
+
+def _listings(n=600):
+    rng = np.random.default_rng(4)
+    return pd.DataFrame({
+        'id': np.arange(1, n + 1),
+        'unit_cluster_id': pd.array([None] * n, dtype='Int64'),
+        'area_name': rng.choice(['Chelsea', 'SoHo', 'Park Slope', 'Manhattan'], n),
+        'zip_code': rng.choice([f"100{i:02d}" for i in range(30)], n),
+        'latitude': 40.7 + rng.random(n) * 0.1,
+        'longitude': -74 + rng.random(n) * 0.1,
+        'bedroom_count': rng.integers(0, 4, n).astype(float),
+        'price': rng.choice(np.arange(2000, 6000, 250), n).astype(float),
+        'living_area_size': rng.choice([np.nan, 500, 700, 900], n),
+        'external_id': np.arange(n).astype(str),
+        'state': 'NY',
+    })
+
+
+def _stream(listings, chunk_size=97):
+    aggregator = StreamingAggregator()
+    for start in range(0, len(listings), chunk_size):
+        aggregator.update(listings.iloc[start:start + chunk_size])
+    return aggregator
+
+
+def test_chunked_aggregation_matches_data_aggregation():
+    listings = _listings()
+    aggregator = _stream(listings)
+    for group_by in data_utils.GROUP_BY_OPTIONS:
+        # Few distinct values, so the medians are exact
+        pd.testing.assert_frame_equal(aggregator.group_aggregation(group_by),
+                                      data_utils.data_aggregation(listings, group_by), check_dtype=False)
+
+
+def test_chunked_hierarchy_matches_recursive_aggregation():
+    neighborhoods = pd.DataFrame({
+        'id': [1, 2, 3, 4, 5, 6],
+        'name': ['All', 'Manhattan', 'Brooklyn', 'Chelsea', 'SoHo', 'Park Slope'],
+        'parent_id': [None, 1, 1, 2, 2, 3],
+        'level': [0, 1, 1, 2, 2, 2],
+        'parent_name': [None, 'All', 'All', 'Manhattan', 'Manhattan', 'Brooklyn'],
+    })
+    listings = _listings()
+    expected = data_utils.neighborhood_aggregation_recursive(listings, quantile_mode='exact', neighborhoods=neighborhoods)
+    pd.testing.assert_frame_equal(_stream(listings).neighborhood_aggregation(neighborhoods), expected, check_dtype=False)
+
+
+def test_stream_query_filters_dates_and_keeps_one_row_per_unit():
+    query, params = stream_query('2025-05-01', '2026-12-31')
+    assert params == ('2025-05-01', '2026-12-31')
+    assert 'PARTITION BY COALESCE(unit_cluster_id, id)' in query and 'unit_rank = 1' in query
@@ -0,0 +1,36 @@
+import pandas as pd
+
+from analytics.text_index import TrigramIndex, address_documents, trigrams
+
+
+def _listings():
+    return pd.DataFrame({
+        'street': ['245 West 86th Street', '245 Broadway', '1 Amsterdam Avenue', '86 Ocean Parkway'],
+        'display_unit': ['#4A', 'Apt 12', None, '2R'],
+        'zip_code': ['10024', '10007', '10023', '11218'],
+    })
+
+
+def test_trigrams_are_padded_per_word():
+    assert sorted(trigrams('W 86')) == sorted(['  W', ' W ', '  8', ' 86', '86 '])
+
+
+def test_documents_are_normalized_like_dedup():
+    assert address_documents(_listings()).tolist()[:3] == ['245 W 86 ST 4A 10024', '245 BROADWAY 12 10007',
+                                                           '1 AMSTERDAM AVE 10023']
+
+
+def test_search_tolerates_typos_and_ranks_best_first():
+    index = TrigramIndex(address_documents(_listings()))
+    positions, scores = index.search('245 Broadwya')
+    assert positions[0] == 1
+    assert list(scores) == sorted(scores, reverse=True)
+
+    positions, _ = index.search('w 86th st')
+    assert positions[0] == 0
+
+
+def test_search_without_matches_is_empty():
+    index = TrigramIndex(address_documents(_listings()))
+    assert len(index.search('zzzz')[0]) == 0
+    assert len(index.search('')[0]) == 0
@@ -0,0 +1,43 @@
+from datetime import date
+
+import pandas as pd
+
+from analytics import trends
+
+
+def _listings():
+    return pd.DataFrame({
+        'area_name': ['A', 'A', 'B', None],
+        'bedroom_count': [1, 1, 2, 1],
+        'price': [3000, 4000, 5000, 0],
+        'date_added': pd.to_datetime(['2025-06-02 00:00', '2025-06-04 10:00', '2025-06-10 00:00', '2025-06-03 00:00']),
+        'off_market_at': pd.to_datetime([None, '2025-06-20 10:00', '2025-06-11 00:00', None]),
+    })
+
+
+def test_weekly_aggregates_counts_by_added_and_off_market_week():
+    rows = trends.weekly_aggregates(_listings()).set_index(['week_start', 'area_name', 'bedroom_count'])
+
+    first_week = rows.loc[(date(2025, 6, 2), 'A', 1)]
+    assert first_week['new_listings'] == 2
+    assert first_week['median_price'] == 3500
+
+    # The listing without an area only counts towards the all-areas rollup, and has no price
+    all_areas = rows.loc[(date(2025, 6, 2), trends.ALL_AREAS, trends.ALL_BEDROOMS)]
+    assert all_areas['new_listings'] == 3
+    assert all_areas['median_price'] == 3500
+
+    off_market = rows.loc[(date(2025, 6, 16), 'A', 1)]
+    assert off_market['new_listings'] == 0
+    assert off_market['off_market_listings'] == 1
+    assert round(off_market['median_days_on_market'], 1) == 16.0
+
+
+def test_weekly_aggregates_only_returns_requested_weeks():
+    rows = trends.weekly_aggregates(_listings(), [date(2025, 6, 9)])
+    assert set(rows['week_start']) == {date(2025, 6, 9)}
+
+
+def test_week_ranges_merge_consecutive_weeks():
+    weeks = [date(2025, 6, 23), date(2025, 6, 2), date(2025, 6, 9)]
+    assert trends._week_ranges(weeks) == [(date(2025, 6, 2), date(2025, 6, 16)), (date(2025, 6, 23), date(2025, 6, 30))]
@@ -0,0 +1,52 @@
+import pandas as pd
+
+from scraping import ingest_listings as ingest
+from scraping.validation import validate_listings
+
+
+def _batch():
+    return pd.DataFrame({
+        'source': 'streeteasy',
+        'external_id': ['1', '2', '3', '4', '5'],
+        'latitude': [40.72, 0.0, 40.75, 40.70, None],
+        'longitude': [-73.99, 0.0, -73.98, -73.95, -73.90],
+        'price': [3200, 2800, 15, 4100, 3900],
+        'living_area_size': [0, 650, 700, 5, 800],
+        'status': ['ACTIVE', 'ACTIVE', 'ACTIVE', 'ACTIVE', 'SOLD??'],
+        'building_type': ['RENTAL', 'CONDO', None, 'COOP', 'RENTAL'],
+    })
+
+
+def test_rules_split_the_batch_and_name_every_failed_rule():
+    valid, rejected = validate_listings(_batch())
+    assert valid['external_id'].tolist() == ['1']
+    # A size of 0 means unknown
+    assert pd.isna(valid['living_area_size'].iloc[0])
+    assert dict(zip(rejected['external_id'], rejected['reasons'])) == {
+        '2': 'coordinates', '3': 'price', '4': 'size', '5': 'coordinates'}
+
+
+def test_unknown_enum_values_are_logged_not_rejected(caplog):
+    batch = _batch().assign(latitude=40.72, longitude=-73.99, price=3000, living_area_size=None)
+    valid, rejected = validate_listings(batch)
+    assert len(valid) == 5 and rejected.empty
+    assert "Unknown 'status' values, stored anyway: {'SOLD??': 1}" in caplog.text
+
+
+def test_write_listings_quarantines_failed_rows(monkeypatch):
+    monkeypatch.setattr(ingest, 'stored_prices', lambda db, batch: pd.DataFrame())
+    monkeypatch.setattr(ingest, 'notify_matches', lambda db, batch, previous: None)
+    inserts = []
+
+    class DB:
+        def get_table_columns(self, table_name):
+            return list(_batch().columns)
+
+        def insert_many(self, table_name, columns, values, on_duplicate='ignore'):
+            inserts.append((table_name, columns, values))
+
+    ingest.write_listings(_batch(), DB())
+    (quarantine, columns, rows), (table, _, listings) = inserts
+    assert quarantine == 'listing_quarantine' and columns == ['source', 'external_id', 'reasons', 'payload']
+    assert [row[1] for row in rows] == ['2', '3', '4', '5'] and '"price":15' in rows[1][3]
+    assert table == 'listings' and len(listings) == 1
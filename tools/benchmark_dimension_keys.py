@@ -0,0 +1,67 @@
+"""
+Size of the listings table and GROUP BY latency on the string columns against their integer keys
+(database/dimensions.py), measured on the MySQL database.
+
+Run it before `python -m database.migrate` adds the keys for the "before" sizes, and after it for
+the sizes with the keys and the group-by comparison:
+
+    python tools/benchmark_dimension_keys.py
+    python tools/benchmark_dimension_keys.py --repeat 10
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+from typing import Dict
+
+from database.dimensions import KEY_COLUMNS, LOOKUP_DIMENSIONS
+from database.mysql_client import MySQLClient
+
+
+def table_sizes(db) -> Dict[str, tuple]:
+    """Rows, data bytes and index bytes of listings and the lookup tables."""
+    tables = ['listings', *(table for table, _ in LOOKUP_DIMENSIONS.values())]
+    placeholders = ', '.join(['%s'] * len(tables))
+    rows = db.execute_query(f"SELECT table_name, table_rows, data_length, index_length FROM information_schema.tables "
+                            f"WHERE table_schema = %s AND table_name IN ({placeholders})", (db.db_name, *tables))
+    return {name: (n, data, index) for name, n, data, index in rows}
+
+
+def group_by_seconds(db, col: str, repeat: int) -> float:
+    """Fastest of repeat runs of the map's aggregation grouped on col."""
+    query = f"SELECT {col}, COUNT(*), AVG(price), AVG(bedroom_count), AVG(living_area_size) FROM listings GROUP BY {col}"
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        db.execute_query(query)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per query, the fastest is kept')
+    args = parser.parse_args()
+
+    with MySQLClient() as db:
+        # Sizes from information_schema are estimates until the statistics are refreshed
+        db.execute_query("ANALYZE TABLE listings")
+        print(f"{'table':<20} {'rows':>10} {'data MB':>10} {'index MB':>10} {'bytes/row':>10}")
+        for name, (n, data, index) in table_sizes(db).items():
+            print(f"{name:<20} {n or 0:>10} {data / 1e6:>10.2f} {index / 1e6:>10.2f} {(data + index) / max(n or 0, 1):>10.0f}")
+
+        columns = db.get_table_columns('listings')
+        if 'area_id' not in columns:
+            print("\nNo dimension keys yet: run `python -m database.migrate`, then this again.")
+            return
+        print(f"\n{'GROUP BY':<20} {'string s':>10} {'id s':>10} {'speedup':>10}")
+        for col, id_col in KEY_COLUMNS.items():
+            by_name = group_by_seconds(db, col, args.repeat)
+            by_id = group_by_seconds(db, id_col, args.repeat)
+            print(f"{col:<20} {by_name:>10.4f} {by_id:>10.4f} {by_name / by_id:>9.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Memory per listing of the listings frame as pd.read_sql_query returns it, and after
+database/listing_schema.py's dtypes are applied.
+
+    python tools/benchmark_listing_memory.py              # the listings table
+    python tools/benchmark_listing_memory.py --rows 100000  # synthetic rows (tools/synthetic_data.py)
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+
+import pandas as pd
+
+from database.listing_schema import LISTING_DTYPES, apply_listing_dtypes
+from tools.synthetic_data import synthetic_raw_listings
+
+
+def load_raw_listings() -> pd.DataFrame:
+    from database.mysql_client import MySQLClient
+    with MySQLClient() as db:
+        return pd.read_sql_query("SELECT * FROM listings", db.sqlalchemy_engine)
+
+
+def bytes_per_listing(df: pd.DataFrame) -> pd.Series:
+    return df.memory_usage(deep=True, index=False) / max(len(df), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=None, help='Benchmark this many synthetic rows instead of the database')
+    args = parser.parse_args()
+
+    raw = synthetic_raw_listings(args.rows) if args.rows else load_raw_listings()
+    before = bytes_per_listing(raw)
+    after = bytes_per_listing(apply_listing_dtypes(raw))
+
+    report = pd.DataFrame({'before': before, 'after': after}).loc[[c for c in raw.columns if c in LISTING_DTYPES]]
+    print(f"{len(raw)} listings, bytes per listing by typed column:")
+    print(report.round(1).to_string())
+    print(f"\nAll columns: {before.sum():.0f} -> {after.sum():.0f} bytes per listing "
+          f"({after.sum() / before.sum():.0%} of the untyped frame)")
+
+
+if __name__ == '__main__':
+    main()
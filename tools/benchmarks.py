@@ -0,0 +1,230 @@
+"""
+Benchmarks of the ingest and analytics hot paths over synthetic data (tools/synthetic_data.py).
+
+    _parse_search_json                  search API pages -> listing nodes
+    ingest_listings                     nodes -> normalized rows -> insert (into BenchmarkDB, no MySQL)
+    data_aggregation[<group>]           the map's aggregation, per grouping
+    store_aggregation[<group>:<keys>]   the same over the Dash store's frame, one row per unit, grouped
+                                        on the names (strings) or their integer ids (database/dimensions.py)
+    neighborhood_aggregation[<mode>]    the treemap hierarchy, exact and sketch medians
+    store_to_json / store_read_json     the Dash store round trip of the listings frame
+
+Each benchmark is run --repeat times on fresh inputs and the fastest run is kept. Results are
+compared with the baselines in tools/benchmark_baselines.json. A benchmark more than --threshold
+slower than its baseline is a regression and makes the run exit with status 1. Baselines are
+machine specific: record them with --update-baseline on the machine that checks them.
+
+    python tools/benchmarks.py                          # 10k and 100k rows
+    python tools/benchmarks.py --rows 1000000 --only data_aggregation
+    python tools/benchmarks.py --update-baseline
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import copy
+import json
+import logging
+import platform
+import re
+import time
+from io import StringIO
+from typing import Callable, Dict, List
+
+import pandas as pd
+
+from analytics import saved_searches
+from analytics.dedup import collapse_units
+from analytics.hierarchy import AreaHierarchy
+from app.data_utils import GROUP_BY_OPTIONS, data_aggregation, neighborhood_aggregation_recursive
+from config.settings import ROOT_DIR
+from database.dimensions import KEY_COLUMNS
+from database.listing_schema import apply_listing_dtypes
+from scraping.ingest_listings import ingest_listings
+from scraping.streeteasy import StreetEasyScraper
+from tools.synthetic_data import (load_areas, neighborhood_frame, synthetic_nodes, synthetic_raw_listings,
+                                  synthetic_search_pages)
+
+BASELINE_FILE = os.path.join(ROOT_DIR, 'tools', 'benchmark_baselines.json')
+SCHEMA_FILE = os.path.join(ROOT_DIR, 'database', 'schema.sql')
+DEFAULT_ROWS = [10_000, 100_000]
+# Allowed slowdown against the baseline before a benchmark counts as a regression
+DEFAULT_THRESHOLD = 0.25
+
+
+def listings_table_columns(path: str = SCHEMA_FILE) -> List[str]:
+    """Column names of the listings table in schema.sql."""
+    with open(path, 'r') as f:
+        schema = f.read()
+    body = re.search(r"CREATE TABLE IF NOT EXISTS listings \((.*?)\n\);", schema, re.S).group(1)
+    names = [re.match(r"\s*(\w+)\s", line) for line in body.splitlines()]
+    return [m.group(1) for m in names if m and m.group(1).upper() not in ('UNIQUE', 'KEY', 'PRIMARY', 'INDEX')]
+
+
+class BenchmarkDB:
+    """
+    Stands in for MySQLClient during ingest_listings: the listings columns of schema.sql, the areas
+    of neighborhoods.json, no stored listings and no saved searches. Inserted listings are counted,
+    not stored. Lookup tables keep their names.
+    """
+
+    def __init__(self):
+        self.columns = listings_table_columns()
+        self.inserted = 0
+        self.lookups: Dict[str, List[str]] = {}
+
+    def get_table_columns(self, table_name: str) -> List[str]:
+        return self.columns
+
+    def execute_query(self, query: str, params: tuple = None) -> list:
+        # The saved searches signature, (count, last update), of an empty table
+        if 'COUNT(*)' in query:
+            return [(0, None)]
+        if 'FROM neighborhoods' in query:
+            return [(a['name'], a['id']) for a in sorted(load_areas(), key=lambda a: a['level'])]
+        table = query.split('FROM ')[-1].split()[0]
+        return [(name, i) for i, name in enumerate(self.lookups.get(table, []), start=1)]
+
+    def insert_many(self, table_name: str, columns: List[str], values: List[tuple], on_duplicate: str = 'ignore'):
+        if table_name != 'listings':
+            self.lookups.setdefault(table_name, []).extend(name for name, in values)
+            return
+        self.inserted += len(values)
+
+
+class Inputs:
+    """Synthetic inputs of one size, generated once and shared by every benchmark."""
+
+    def __init__(self, rows: int):
+        self.rows = rows
+        self.pages = synthetic_search_pages(synthetic_nodes(rows))
+        listings = apply_listing_dtypes(synthetic_raw_listings(rows))
+        self.listings = listings.assign(available_date=listings['available_at'])
+        self.neighborhoods = neighborhood_frame()
+        self.store_json = self.listings.to_json(date_format='iso', orient='split')
+        # What the dashboard callbacks aggregate: the store read back, names as plain strings.
+        # Already one row per unit, so the store_aggregation benchmarks time the grouping alone.
+        self.store_listings = collapse_units(pd.read_json(StringIO(self.store_json), orient='split'))
+
+
+def _parse_pages(pages):
+    for page in pages:
+        list(StreetEasyScraper._parse_search_json(page))
+
+
+def _parsed_nodes(pages) -> list:
+    """Nodes as search_rentals hands them to ingest_listings."""
+    return [node for page in copy.deepcopy(pages) for node in StreetEasyScraper._parse_search_json(page)]
+
+
+def _ingest(nodes):
+    # Matching against saved searches needs the area tree, which the benchmark takes from neighborhoods.json
+    saved_searches._index_cache.setdefault('hierarchy', AreaHierarchy(load_areas()))
+    ingest_listings(nodes, BenchmarkDB())
+
+
+# name -> (setup(inputs) -> args, timed function). setup runs before every repeat and isn't timed.
+BENCHMARKS: Dict[str, tuple] = {
+    '_parse_search_json': (lambda d: (copy.deepcopy(d.pages),), _parse_pages),
+    'ingest_listings': (lambda d: (_parsed_nodes(d.pages),), _ingest),
+    **{f"data_aggregation[{group_by}]": (lambda d: (d.listings, ), lambda df, g=group_by: data_aggregation(df, g))
+       for group_by in GROUP_BY_OPTIONS},
+    **{f"neighborhood_aggregation[{mode}]": (
+        lambda d: (d.listings, d.neighborhoods),
+        lambda df, hoods, m=mode: neighborhood_aggregation_recursive(df, quantile_mode=m, neighborhoods=hoods))
+       for mode in ('exact', 'sketch')},
+    **{f"store_aggregation[{group_by}:{keys}]": (
+        lambda d, k=keys: (d.store_listings.drop(columns=['unit_cluster_id', *([] if k == 'ids' else KEY_COLUMNS.values())]),),
+        lambda df, g=group_by: data_aggregation(df, g))
+       for group_by in GROUP_BY_OPTIONS for keys in ('names', 'ids')},
+    'store_to_json': (lambda d: (d.listings,), lambda df: df.to_json(date_format='iso', orient='split')),
+    'store_read_json': (lambda d: (d.store_json,), lambda payload: pd.read_json(StringIO(payload), orient='split')),
+}
+
+
+def time_benchmark(setup: Callable, func: Callable, inputs: Inputs, repeat: int) -> float:
+    """Fastest of repeat runs, in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        args = setup(inputs)
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmarks(rows: List[int], names: List[str] = None, repeat: int = 3) -> Dict[str, float]:
+    """
+    Times every selected benchmark at every size.
+
+    :param rows: Listing counts to generate inputs for.
+    :param names: Benchmark names, or prefixes of them. All benchmarks when None.
+    :param repeat: Runs per benchmark, the fastest is kept.
+    :return: Seconds by '<benchmark>@<rows>'.
+    """
+    selected = [name for name in BENCHMARKS if not names or any(name.startswith(n) for n in names)]
+    results = {}
+    for n in rows:
+        inputs = Inputs(n)
+        for name in selected:
+            setup, func = BENCHMARKS[name]
+            results[f"{name}@{n}"] = time_benchmark(setup, func, inputs, repeat)
+            print(f"{name + '@' + str(n):<45} {results[f'{name}@{n}']:9.4f}s", flush=True)
+    return results
+
+
+def find_regressions(results: Dict[str, float], baselines: Dict[str, float], threshold: float = DEFAULT_THRESHOLD) -> Dict[str, float]:
+    """Benchmarks slower than their baseline by more than threshold, with their slowdown ratio."""
+    return {key: seconds / baselines[key] for key, seconds in results.items()
+            if baselines.get(key) and seconds > baselines[key] * (1 + threshold)}
+
+
+def load_baselines(path: str = BASELINE_FILE) -> Dict[str, float]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f).get('results', {})
+
+
+def save_baselines(results: Dict[str, float], path: str = BASELINE_FILE):
+    baselines = load_baselines(path)
+    baselines.update(results)
+    with open(path, 'w') as f:
+        json.dump({'machine': f"{platform.machine()} {platform.processor() or platform.system()}, "
+                              f"Python {platform.python_version()}, pandas {pd.__version__}",
+                   'results': {key: round(seconds, 5) for key, seconds in sorted(baselines.items())}}, f, indent=2)
+        f.write('\n')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS, help='Listing counts, e.g. 10000 100000 1000000')
+    parser.add_argument('--only', nargs='+', default=None, help='Benchmark names or name prefixes to run')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per benchmark, the fastest is kept')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='Allowed slowdown, 0.25 = 25%%')
+    parser.add_argument('--update-baseline', action='store_true', help='Store these results as the new baselines')
+    args = parser.parse_args()
+    # The aggregations log every call
+    logging.disable(logging.INFO)
+
+    results = run_benchmarks(args.rows, args.only, args.repeat)
+    if args.update_baseline:
+        save_baselines(results)
+        print(f"Baselines updated in {BASELINE_FILE}")
+        return
+
+    baselines = load_baselines()
+    missing = [key for key in results if key not in baselines]
+    if missing:
+        print(f"No baseline for {len(missing)} results, e.g. {missing[0]}. Record them with --update-baseline.")
+    regressions = find_regressions(results, baselines, args.threshold)
+    for key, ratio in regressions.items():
+        print(f"REGRESSION {key}: {results[key]:.4f}s vs baseline {baselines[key]:.4f}s ({ratio:.2f}x)")
+    if regressions:
+        sys.exit(1)
+    print(f"No regressions beyond {args.threshold:.0%}.")
+
+
+if __name__ == '__main__':
+    main()
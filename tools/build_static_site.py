@@ -0,0 +1,192 @@
+"""
+Builds a static, serverless snapshot of the dashboard.
+
+Listings and neighborhoods are read once. The map (every group-by x map type x metric), the
+treemap (every metric) and the neighborhood hierarchy charts of tools/neighborhood_treemap.py and
+tools/neighborhood_diagram.py are rendered in parallel in a process pool. Every page loads the same
+plotly.js file from assets/, written once, instead of embedding its own 3.5MB copy.
+
+    python tools/build_static_site.py --out site
+
+Output:
+    site/index.html                 links to every figure
+    site/manifest.json              figures with their parameters, sizes and content hashes
+    site/assets/plotly-<v>.min.js   the shared plotly.js bundle
+    site/figures/*.html             one page per figure
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import hashlib
+import html
+import json
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+from app.data_utils import (DEFAULT_DATE_RANGE, GROUP_BY_OPTIONS, data_aggregation, filter_by_available_date,
+                            get_data_version, get_listings_data, get_neighborhood_data,
+                            neighborhood_aggregation_recursive)
+from app.figures import (HIERARCHY_CHARTS, METRIC_OPTIONS, build_choropleth_figure, build_hierarchy_chart,
+                         build_map_figure, build_tree_diagram, build_treemap_figure)
+from app.geometry import get_geometries, location_keys, resolution_for_zoom
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+GROUP_BY_LABELS = {'area_name': 'Neighborhood', 'zip_code': 'Zip Code'}
+MAP_TYPES = {'bubble': 'Bubble', 'choropleth': 'Choropleth'}
+# Zoom the static maps open at, which picks the choropleth geometry resolution
+DEFAULT_ZOOM = 10
+
+# Data shared by every task of a worker process, set once by _init_worker
+_worker_data = {}
+
+
+def _init_worker(data: dict):
+    _worker_data.update(data)
+
+
+def figure_tasks() -> list:
+    """Every figure of the site as (file name, section, title, params)."""
+    tasks = []
+    for group_by in GROUP_BY_OPTIONS:
+        for map_type, map_label in MAP_TYPES.items():
+            for metric, metric_label in METRIC_OPTIONS.items():
+                params = {'figure': 'map', 'group_by': group_by, 'map_type': map_type, 'metric': metric}
+                tasks.append((f"map-{map_type}-{group_by}-{metric}.html", 'Map',
+                              f"{map_label} map by {GROUP_BY_LABELS[group_by]}: {metric_label}", params))
+    for metric, metric_label in METRIC_OPTIONS.items():
+        tasks.append((f"treemap-{metric}.html", 'Treemap', f"Treemap: {metric_label}",
+                      {'figure': 'treemap', 'metric': metric}))
+    for kind in HIERARCHY_CHARTS:
+        tasks.append((f"neighborhood-{kind}.html", 'Neighborhood Hierarchy', f"Neighborhood {kind}",
+                      {'figure': 'hierarchy', 'kind': kind}))
+    tasks.append(("neighborhood-diagram.html", 'Neighborhood Hierarchy', "Neighborhood tree diagram",
+                  {'figure': 'diagram'}))
+    return tasks
+
+
+def _build_figure(params: dict):
+    data = _worker_data
+    if params['figure'] == 'map':
+        df = data['aggregates'][params['group_by']]
+        if params['map_type'] == 'choropleth':
+            return build_choropleth_figure(df, params['metric'], params['group_by'], data['geometries'][params['group_by']])
+        return build_map_figure(df, params['metric'], 'listing_count', params['group_by'])
+    if params['figure'] == 'treemap':
+        return build_treemap_figure(data['hierarchy'], params['metric'])
+    if params['figure'] == 'hierarchy':
+        return build_hierarchy_chart(data['neighborhoods'], params['kind'])
+    return build_tree_diagram(data['neighborhoods'].to_dict('records'))
+
+
+def render_task(task) -> str:
+    """Renders one figure to a standalone page that loads the shared plotly.js."""
+    file_name, _, title, params = task
+    fig = _build_figure(params)
+    if not fig.layout.title.text:
+        fig.update_layout(title_text=title, margin={'t': 40})
+    # A fixed div id keeps pages byte-identical between builds of the same data
+    return fig.to_html(full_html=True, include_plotlyjs=f"../{_worker_data['plotly_js']}", div_id=file_name[:-len('.html')],
+                       config={'displaylogo': False, 'responsive': True}, default_height='95vh')
+
+
+def load_site_data() -> dict:
+    """Reads listings and neighborhoods once and derives everything the figures need."""
+    listings = get_listings_data()
+    if listings.empty:
+        raise SystemExit("No listings found.")
+    listings = listings.assign(available_date=pd.to_datetime(listings['available_at']))
+    # Same default date range the dashboard opens with
+    listings = filter_by_available_date(listings, *(str(d) for d in DEFAULT_DATE_RANGE))
+    neighborhoods = get_neighborhood_data()
+
+    aggregates, geometries = {}, {}
+    coordinates = listings[['area_name', 'zip_code', 'latitude', 'longitude']]
+    # Only the default date range's listings, so hulls are keyed on these points, not the data version
+    points_version = str(pd.util.hash_pandas_object(coordinates, index=False).sum())
+    for group_by in GROUP_BY_OPTIONS:
+        df = data_aggregation(listings, group_by)
+        aggregates[group_by] = df
+        keys = location_keys(df[group_by], group_by).tolist()
+        levels = get_geometries(group_by, keys, points_loader=lambda: coordinates, points_version=points_version)
+        geometries[group_by] = levels[resolution_for_zoom(DEFAULT_ZOOM)]
+    return {
+        'aggregates': aggregates,
+        'geometries': geometries,
+        'hierarchy': neighborhood_aggregation_recursive(listings, neighborhoods=neighborhoods),
+        'neighborhoods': neighborhoods,
+    }
+
+
+def _index_page(manifest: dict) -> str:
+    sections = {}
+    for figure in manifest['figures']:
+        sections.setdefault(figure['section'], []).append(
+            f'<li><a href="{html.escape(figure["path"])}">{html.escape(figure["title"])}</a></li>')
+    body = ''.join(f"<h2>{html.escape(section)}</h2><ul>{''.join(items)}</ul>" for section, items in sections.items())
+    return (f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>NYC Apartment Analytics</title></head>"
+            f"<body><h1>NYC Apartment Analytics</h1><p>Snapshot of {html.escape(manifest['generated_at'])}, "
+            f"listings available {manifest['date_range'][0]} to {manifest['date_range'][1]}.</p>{body}</body></html>")
+
+
+def build_site(out_dir: str, workers: int = None) -> dict:
+    """
+    Renders every figure into out_dir and writes the index and manifest.
+
+    :param out_dir: Output directory, created if needed. Existing files are overwritten.
+    :param workers: Worker processes. Defaults to the number of CPUs.
+    :return: The manifest.
+    """
+    started = time.perf_counter()
+    data = load_site_data()
+    logging.info(f"Loaded site data in {time.perf_counter() - started:.1f}s.")
+
+    os.makedirs(os.path.join(out_dir, 'assets'), exist_ok=True)
+    os.makedirs(os.path.join(out_dir, 'figures'), exist_ok=True)
+    data['plotly_js'] = f"assets/plotly-{get_plotlyjs_version()}.min.js"
+    with open(os.path.join(out_dir, data['plotly_js']), 'w', encoding='utf-8') as f:
+        f.write(get_plotlyjs())
+
+    tasks = figure_tasks()
+    figures = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data,)) as pool:
+        for (file_name, section, title, params), page in zip(tasks, pool.map(render_task, tasks)):
+            content = page.encode('utf-8')
+            path = f"figures/{file_name}"
+            with open(os.path.join(out_dir, path), 'wb') as f:
+                f.write(content)
+            figures.append({'path': path, 'section': section, 'title': title, 'params': params,
+                            'bytes': len(content), 'sha256': hashlib.sha256(content).hexdigest()})
+
+    manifest = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'data_version': get_data_version(force=True),
+        'date_range': [str(d) for d in DEFAULT_DATE_RANGE],
+        'plotly_js': data['plotly_js'],
+        'figures': figures,
+    }
+    with open(os.path.join(out_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    with open(os.path.join(out_dir, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(_index_page(manifest))
+    logging.info(f"Rendered {len(figures)} figures to {out_dir} in {time.perf_counter() - started:.1f}s.")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--out', default='site', help='Output directory')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    args = parser.parse_args()
+    build_site(args.out, args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+A local stand-in for StreetEasy's search API, for running the scrape pipeline end to end offline.
+
+Serves GET /srp-service-api/for-rent/<slug>[/<filters>]?page=N with the real response shape
+(`listingData.edges[].node`, `listingData.pageInfo.totalPages`). Every slug has the same number
+of synthetic listings (tools/synthetic_data.py) in pages of 14, named after the matching area of
+data/neighborhoods.json. Filters in the path are accepted and ignored. Any other path answers
+200 with an empty page, which covers the scraper's session warm-up.
+
+Latency and errors can be injected: every request waits --latency-ms (+-50%), and a share
+--error-rate of API requests answers 429 or 503 instead.
+
+    python tools/fake_streeteasy.py --port 8765 --listings-per-area 300 --latency-ms 50 --error-rate 0.02
+    python -m scraping.scrape_listings --base-url http://127.0.0.1:8765 --delay 0.1
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from tools.synthetic_data import PAGE_SIZE, load_areas, synthetic_nodes
+
+SEARCH_PATH = re.compile(r"^/srp-service-api/for-rent/(?P<slug>[^/?]+)(?:/[^?]*)?$")
+
+
+def area_slug(name: str) -> str:
+    """A URL path segment for an area name, e.g. 'Stuyvesant Town/PCV' -> 'stuyvesant-town-pcv'."""
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+
+class FakeStreetEasy:
+    """Listings per slug, the injected latency and errors, and counters of what was served."""
+
+    def __init__(self, listings_per_area: int = 200, latency_ms: float = 0.0, error_rate: float = 0.0,
+                 error_codes=(429, 503), seed: int = 0):
+        self.listings_per_area = listings_per_area
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.error_codes = list(error_codes)
+        self.random = random.Random(seed)
+        # Every area gets the same listings with its own ids and name
+        self.template = synthetic_nodes(listings_per_area, seed=seed)
+        self.area_names = {area_slug(a['name']): a['name'] for a in load_areas()}
+        self.slug_index: Dict[str, int] = {}
+        self.counts = Counter()
+        self.lock = threading.Lock()
+
+    def nodes(self, slug: str) -> List[dict]:
+        with self.lock:
+            index = self.slug_index.setdefault(slug, len(self.slug_index))
+        name = self.area_names.get(slug, slug)
+        base = (index + 1) * 10_000_000
+        return [{**node, 'id': str(base + i), 'areaName': name} for i, node in enumerate(self.template)]
+
+    def page(self, slug: str, page: int) -> dict:
+        nodes = self.nodes(slug)
+        total_pages = max(1, -(-len(nodes) // PAGE_SIZE))
+        start = (page - 1) * PAGE_SIZE
+        edges = [{'node': node} for node in nodes[start:start + PAGE_SIZE]] if page >= 1 else []
+        return {'listingData': {'edges': edges, 'pageInfo': {'totalPages': total_pages}}}
+
+    def respond(self, path: str) -> (int, Optional[dict]):
+        """Status and JSON body for a request path, after the injected latency."""
+        if self.latency_ms:
+            time.sleep(self.latency_ms * self.random.uniform(0.5, 1.5) / 1000)
+        url = urlparse(path)
+        match = SEARCH_PATH.match(url.path)
+        if not match:
+            self._count('other')
+            return 200, {}
+        if self.error_rate and self.random.random() < self.error_rate:
+            status = self.random.choice(self.error_codes)
+            self._count(f'error_{status}')
+            return status, None
+        page = int(parse_qs(url.query).get('page', ['1'])[0])
+        body = self.page(match.group('slug'), page)
+        self._count('pages')
+        self._count('listings', len(body['listingData']['edges']))
+        return 200, body
+
+    def _count(self, key: str, n: int = 1):
+        with self.lock:
+            self.counts[key] += n
+
+
+def make_server(fake: FakeStreetEasy, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+    """An HTTP server for fake. Port 0 picks a free port (server.server_address)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            status, body = fake.respond(self.path)
+            payload = json.dumps(body).encode('utf-8') if body is not None else b''
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_server(fake: FakeStreetEasy, host: str = '127.0.0.1', port: int = 0) -> (ThreadingHTTPServer, str):
+    """Serves fake from a background thread. Returns the server and its base URL."""
+    server = make_server(fake, host, port)
+    threading.Thread(target=server.serve_forever, name='fake-streeteasy', daemon=True).start()
+    return server, f"http://{server.server_address[0]}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--listings-per-area', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Mean added latency per request')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of API requests answered with 429/503')
+    args = parser.parse_args()
+
+    fake = FakeStreetEasy(args.listings_per_area, args.latency_ms, args.error_rate)
+    server = make_server(fake, args.host, args.port)
+    print(f"Fake StreetEasy on http://{args.host}:{args.port} ({args.listings_per_area} listings per area)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(dict(fake.counts))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,50 +2,31 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-import pandas as pd
-import plotly.express as px
+from app.figures import build_hierarchy_chart, neighborhood_tree_frame
 from scraping.get_neighborhood_leaf_nodes import get_neighborhoods
 
-def treemap(df):
-    fig = px.treemap(names=df['name'], parents=df['parent_name'])
-    output_file = 'img/neighborhood_treemap.html'
-    fig.write_html(output_file)
-    print(f"Diagram saved to {output_file}")
-
-def sunburst(df):
-    fig = px.sunburst(names=df['name'], parents=df['parent_name'])
-    output_file = 'img/neighborhood_sunburst.html'
-    fig.write_html(output_file)
-    print(f"Diagram saved to {output_file}")
-
-def icicle(df):
-    # size should be the sum of all children listings, but for now just use count
-    fig = px.icicle(names=df['name'], parents=df['parent_name'])
-    output_file = 'img/neighborhood_icicle.html'
+def write_chart(df, kind):
+    fig = build_hierarchy_chart(df, kind)
+    output_file = f'img/neighborhood_{kind}.html'
     fig.write_html(output_file)
     print(f"Diagram saved to {output_file}")
 
 def main():
     """
-    Generates a treemap of the neighborhoods and saves it as an HTML file.
+    Generates a treemap, sunburst and icicle chart of the neighborhoods and saves them as HTML files.
     Modify with colors/sizes later 
         Can size/color by number of listings, average price, average sq ft, etc. once available
+    See tools/build_static_site.py to render these together with every dashboard figure.
     """
     neighborhoods = get_neighborhoods()
     if not neighborhoods:
         print("No neighborhoods found to generate a diagram.")
         return
 
-    df = pd.DataFrame(neighborhoods)
-    df = df[~df['id'].isin([800000, 9999999])]  # Remove Unassigned and childless NNJ
-    df['parent_name'] = df['parent_id'].map(df.set_index('id')['name'])
-    df.sort_values(by=['level', 'name'], inplace=True)
-    
-
-    treemap(df)
-    sunburst(df)
-    icicle(df)
+    df = neighborhood_tree_frame(neighborhoods)
+    for kind in ('treemap', 'sunburst', 'icicle'):
+        write_chart(df, kind)
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,87 @@
+"""
+End-to-end scrape throughput against the fake StreetEasy API (tools/fake_streeteasy.py).
+
+Starts the fake server, splits the area slugs over --workers StreetEasySource workers and runs
+them through scraping/run_sources.py: HTTP requests, retries, parsing, normalizing and batched
+writes. Writes go to BenchmarkDB (no MySQL) unless --db is given. Reports listings per second,
+pages served and the errors the server injected.
+
+    python tools/scrape_throughput.py --areas 20 --workers 4 --rate 20 --latency-ms 30 --error-rate 0.02
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import logging
+from typing import Dict, List
+
+from analytics import saved_searches
+from analytics.hierarchy import AreaHierarchy
+from scraping.ingest_listings import write_listings
+from scraping.run_sources import INGEST_BATCH_SIZE, run_sources
+from scraping.sources import StreetEasySource
+from tools.benchmarks import BenchmarkDB
+from tools.fake_streeteasy import FakeStreetEasy, area_slug, start_server
+from tools.synthetic_data import leaf_areas, load_areas
+
+
+def measure_throughput(slugs: List[str], workers: int = 4, rate: float = 0.0, listings_per_area: int = 200,
+                       latency_ms: float = 0.0, error_rate: float = 0.0, batch_size: int = INGEST_BATCH_SIZE,
+                       use_db: bool = False) -> Dict:
+    """
+    Scrapes slugs from a fresh fake server.
+
+    :param slugs: Areas to scrape, split round robin over the workers.
+    :param workers: StreetEasySource worker processes.
+    :param rate: Max requests per second per worker. 0 keeps REQUEST_DELAY_SECONDS.
+    :param use_db: Write to MySQL instead of BenchmarkDB.
+    :return: run_sources statistics plus listings_per_second and the server's counters.
+    """
+    fake = FakeStreetEasy(listings_per_area, latency_ms, error_rate)
+    server, base_url = start_server(fake)
+    # A short first backoff: the fake server's errors are random, not a real rate limit
+    sources = [StreetEasySource(slugs=slugs[i::workers], rate_per_second=rate, base_url=base_url,
+                                retry_backoff_seconds=0.2)
+               for i in range(min(workers, len(slugs)))]
+    try:
+        if use_db:
+            stats = run_sources(sources, batch_size)
+        else:
+            db = BenchmarkDB()
+            # Matching against saved searches needs the area tree, taken from neighborhoods.json
+            saved_searches._index_cache.setdefault('hierarchy', AreaHierarchy(load_areas()))
+            stats = run_sources(sources, batch_size, lambda batch: write_listings(batch, db))
+    finally:
+        server.shutdown()
+        server.server_close()
+    stats['listings_per_second'] = stats['written'] / max(stats['seconds'], 1e-9)
+    stats['server'] = dict(fake.counts)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--areas', type=int, default=12, help='Leaf areas of neighborhoods.json to scrape')
+    parser.add_argument('--listings-per-area', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=20.0, help='Max requests per second per worker, 0 for REQUEST_DELAY_SECONDS')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Mean added server latency per request')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with 429/503')
+    parser.add_argument('--batch-size', type=int, default=INGEST_BATCH_SIZE)
+    parser.add_argument('--db', action='store_true', help='Write to MySQL instead of discarding the rows')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    slugs = [area_slug(a['name']) for a in leaf_areas(load_areas())[:args.areas]]
+    stats = measure_throughput(slugs, args.workers, args.rate, args.listings_per_area, args.latency_ms,
+                               args.error_rate, args.batch_size, args.db)
+    server = stats['server']
+    errors = {k: v for k, v in server.items() if k.startswith('error_')}
+    print(f"{stats['written']} listings from {len(slugs)} areas with {args.workers} workers in {stats['seconds']:.1f}s: "
+          f"{stats['listings_per_second']:.0f} listings/s")
+    print(f"{server.get('pages', 0)} pages served, injected errors: {errors or 'none'}, {stats['batches']} batches written")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Aggregates the listings table in fixed-size chunks (app/streaming.py) and reports peak memory.
+
+    python tools/stream_aggregation.py --chunk-size 20000
+    python tools/stream_aggregation.py --group-by zip_code --out zip_codes.csv
+    python tools/stream_aggregation.py --check   # also compare with the in-memory aggregation
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import logging
+import time
+import tracemalloc
+
+import pandas as pd
+
+from app.data_utils import (DEFAULT_DATE_RANGE, GROUP_BY_OPTIONS, data_aggregation, filter_by_available_date,
+                            get_listings_data)
+from app.streaming import STREAM_CHUNK_SIZE, stream_aggregations
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def in_memory_aggregation(group_by: str, start_date, end_date) -> pd.DataFrame:
+    listings = get_listings_data()
+    listings = listings.assign(available_date=pd.to_datetime(listings['available_at']))
+    return data_aggregation(filter_by_available_date(listings, str(start_date), str(end_date)), group_by)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--group-by', choices=GROUP_BY_OPTIONS, default='area_name')
+    parser.add_argument('--chunk-size', type=int, default=STREAM_CHUNK_SIZE, help='Rows per chunk')
+    parser.add_argument('--start-date', default=str(DEFAULT_DATE_RANGE[0]))
+    parser.add_argument('--end-date', default=str(DEFAULT_DATE_RANGE[1]))
+    parser.add_argument('--out', default=None, help='Write the aggregation to this CSV file')
+    parser.add_argument('--check', action='store_true', help='Compare with the in-memory data_aggregation')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    tracemalloc.start()
+    aggregator = stream_aggregations(args.start_date, args.end_date, args.chunk_size)
+    result = aggregator.group_aggregation(args.group_by)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{aggregator.rows} listings into {len(result)} groups in {time.perf_counter() - started:.1f}s, "
+          f"peak {peak / 2**20:.1f} MiB with chunks of {args.chunk_size}")
+
+    if args.out:
+        result.to_csv(args.out, index=False)
+    if args.check:
+        expected = in_memory_aggregation(args.group_by, args.start_date, args.end_date)
+        expected[args.group_by] = expected[args.group_by].astype(object)
+        merged = expected.merge(result, on=args.group_by, how='outer', suffixes=('', '_stream'), indicator=True)
+        print(f"Groups only in one result: {(merged['_merge'] != 'both').sum()}")
+        for col in expected.columns.drop(args.group_by):
+            diff = (merged[col] - merged[f'{col}_stream']).abs()
+            print(f"  {col:<25} max abs difference {diff.max():.6g}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+"""
+Synthetic listings shaped like StreetEasy's data, for benchmarks and offline load tests.
+
+Listings are spread over the leaf areas of data/neighborhoods.json, placed around the center of
+each area's boundary, with area-level price levels, bedroom mixes, missing sizes (0, as the API
+reports them) and a share of listings that are the same unit listed by several brokers.
+
+    synthetic_nodes(n)          search API listing nodes (camelCase, nested geoPoint)
+    synthetic_search_pages(..)  search API responses, `listingData.edges` + `pageInfo`
+    synthetic_raw_listings(n)   rows of the listings table with the driver's Python types
+
+    python tools/synthetic_data.py --rows 10000 --out data/replay   # files for scraping/run_sources.py
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from analytics.hierarchy import EXCLUDED_AREA_IDS
+from app.geometry import decode_polyline
+from config.settings import ROOT_DIR
+
+NEIGHBORHOODS_FILE = os.path.join(ROOT_DIR, 'data', 'neighborhoods.json')
+# Listings per search API page
+PAGE_SIZE = 14
+BUILDING_TYPES = ['RENTAL', 'CONDO', 'COOP', 'HOUSE', 'MULTI_FAMILY']
+BEDROOM_WEIGHTS = [0.2, 0.35, 0.28, 0.12, 0.05]
+# Share of listings that repeat another broker's unit
+DUPLICATE_SHARE = 0.1
+NYC_CENTER = (40.73, -73.95)
+
+
+def load_areas(path: str = NEIGHBORHOODS_FILE) -> List[dict]:
+    """Every area of neighborhoods.json as {id, name, level, parent_id, center}, without the excluded areas."""
+    with open(path, 'r') as f:
+        raw = json.load(f).get('data', {}).get('areas', [])
+    areas = []
+    for area in raw:
+        if int(area['id']) in EXCLUDED_AREA_IDS:
+            continue
+        encoded = (area.get('map_coordinates') or {}).get('encoded_boundary')
+        ring = decode_polyline(encoded) if encoded else []
+        center = (float(np.mean([p[1] for p in ring])), float(np.mean([p[0] for p in ring]))) if ring else None
+        areas.append({'id': int(area['id']), 'name': area['name'], 'level': int(area['level']),
+                      'parent_id': int(area['parent_id']) if area.get('parent_id') is not None else None,
+                      'center': center})
+    return areas
+
+
+def leaf_areas(areas: List[dict]) -> List[dict]:
+    """Areas without children, where listings live. Areas without a boundary take their parent's center."""
+    by_id = {a['id']: a for a in areas}
+    parents = {a['parent_id'] for a in areas}
+    leaves = []
+    for area in areas:
+        if area['id'] in parents:
+            continue
+        center, node = area['center'], area
+        while center is None and node.get('parent_id') in by_id and node['parent_id'] != node['id']:
+            node = by_id[node['parent_id']]
+            center = node['center']
+        leaves.append({**area, 'center': center or NYC_CENTER})
+    return leaves
+
+
+def neighborhood_frame(areas: List[dict] = None) -> pd.DataFrame:
+    """The areas as get_neighborhood_data() returns them."""
+    df = pd.DataFrame(areas or load_areas())[['id', 'name', 'level', 'parent_id']]
+    df['parent_name'] = df['parent_id'].map(df.set_index('id')['name'])
+    return df.sort_values(['level', 'name']).reset_index(drop=True)
+
+
+def _columns(n: int, seed: int) -> Dict[str, np.ndarray]:
+    """The listing attributes as arrays, shared by the node and table generators."""
+    rng = np.random.default_rng(seed)
+    leaves = leaf_areas(load_areas())
+    # Some areas have many more listings than others
+    weights = rng.pareto(1.5, len(leaves)) + 0.1
+    area_index = rng.choice(len(leaves), n, p=weights / weights.sum())
+    centers = np.array([a['center'] for a in leaves])
+    area_zips = rng.integers(10001, 11697, (len(leaves), 3))
+    area_price = rng.uniform(2200, 5500, len(leaves))
+
+    bedrooms = rng.choice(len(BEDROOM_WEIGHTS), n, p=BEDROOM_WEIGHTS)
+    price = np.round(area_price[area_index] * (0.75 + 0.45 * bedrooms) * rng.lognormal(0, 0.18, n), -1)
+    size = np.where(rng.random(n) < 0.4, 0, np.round(350 + 260 * bedrooms + rng.normal(0, 80, n)).clip(200))
+    # Repeated units: another listing's location, bedrooms and price (within a few percent)
+    original = np.arange(n)
+    repeats = rng.random(n) < DUPLICATE_SHARE
+    original[repeats] = rng.integers(0, n, repeats.sum())
+    original = original[original]
+    zip_codes = area_zips[area_index, rng.integers(0, 3, n)]
+    latitude = centers[area_index, 0] + rng.normal(0, 0.004, n)
+    longitude = centers[area_index, 1] + rng.normal(0, 0.004, n)
+    return {
+        'external_id': rng.choice(np.arange(1_000_000, 1_000_000 + 50 * n), n, replace=False),
+        'area_name': np.array([a['name'] for a in leaves], dtype=object)[area_index[original]],
+        'area_id': np.array([a['id'] for a in leaves])[area_index[original]],
+        'zip_code': zip_codes[original].astype(str),
+        'latitude': np.round(latitude[original], 7),
+        'longitude': np.round(longitude[original], 7),
+        'bedroom_count': bedrooms[original],
+        'price': (price[original] * np.where(repeats, rng.uniform(0.97, 1.03, n), 1)).round(-1).astype('int64'),
+        'living_area_size': size[original].astype('int64'),
+        'street_number': rng.integers(1, 999, n)[original],
+        'street_name': rng.integers(1, 220, n)[original],
+        'unit': rng.integers(1, 40, n)[original],
+        'full_bathroom_count': np.maximum(1, bedrooms // 2)[original],
+        'half_bathroom_count': rng.integers(0, 2, n),
+        'building_type': rng.choice(BUILDING_TYPES, n, p=[0.55, 0.2, 0.1, 0.05, 0.1]),
+        'furnished': rng.random(n) < 0.05,
+        'available_days': rng.integers(0, 240, n),
+        'broker': rng.integers(0, max(20, n // 50), n),
+        'source_type': rng.choice(['BROKER', 'OWNER', 'PARTNER'], n, p=[0.8, 0.1, 0.1]),
+        'status': rng.choice(['ACTIVE', 'IN_CONTRACT'], n, p=[0.93, 0.07]),
+        'cluster': original,
+    }
+
+
+def synthetic_nodes(n: int, seed: int = 0, start: date = date(2025, 6, 1)) -> List[dict]:
+    """n search API listing nodes, as found in `listingData.edges[].node`."""
+    c = _columns(n, seed)
+    nodes = []
+    for i in range(n):
+        nodes.append({
+            'id': str(c['external_id'][i]),
+            'areaName': c['area_name'][i],
+            'availableAt': (start + timedelta(days=int(c['available_days'][i]))).isoformat(),
+            'bedroomCount': int(c['bedroom_count'][i]),
+            'buildingType': str(c['building_type'][i]),
+            'fullBathroomCount': int(c['full_bathroom_count'][i]),
+            'furnished': bool(c['furnished'][i]),
+            'geoPoint': {'latitude': float(c['latitude'][i]), 'longitude': float(c['longitude'][i])},
+            'halfBathroomCount': int(c['half_bathroom_count'][i]),
+            'hasTour3d': False,
+            'hasVideos': False,
+            'interestingPriceDelta': None,
+            'isNewDevelopment': False,
+            'leaseTerm': 12,
+            'livingAreaSize': int(c['living_area_size'][i]),
+            'monthsFree': 0,
+            'netEffectivePrice': int(c['price'][i]),
+            'offMarketAt': None,
+            'price': int(c['price'][i]),
+            'sourceGroupLabel': f"Broker {c['broker'][i]}",
+            'sourceType': str(c['source_type'][i]),
+            'state': 'NY',
+            'status': str(c['status'][i]),
+            'street': f"{c['street_number'][i]} W {c['street_name'][i]} St",
+            'upcomingOpenHouse': {'startTime': '2025-06-07T12:00:00.000-04:00'} if i % 7 == 0 else None,
+            'displayUnit': f"#{c['unit'][i]}",
+            'urlPath': f"/building/{c['street_number'][i]}-w-{c['street_name'][i]}-st/{c['unit'][i]}-{c['external_id'][i]}",
+            'zipCode': str(c['zip_code'][i]),
+            'tier': None,
+            '__typename': 'OrganicRentalEdge',
+        })
+    return nodes
+
+
+def synthetic_search_pages(nodes: List[dict], page_size: int = PAGE_SIZE) -> List[dict]:
+    """The nodes as consecutive search API responses."""
+    total_pages = max(1, -(-len(nodes) // page_size))
+    return [{'listingData': {'edges': [{'node': node} for node in nodes[start:start + page_size]],
+                             'pageInfo': {'totalPages': total_pages}}}
+            for start in range(0, len(nodes), page_size)]
+
+
+def synthetic_raw_listings(n: int, seed: int = 0) -> pd.DataFrame:
+    """Rows of the listings table with the Python types the MySQL driver produces: str, Decimal, int, datetime.date."""
+    c = _columns(n, seed)
+    rng = np.random.default_rng(seed + 1)
+    ids = np.arange(1, n + 1)
+    return pd.DataFrame({
+        'id': ids,
+        'source': 'streeteasy',
+        'external_id': c['external_id'].astype(str).tolist(),
+        'area_name': c['area_name'].tolist(),
+        'available_at': [date(2025, 6, 1) + timedelta(days=int(d)) for d in c['available_days']],
+        'bedroom_count': [Decimal(f"{b:.1f}") for b in c['bedroom_count']],
+        'building_type': c['building_type'].tolist(),
+        'full_bathroom_count': c['full_bathroom_count'],
+        'furnished': c['furnished'].astype('int64'),
+        'latitude': [Decimal(f"{x:.7f}") for x in c['latitude']],
+        'longitude': [Decimal(f"{x:.7f}") for x in c['longitude']],
+        'half_bathroom_count': c['half_bathroom_count'],
+        # Stored after ingest validation: an unknown size is NULL, not 0
+        'living_area_size': [int(s) if s else None for s in c['living_area_size']],
+        'price': c['price'],
+        'source_group_label': [f"Broker {b}" for b in c['broker']],
+        'source_type': c['source_type'].tolist(),
+        'state': 'NY',
+        'status': c['status'].tolist(),
+        'street': [f"{s} W {n_} St" for s, n_ in zip(c['street_number'], c['street_name'])],
+        'display_unit': [f"#{u}" for u in c['unit']],
+        'url_path': [f"/building/listing-{i}" for i in c['external_id']],
+        'zip_code': c['zip_code'].tolist(),
+        'unit_cluster_id': ids[c['cluster']],
+        # Dimension ids as assigned at ingest (database/dimensions.py)
+        'area_id': c['area_id'],
+        **{id_col: pd.factorize(c[col])[0] + 1 for col, id_col in
+           [('status', 'status_id'), ('building_type', 'building_type_id'), ('source_type', 'source_type_id'),
+            ('zip_code', 'zip_id')]},
+        'date_added': pd.Timestamp('2025-06-01') + pd.to_timedelta(rng.integers(0, 86400 * 30, n), unit='s'),
+        'date_updated': pd.Timestamp('2025-07-01') + pd.to_timedelta(rng.integers(0, 86400 * 30, n), unit='s'),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10000, help='Listings to generate')
+    parser.add_argument('--out', required=True, help='Directory for the search API pages, one .json file each')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    pages = synthetic_search_pages(synthetic_nodes(args.rows, args.seed))
+    for number, page in enumerate(pages, start=1):
+        with open(os.path.join(args.out, f"page-{number:06d}.json"), 'w') as f:
+            json.dump(page, f)
+    print(f"Wrote {args.rows} listings in {len(pages)} pages to {args.out}")
+
+
+if __name__ == '__main__':
+    main()